@@ -0,0 +1,303 @@
+import argparse
+import asyncio
+import glob
+import json
+import logging
+import os
+import platform
+import subprocess
+import sys
+import time
+import urllib.request
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+import cv2
+import numpy as np
+import websockets
+
+from vision_detection.protocol import ENCODING_JPEG, pack_frame
+
+# Configure logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.bmp')
+
+
+def load_frames(source, max_frames):
+    """JPEG-encoded frames from a directory of images or a video file."""
+    frames = []
+    if os.path.isdir(source):
+        paths = sorted(p for p in glob.glob(os.path.join(source, '*')) if p.lower().endswith(IMAGE_EXTENSIONS))
+        for path in paths[:max_frames]:
+            if path.lower().endswith(('.jpg', '.jpeg')):
+                with open(path, 'rb') as f:
+                    frames.append(f.read())
+            else:
+                image = cv2.imread(path, cv2.IMREAD_COLOR)
+                if image is not None:
+                    frames.append(cv2.imencode('.jpg', image)[1].tobytes())
+    else:
+        capture = cv2.VideoCapture(source)
+        while len(frames) < max_frames:
+            ok, image = capture.read()
+            if not ok:
+                break
+            frames.append(cv2.imencode('.jpg', image)[1].tobytes())
+        capture.release()
+    if not frames:
+        raise ValueError(f"No frames found in {source}")
+    return frames
+
+
+def latency_summary(latencies):
+    if not latencies:
+        return {'p50': None, 'p95': None, 'p99': None, 'mean': None, 'max': None}
+    values = np.array(latencies) * 1000
+    p50, p95, p99 = np.percentile(values, [50, 95, 99])
+    return {'p50': round(float(p50), 2), 'p95': round(float(p95), 2), 'p99': round(float(p99), 2),
+            'mean': round(float(values.mean()), 2), 'max': round(float(values.max()), 2)}
+
+
+def process_cpu_seconds(pid):
+    """User + system CPU seconds used by ``pid`` (Linux /proc), or None if unavailable."""
+    try:
+        with open(f'/proc/{pid}/stat') as f:
+            fields = f.read().rsplit(')', 1)[1].split()
+        return (int(fields[11]) + int(fields[12])) / os.sysconf('SC_CLK_TCK')
+    except (OSError, IndexError, ValueError):
+        return None
+
+
+def http_get(url, timeout=5.0):
+    with urllib.request.urlopen(url, timeout=timeout) as response:
+        return response.status, response.read()
+
+
+def wait_until_ready(base_url, timeout):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            status, _ = http_get(f"{base_url}/health/ready", timeout=2.0)
+            if status == 200:
+                return
+        except Exception:
+            pass
+        time.sleep(0.5)
+    raise TimeoutError(f"Server at {base_url} not ready after {timeout}s")
+
+
+def start_server(port):
+    logger.info(f"Starting vision server on port {port}...")
+    return subprocess.Popen(
+        [sys.executable, '-m', 'uvicorn', 'run_vision_server:app', '--host', '127.0.0.1',
+         '--port', str(port), '--log-level', 'warning'],
+        cwd=BACKEND_DIR
+    )
+
+
+async def websocket_client(url, client_id, frames, deadline, fps, stats):
+    """Stream frames with credit flow control and time each result by sequence number."""
+    sent_at = {}
+    latencies = stats['latencies']
+    async with websockets.connect(f"{url}?stream_id=bench-{client_id}", max_size=None) as ws:
+        await ws.send(json.dumps({'type': 'hello', 'protocol': 'binary', 'flow': 'credit'}))
+        sequence = 0
+        last_send = 0.0
+        while time.monotonic() < deadline:
+            try:
+                message = json.loads(await asyncio.wait_for(ws.recv(), max(deadline - time.monotonic(), 0.01)))
+            except asyncio.TimeoutError:
+                break
+            kind = message.get('type')
+            if kind == 'ready':
+                if fps:
+                    await asyncio.sleep(max(last_send + 1.0 / fps - time.monotonic(), 0))
+                frame = frames[sequence % len(frames)]
+                last_send = time.monotonic()
+                sent_at[sequence] = last_send
+                await ws.send(pack_frame(frame, ENCODING_JPEG, stream_id=client_id, sequence=sequence,
+                                         timestamp=time.time()))
+                stats['sent'] += 1
+                sequence += 1
+            elif kind == 'status':
+                stats['not_ready'] += 1
+            elif 'sequence' in message:
+                started = sent_at.pop(message['sequence'], None)
+                if started is not None:
+                    latencies.append(time.monotonic() - started)
+                stats['results'] += 1
+                stats['carried'] += bool(message.get('carried'))
+                stats['degraded'] += bool(message.get('quality', {}).get('degraded'))
+                stats['server_dropped'][client_id] = message.get('dropped_frames', 0)
+            # Results for frames the server skipped never arrive
+            for stale in [s for s, t in sent_at.items() if time.monotonic() - t > 10.0]:
+                del sent_at[stale]
+
+
+def unique_jpeg(frame, tag):
+    """The same JPEG with a comment segment after SOI, so the server's result cache never matches it."""
+    comment = f"benchmark {tag}".encode()
+    return frame[:2] + b'\xff\xfe' + (len(comment) + 2).to_bytes(2, 'big') + comment + frame[2:]
+
+
+def post_image(url, frame, timeout):
+    boundary = uuid.uuid4().hex
+    body = (f"--{boundary}\r\nContent-Disposition: form-data; name=\"file\"; filename=\"frame.jpg\"\r\n"
+            f"Content-Type: image/jpeg\r\n\r\n").encode() + frame + f"\r\n--{boundary}--\r\n".encode()
+    request = urllib.request.Request(url, data=body, method='POST',
+                                     headers={'Content-Type': f'multipart/form-data; boundary={boundary}'})
+    with urllib.request.urlopen(request, timeout=timeout) as response:
+        return json.loads(response.read()).get('cache')
+
+
+async def rest_worker(url, worker_id, frames, deadline, stats, executor):
+    loop = asyncio.get_running_loop()
+    index = worker_id
+    while time.monotonic() < deadline:
+        # Every upload is unique, so REST figures measure inference rather than the result cache
+        frame = unique_jpeg(frames[index % len(frames)], f"{worker_id}-{index}")
+        index += 1
+        started = time.monotonic()
+        try:
+            outcome = await loop.run_in_executor(executor, post_image, url, frame, 30.0)
+            stats['latencies'].append(time.monotonic() - started)
+            stats['results'] += 1
+            stats['cache'][outcome] = stats['cache'].get(outcome, 0) + 1
+        except Exception as e:
+            stats['errors'] += 1
+            logger.debug(f"REST request failed: {str(e)}")
+        stats['sent'] += 1
+
+
+async def run_load(args, frames, base_url):
+    ws_stats = {'sent': 0, 'results': 0, 'carried': 0, 'degraded': 0, 'not_ready': 0,
+                'latencies': [], 'server_dropped': {}}
+    rest_stats = {'sent': 0, 'results': 0, 'errors': 0, 'latencies': [], 'cache': {}}
+    deadline = time.monotonic() + args.duration
+    ws_url = base_url.replace('http', 'ws', 1) + '/ws/analyze'
+    executor = ThreadPoolExecutor(max_workers=max(args.rest_clients, 1))
+
+    tasks = [websocket_client(ws_url, i, frames, deadline, args.fps, ws_stats) for i in range(args.clients)]
+    tasks += [rest_worker(f"{base_url}/analyze/image", i, frames, deadline, rest_stats, executor)
+              for i in range(args.rest_clients)]
+    outcomes = await asyncio.gather(*tasks, return_exceptions=True)
+    executor.shutdown(wait=False)
+    errors = [str(outcome) for outcome in outcomes if isinstance(outcome, Exception)]
+    return ws_stats, rest_stats, errors
+
+
+def summarize(stats, duration):
+    summary = {
+        'frames_sent': stats['sent'],
+        'results': stats['results'],
+        'throughput_fps': round(stats['results'] / duration, 2),
+        'send_rate_fps': round(stats['sent'] / duration, 2),
+        'latency_ms': latency_summary(stats['latencies'])
+    }
+    if 'server_dropped' in stats:
+        summary.update({
+            'dropped_frames': sum(stats['server_dropped'].values()),
+            'carried_results': stats['carried'],
+            'degraded_results': stats['degraded'],
+            'not_ready': stats['not_ready']
+        })
+    else:
+        summary['errors'] = stats['errors']
+        summary['cache'] = stats['cache']  # Outcomes reported by the server; all 'miss' when measuring inference
+    return summary
+
+
+def stage_latencies(metrics_text):
+    """Mean milliseconds per pipeline stage across all streams, from the server's /metrics."""
+    sums, counts = {}, {}
+    for line in metrics_text.splitlines():
+        if not line.startswith('vision_stage_latency_seconds_') or '_bucket' in line:
+            continue
+        name, value = line.rsplit(' ', 1)
+        stage = name.split('stage="', 1)[1].split('"', 1)[0]
+        target = sums if name.startswith('vision_stage_latency_seconds_sum') else counts
+        target[stage] = target.get(stage, 0) + float(value)
+    return {stage: round(sums[stage] / counts[stage] * 1000, 3) for stage in sums if counts.get(stage)}
+
+
+def git_commit():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', 'HEAD'], cwd=BACKEND_DIR,
+                                       stderr=subprocess.DEVNULL).decode().strip()
+    except Exception:
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load-test the vision server over WebSocket and REST")
+    parser.add_argument('source', help="Directory of frames or a video file to replay")
+    parser.add_argument('--clients', type=int, default=4, help="Concurrent WebSocket clients")
+    parser.add_argument('--rest-clients', type=int, default=0, help="Concurrent /analyze/image clients")
+    parser.add_argument('--duration', type=float, default=30.0, help="Measurement window in seconds")
+    parser.add_argument('--fps', type=float, default=0, help="Per-client frame rate cap (0: as fast as credits allow)")
+    parser.add_argument('--max-frames', type=int, default=300, help="Frames loaded from the source")
+    parser.add_argument('--port', type=int, default=8765, help="Port for the locally started server")
+    parser.add_argument('--url', help="Benchmark an already running server instead, e.g. http://host:8000")
+    parser.add_argument('--server-pid', type=int, help="PID of an already running server, for CPU use")
+    parser.add_argument('--ready-timeout', type=float, default=120.0, help="Seconds to wait for model warm-up")
+    parser.add_argument('--output', help="Write the JSON report here as well as to stdout")
+    args = parser.parse_args()
+
+    frames = load_frames(args.source, args.max_frames)
+    logger.info(f"Loaded {len(frames)} frames from {args.source}")
+
+    server = None
+    if args.url:
+        base_url, server_pid = args.url.rstrip('/'), args.server_pid
+    else:
+        server = start_server(args.port)
+        base_url, server_pid = f"http://127.0.0.1:{args.port}", server.pid
+
+    try:
+        wait_until_ready(base_url, args.ready_timeout)
+        cpu_before, started = process_cpu_seconds(server_pid) if server_pid else None, time.monotonic()
+        ws_stats, rest_stats, errors = asyncio.run(run_load(args, frames, base_url))
+        elapsed = time.monotonic() - started
+        cpu_after = process_cpu_seconds(server_pid) if server_pid else None
+        try:
+            stages = stage_latencies(http_get(f"{base_url}/metrics")[1].decode())
+        except Exception:
+            stages = None
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait(timeout=10)
+
+    cpu_seconds = cpu_after - cpu_before if cpu_before is not None and cpu_after is not None else None
+    report = {
+        'commit': git_commit(),
+        'host': {'platform': platform.platform(), 'python': platform.python_version(), 'cpus': os.cpu_count()},
+        'config': {'source': args.source, 'frames': len(frames), 'clients': args.clients,
+                   'rest_clients': args.rest_clients, 'duration': args.duration, 'fps': args.fps},
+        'elapsed_seconds': round(elapsed, 2),
+        'websocket': summarize(ws_stats, elapsed) if args.clients else None,
+        'rest': summarize(rest_stats, elapsed) if args.rest_clients else None,
+        'server_cpu': {
+            'cpu_seconds': round(cpu_seconds, 2) if cpu_seconds is not None else None,
+            # 100% is one fully busy core
+            'cpu_percent': round(cpu_seconds / elapsed * 100, 1) if cpu_seconds is not None else None
+        },
+        'server_stage_ms': stages,
+        'client_errors': errors
+    }
+
+    text = json.dumps(report, indent=2)
+    print(text)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(text)
+
+
+if __name__ == "__main__":
+    main()
@@ -3,7 +3,9 @@ os.environ['KMP_DUPLICATE_LIB_OK']='True'  # Fix potential OpenMP issues
 
 # Import torch and set num threads before other imports
 import torch
-torch.set_num_threads(1)
+_threads = int(os.getenv('VISION_TORCH_THREADS', '1'))
+if _threads:  # 0 keeps the library default
+    torch.set_num_threads(_threads)
 
 import cv2
 import numpy as np
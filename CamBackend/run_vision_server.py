@@ -1,13 +1,24 @@
-from fastapi import FastAPI, WebSocket, UploadFile
+from fastapi import FastAPI, HTTPException, WebSocket, UploadFile
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
 import uvicorn
 import logging
-from vision_detection.server import VisionServer
+from typing import List, Optional
+from vision_detection.server import SourceRequest, VisionServer
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+def parse_windows(windows: Optional[str]) -> Optional[List[float]]:
+    """``?windows=60,300`` as seconds; None falls back to the configured windows."""
+    if not windows:
+        return None
+    try:
+        return [float(window) for window in windows.split(',') if window.strip()]
+    except ValueError:
+        raise HTTPException(status_code=400, detail="windows must be comma-separated seconds")
+
 app = FastAPI()
 vision_server = VisionServer()
 
@@ -20,6 +31,14 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+@app.on_event("startup")
+async def startup_event():
+    await vision_server.startup()
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    vision_server.shutdown()
+
 @app.websocket("/ws/analyze")
 async def websocket_endpoint(websocket: WebSocket):
     await vision_server.handle_websocket(websocket)
@@ -28,11 +47,65 @@ async def websocket_endpoint(websocket: WebSocket):
 async def analyze_image(file: UploadFile):
     return await vision_server.analyze_image(file)
 
+@app.post("/analyze/images")
+async def analyze_images(files: List[UploadFile]):
+    return StreamingResponse(vision_server.analyze_images(files), media_type="application/x-ndjson")
+
+@app.websocket("/ws/subscribe")
+async def subscribe_endpoint(websocket: WebSocket):
+    await vision_server.handle_subscriber(websocket)
+
+@app.get("/sources")
+async def sources():
+    return vision_server.sources_stats()
+
+@app.post("/sources")
+async def add_source(request: SourceRequest):
+    return vision_server.add_camera_source(request)
+
+@app.delete("/sources/{stream_id}")
+async def remove_source(stream_id: str):
+    if not vision_server.remove_source(stream_id):
+        raise HTTPException(status_code=404, detail=f"No source for stream {stream_id}")
+    return {'stream_id': stream_id, 'removed': True}
+
+@app.get("/sessions")
+async def sessions():
+    return vision_server.sessions.stats()
+
+@app.get("/stats")
+async def traffic_stats(windows: Optional[str] = None):
+    return vision_server.traffic_stats(windows=parse_windows(windows))
+
+@app.get("/stats/{stream_id}")
+async def stream_traffic_stats(stream_id: str, windows: Optional[str] = None):
+    return vision_server.traffic_stats(stream_id, parse_windows(windows))
+
+@app.get("/admission")
+async def admission():
+    return vision_server.admission.stats()
+
+@app.get("/metrics")
+async def metrics():
+    return PlainTextResponse(vision_server.metrics_text(), media_type="text/plain; version=0.0.4")
+
+@app.get("/health/ready")
+async def ready():
+    readiness = vision_server.readiness()
+    return JSONResponse(readiness, status_code=200 if readiness['status'] == 'ready' else 503)
+
 if __name__ == "__main__":
     print("Starting Vision Detection Server...")
     print("Available at: http://localhost:8000")
     print("WebSocket endpoint: ws://localhost:8000/ws/analyze")
+    print("Results-only WebSocket: ws://localhost:8000/ws/subscribe?stream_id=<id>")
+    print("Server-side sources: http://localhost:8000/sources")
+    print("Rolling traffic stats: http://localhost:8000/stats/<stream_id>?windows=60,300")
     print("REST endpoint: http://localhost:8000/analyze/image")
+    print("Bulk REST endpoint: http://localhost:8000/analyze/images")
+    print("Admission decisions: http://localhost:8000/admission")
+    print("Readiness: http://localhost:8000/health/ready")
+    print("Metrics: http://localhost:8000/metrics")
     
     uvicorn.run(
         app,
@@ -0,0 +1,165 @@
+import asyncio
+import math
+import time
+
+import numpy as np
+
+from vision_detection.admission import AdmissionController
+from vision_detection.batching import BatchScheduler
+from vision_detection.inference import InferenceExecutor
+
+
+def offer(stream, frames):
+    """Count ``frames`` offered by a stream without going through its token bucket."""
+    stream.offered += frames
+
+
+def test_budget_goes_to_high_priority_first():
+    controller = AdmissionController(budget=10, min_rate=0.5, alpha=1.0)
+    controller._rebalanced_at = 0.0
+    high = controller.register('enforcement', 'high')
+    low_a = controller.register('info-a', 'low')
+    low_b = controller.register('info-b', 'low')
+    for stream in (high, low_a, low_b):
+        offer(stream, 6)
+    controller.rebalance(now=1.0)
+
+    assert high.allowed_rate is None and not high.shedding
+    # The 4 fps left over is split evenly between the low-priority streams
+    assert low_a.allowed_rate == low_b.allowed_rate == 2.0
+    assert low_a.shedding and low_b.shedding
+
+
+def test_min_rate_keeps_low_priority_streams_alive():
+    controller = AdmissionController(budget=5, min_rate=0.5, alpha=1.0)
+    controller._rebalanced_at = 0.0
+    high = controller.register('enforcement', 'high')
+    low = controller.register('info', 'low')
+    offer(high, 8)
+    offer(low, 8)
+    controller.rebalance(now=1.0)
+
+    assert high.allowed_rate == 5.0
+    assert low.allowed_rate == 0.5
+
+
+def test_unknown_priority_falls_back_to_normal():
+    controller = AdmissionController()
+    assert controller.register('camera', 'urgent').priority == 'normal'
+    assert controller.register('other').priority == 'normal'
+
+
+def test_token_bucket_admits_at_the_allowed_rate():
+    controller = AdmissionController()
+    stream = controller.register('camera', 'low')
+    stream.allowed_rate = 2.0
+    stream.refilled_at = 0.0
+    admitted = sum(stream.admit(now=i / 10) for i in range(1, 51))  # 10 fps for 5 seconds
+
+    assert admitted == 10
+    assert stream.shed_total == 40
+
+
+def test_latency_over_target_lowers_budget_and_recovers():
+    latencies = [0.25, 0.05, 0.05]
+    controller = AdmissionController(min_rate=0.5, alpha=1.0, target_latency=0.2,
+                                     latency=lambda: latencies.pop(0))
+    controller._rebalanced_at = 0.0
+    high = controller.register('enforcement', 'high')
+    low = controller.register('info', 'low')
+
+    # 25% over target: the 12 fps being admitted is cut by 20%, all of it from the low class
+    offer(high, 2)
+    offer(low, 10)
+    controller.rebalance(now=1.0)
+    assert math.isclose(controller.effective_budget, 9.6)
+    assert high.allowed_rate is None
+    assert math.isclose(low.allowed_rate, 7.6)
+
+    offer(high, 2)
+    offer(low, 10)
+    controller.rebalance(now=2.0)
+    assert math.isclose(controller.effective_budget, 10.56)
+
+    # Well clear of the demand and no configured ceiling: unlimited again
+    offer(high, 2)
+    offer(low, 2)
+    controller.rebalance(now=3.0)
+    assert controller.effective_budget == math.inf
+    assert low.allowed_rate is None
+
+
+def test_overload_cuts_lowest_class_first():
+    latencies = [1.0, 1.0, 1.0]
+    controller = AdmissionController(min_rate=0.5, alpha=1.0, target_latency=0.1,
+                                     latency=lambda: latencies.pop(0))
+    controller._rebalanced_at = 0.0
+    high = controller.register('enforcement', 'high')
+    low = controller.register('info', 'low')
+
+    # Even a large overshoot only takes the low class down to min_rate
+    offer(high, 10)
+    offer(low, 10)
+    controller.rebalance(now=1.0)
+    assert high.allowed_rate is None
+    assert low.allowed_rate == 0.5
+
+    # Still slow with nothing left to shed below: the model is just slower than the
+    # target, and limiting the top class would not help anyone
+    offer(high, 10)
+    offer(low, 10)
+    controller.rebalance(now=2.0)
+    assert high.allowed_rate is None
+
+    # Frames being dropped is a hard overload, which does reach the top class
+    offer(high, 10)
+    offer(low, 10)
+    high.overloaded()
+    controller.rebalance(now=3.0)
+    assert high.allowed_rate is not None and high.allowed_rate < 10
+
+
+def test_saturated_scheduler_sheds_low_priority_first():
+    """Streams that together need more than the model can do: only the low class is shed."""
+
+    def predict(frames, image_size):
+        # Batches cost time per frame, like a real detector on CPU
+        time.sleep(0.04 * len(frames))
+        return [None] * len(frames)
+
+    async def camera(scheduler, stream, fps, stop_at, completed):
+        busy = None
+        frame = np.zeros((8, 8, 3), dtype=np.uint8)
+        while time.monotonic() < stop_at:
+            if busy is None or busy.done():
+                # Like the analyzer: a frame only asks for admission once the last one is back
+                if stream.admit():
+                    busy = asyncio.ensure_future(scheduler.submit(frame, stream=stream.stream_id))
+                    busy.add_done_callback(lambda _: completed.__setitem__(stream.stream_id,
+                                                                           completed[stream.stream_id] + 1))
+            await asyncio.sleep(1 / fps)
+        if busy is not None:
+            await busy
+
+    async def run():
+        scheduler = BatchScheduler(InferenceExecutor(), predict, max_wait=0.005)
+        controller = AdmissionController(min_rate=0.5, period=0.25, latency=scheduler.take_latency,
+                                         target_latency=0.1)
+        streams = [controller.register('enforcement', 'high'),
+                   controller.register('info-a', 'low'),
+                   controller.register('info-b', 'low')]
+        completed = {stream.stream_id: 0 for stream in streams}
+        controller.start()
+        stop_at = time.monotonic() + 4.0
+        await asyncio.gather(*(camera(scheduler, stream, 30, stop_at, completed) for stream in streams))
+        controller.stop()
+        scheduler.shutdown()
+        scheduler.inference.shutdown()
+        return controller, streams, completed
+
+    controller, (high, low_a, low_b), completed = asyncio.run(run())
+
+    assert controller.effective_budget < math.inf
+    assert high.shed_total == 0
+    assert low_a.shed_total > 0 and low_b.shed_total > 0
+    assert completed['enforcement'] > completed['info-a'] + completed['info-b']
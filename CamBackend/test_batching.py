@@ -0,0 +1,143 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from vision_detection.batching import BatchScheduler
+from vision_detection.inference import InferenceExecutor, InferenceQueueFull
+
+
+class RecordingModel:
+    """Stands in for the detector: returns each frame as its own result and records every batch."""
+
+    def __init__(self, delay: float = 0.0):
+        self.delay = delay
+        self.batches = []
+        self.running = 0
+        self.max_running = 0
+        self._lock = threading.Lock()
+
+    def __call__(self, frames, image_size):
+        with self._lock:
+            self.batches.append((list(frames), image_size))
+            self.running += 1
+            self.max_running = max(self.max_running, self.running)
+        time.sleep(self.delay)
+        with self._lock:
+            self.running -= 1
+        return list(frames)
+
+
+def run(model, scenario, workers: int = 1, **options):
+    """Run ``scenario(scheduler)`` against a fresh scheduler and shut everything down afterwards."""
+
+    async def main():
+        scheduler = BatchScheduler(InferenceExecutor(max_workers=workers, max_pending=8), model, **options)
+        try:
+            return await scenario(scheduler)
+        finally:
+            scheduler.shutdown()
+            scheduler.inference.shutdown()
+
+    return asyncio.run(main())
+
+
+def test_frames_are_taken_round_robin_across_streams():
+    model = RecordingModel()
+
+    async def scenario(scheduler):
+        frames = [('a', 'a1'), ('a', 'a2'), ('b', 'b1'), ('b', 'b2'), ('c', 'c1')]
+        return await asyncio.gather(*(scheduler.submit(frame, stream=stream) for stream, frame in frames))
+
+    results = run(model, scenario, max_batch_size=3, max_wait=0.05)
+    assert results == [['a1'], ['a2'], ['b1'], ['b2'], ['c1']]
+    # A stream with two frames queued does not get both into the first batch
+    assert [frames for frames, _ in model.batches] == [['a1', 'b1', 'c1'], ['a2', 'b2']]
+
+
+def test_stream_over_its_queue_limit_is_rejected():
+    model = RecordingModel()
+
+    async def scenario(scheduler):
+        queued = [asyncio.ensure_future(scheduler.submit(frame, stream='a')) for frame in ('a1', 'a2')]
+        await asyncio.sleep(0)
+        with pytest.raises(InferenceQueueFull):
+            await scheduler.submit('a3', stream='a')
+        # Other streams are not affected by one stream's full queue
+        other = await scheduler.submit('b1', stream='b')
+        return await asyncio.gather(*queued), other, scheduler.rejected
+
+    queued, other, rejected = run(model, scenario, max_per_stream=2, max_wait=0.01)
+    assert queued == [['a1'], ['a2']]
+    assert other == ['b1']
+    assert rejected == 1
+
+
+def test_frames_are_only_batched_with_the_same_input_size():
+    model = RecordingModel()
+
+    async def scenario(scheduler):
+        return await asyncio.gather(scheduler.submit('a1', stream='a', image_size=640),
+                                    scheduler.submit('b1', stream='b', image_size=320),
+                                    scheduler.submit('c1', stream='c', image_size=640))
+
+    results = run(model, scenario, max_batch_size=8, max_wait=0.01)
+    assert results == [['a1'], ['b1'], ['c1']]
+    # The deferred stream goes first in the next batch
+    assert model.batches == [(['a1', 'c1'], 640), (['b1'], 320)]
+
+
+def test_cancel_drops_a_streams_queued_frames():
+    model = RecordingModel()
+
+    async def scenario(scheduler):
+        queued = [asyncio.ensure_future(scheduler.submit(frame, stream='a')) for frame in ('a1', 'a2')]
+        kept = asyncio.ensure_future(scheduler.submit('b1', stream='b'))
+        await asyncio.sleep(0)
+        dropped = scheduler.cancel('a')
+        outcomes = await asyncio.gather(*queued, return_exceptions=True)
+        return dropped, outcomes, await kept, scheduler.stats()['pending']
+
+    dropped, outcomes, kept, pending = run(model, scenario, max_wait=0.05)
+    assert dropped == 2
+    assert all(isinstance(outcome, asyncio.CancelledError) for outcome in outcomes)
+    assert kept == ['b1']
+    assert pending == 0
+    assert [frames for frames, _ in model.batches] == [['b1']]
+
+
+def test_at_most_max_in_flight_batches_run_at_once():
+    model = RecordingModel(delay=0.05)
+
+    async def scenario(scheduler):
+        return await asyncio.gather(*(scheduler.submit(i, stream=i) for i in range(6)))
+
+    results = run(model, scenario, workers=4, max_batch_size=1, max_wait=0.001, max_in_flight=2)
+    assert results == [[i] for i in range(6)]
+    assert model.max_running == 2
+
+
+def test_model_errors_reach_every_frame_in_the_batch():
+    def broken(frames, image_size):
+        raise RuntimeError("model failed")
+
+    async def scenario(scheduler):
+        return await asyncio.gather(scheduler.submit('a1', stream='a'), scheduler.submit('b1', stream='b'),
+                                    return_exceptions=True)
+
+    outcomes = run(broken, scenario, max_wait=0.01)
+    assert [str(outcome) for outcome in outcomes] == ["model failed", "model failed"]
+
+
+def test_take_latency_reports_the_mean_since_the_last_call():
+    model = RecordingModel(delay=0.02)
+
+    async def scenario(scheduler):
+        assert scheduler.take_latency() is None
+        await asyncio.gather(scheduler.submit('a1', stream='a'), scheduler.submit('b1', stream='b'))
+        return scheduler.take_latency(), scheduler.take_latency()
+
+    latency, again = run(model, scenario, max_wait=0.01)
+    assert 0.02 <= latency < 1.0
+    assert again is None
@@ -2,7 +2,9 @@ import os
 os.environ['KMP_DUPLICATE_LIB_OK']='True'
 
 import torch
-torch.set_num_threads(1)
+_threads = int(os.getenv('VISION_TORCH_THREADS', '1'))
+if _threads:  # 0 keeps the library default
+    torch.set_num_threads(_threads)
 
 import cv2
 import logging
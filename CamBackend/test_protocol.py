@@ -0,0 +1,74 @@
+import cv2
+import numpy as np
+import pytest
+
+from vision_detection.protocol import (ENCODING_BGR, ENCODING_I420, ENCODING_JPEG, FRAME_HEADER, ProtocolError,
+                                       decode_payload, pack_frame, parse_frame)
+
+
+def test_header_round_trips():
+    message = pack_frame(b'payload', encoding=ENCODING_BGR, stream_id=7, sequence=42,
+                         timestamp=1700000000.25, width=4, height=2)
+    header, payload = parse_frame(message)
+
+    assert (header.encoding, header.stream_id, header.sequence) == (ENCODING_BGR, 7, 42)
+    assert header.timestamp == 1700000000.25
+    assert (header.width, header.height) == (4, 2)
+    assert bytes(payload) == b'payload'
+    # The payload is a view into the message, not a copy
+    assert isinstance(payload, memoryview) and payload.obj is message
+
+
+@pytest.mark.parametrize('message, error', [
+    (b'VF\x01', "too short"),
+    (b'XX' + pack_frame(b'')[2:], "magic"),
+    (pack_frame(b'')[:2] + b'\x09' + pack_frame(b'')[3:], "version"),
+    (pack_frame(b'', encoding=9), "encoding"),
+])
+def test_malformed_messages_are_rejected(message, error):
+    with pytest.raises(ProtocolError, match=error):
+        parse_frame(message)
+
+
+def test_bgr_payload_is_used_in_place():
+    image = np.random.default_rng(0).integers(0, 255, (6, 8, 3), dtype=np.uint8)
+    header, payload = parse_frame(pack_frame(image.tobytes(), encoding=ENCODING_BGR, width=8, height=6))
+    frame = decode_payload(header, payload)
+
+    assert np.array_equal(frame, image)
+
+
+def test_i420_payload_is_converted_to_bgr():
+    image = np.full((8, 8, 3), (40, 120, 200), dtype=np.uint8)
+    i420 = cv2.cvtColor(image, cv2.COLOR_BGR2YUV_I420)
+    header, payload = parse_frame(pack_frame(i420.tobytes(), encoding=ENCODING_I420, width=8, height=8))
+    frame = decode_payload(header, payload)
+
+    assert frame.shape == (8, 8, 3)
+    assert np.abs(frame.astype(int) - image).max() <= 3
+
+
+def test_jpeg_payload_is_decoded():
+    image = np.full((48, 64, 3), 128, dtype=np.uint8)
+    jpeg = cv2.imencode('.jpg', image)[1].tobytes()
+    header, payload = parse_frame(pack_frame(jpeg, encoding=ENCODING_JPEG))
+
+    assert decode_payload(header, payload).shape == (48, 64, 3)
+
+
+@pytest.mark.parametrize('encoding, size, width, height, error', [
+    (ENCODING_BGR, 10, 0, 0, "width and height"),
+    (ENCODING_BGR, 10, 2, 2, "expected 12"),
+    (ENCODING_I420, 12, 3, 2, "even"),
+    (ENCODING_I420, 10, 4, 2, "expected 12"),
+    (ENCODING_JPEG, 10, 0, 0, "JPEG"),
+])
+def test_bad_payloads_are_rejected(encoding, size, width, height, error):
+    header, payload = parse_frame(pack_frame(bytes(size), encoding=encoding, width=width, height=height))
+    with pytest.raises(ProtocolError, match=error):
+        decode_payload(header, payload)
+
+
+def test_header_size_is_fixed():
+    # Clients in other languages pack this layout by hand
+    assert FRAME_HEADER.size == 24
@@ -0,0 +1,112 @@
+import asyncio
+import time
+
+import numpy as np
+
+from vision_detection.analyzer import TrafficAnalyzer
+from vision_detection.batching import BatchScheduler
+from vision_detection.inference import InferenceExecutor
+from vision_detection.result_cache import ResultCache
+
+
+def test_repeat_upload_is_a_hit():
+    cache = ResultCache('model-a')
+    calls = []
+
+    async def compute():
+        calls.append(1)
+        return {'total_vehicles': 3}
+
+    async def run():
+        key = cache.key(b'image')
+        return [await cache.get_or_compute(key, compute) for _ in range(2)]
+
+    (first, first_outcome), (second, second_outcome) = asyncio.run(run())
+    assert (first_outcome, second_outcome) == ('miss', 'hit')
+    assert first == second == {'total_vehicles': 3}
+    assert len(calls) == 1
+
+
+def test_fingerprint_is_part_of_the_key():
+    assert ResultCache('model-a').key(b'image') != ResultCache('model-b').key(b'image')
+    assert ResultCache('model-a').key(b'image') == ResultCache('model-a').key(b'image')
+
+
+def test_concurrent_identical_uploads_share_one_computation():
+    cache = ResultCache('model-a')
+    calls = []
+
+    async def compute():
+        calls.append(1)
+        await asyncio.sleep(0.05)
+        return {'total_vehicles': 1}
+
+    async def run():
+        key = cache.key(b'image')
+        return await asyncio.gather(*(cache.get_or_compute(key, compute) for _ in range(4)))
+
+    outcomes = sorted(outcome for _, outcome in asyncio.run(run()))
+    assert outcomes == ['miss', 'shared', 'shared', 'shared']
+    assert len(calls) == 1
+    assert cache.stats()['shared'] == 3
+
+
+def test_failures_reach_every_waiter_and_are_not_cached():
+    cache = ResultCache('model-a')
+
+    async def compute():
+        await asyncio.sleep(0.01)
+        raise ValueError("bad image")
+
+    async def run():
+        key = cache.key(b'junk')
+        return await asyncio.gather(*(cache.get_or_compute(key, compute) for _ in range(3)),
+                                    return_exceptions=True)
+
+    results = asyncio.run(run())
+    assert all(isinstance(result, ValueError) for result in results)
+    assert cache.stats()['entries'] == 0
+    assert not cache.in_flight
+
+
+def test_entries_expire_after_ttl():
+    cache = ResultCache('model-a', ttl=0.05)
+    cache.put('key', {'total_vehicles': 1})
+    assert cache.get('key') == {'total_vehicles': 1}
+
+    time.sleep(0.1)
+    assert cache.get('key') is None
+    assert cache.stats()['expirations'] == 1
+    assert cache.stats()['entries'] == 0
+
+
+def test_least_recently_used_entry_is_evicted():
+    cache = ResultCache('model-a', max_entries=2)
+    cache.put('a', {'n': 1})
+    cache.put('b', {'n': 2})
+    cache.get('a')  # 'b' is now the least recently used
+    cache.put('c', {'n': 3})
+
+    assert cache.get('b') is None
+    assert cache.get('a') == {'n': 1} and cache.get('c') == {'n': 3}
+    assert cache.stats()['evictions'] == 1
+
+
+
+def test_failed_detection_is_flagged_so_it_is_never_cached():
+    def predict(frames, image_size):
+        raise RuntimeError("model failed")
+
+    async def run():
+        scheduler = BatchScheduler(InferenceExecutor(), predict, max_wait=0.001)
+        analyzer = TrafficAnalyzer(scheduler=scheduler, frame_skip=1)
+        try:
+            return await analyzer.analyze_frame(np.zeros((48, 64, 3), dtype=np.uint8), stream_id=analyzer)
+        finally:
+            scheduler.shutdown()
+            scheduler.inference.shutdown()
+
+    results = asyncio.run(run())
+    # Looks like an empty frame, but /analyze/image raises on the flag instead of caching it
+    assert results['total_vehicles'] == 0
+    assert results['error'] is True
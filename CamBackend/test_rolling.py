@@ -0,0 +1,80 @@
+import numpy as np
+
+from vision_detection.rolling import SPEED_BINS, RollingStats
+
+
+def result(track_ids, vehicle_type='car', violations=0, congestion=0.1):
+    return {
+        'total_vehicles': len(track_ids),
+        'congestion_level': congestion,
+        'traffic_violations': [{'type': 'speed'}] * violations,
+        'detections': [{'id': track_id, 'type': vehicle_type} for track_id in track_ids]
+    }
+
+
+def test_window_sums_after_the_ring_wraps():
+    stats = RollingStats(['car', 'truck'], bucket_seconds=10.0, horizon=60.0)
+    # One frame per second for 100 s with a new car in each; the ring of 6 buckets wraps
+    for second in range(100):
+        stats.observe(result([second], violations=1 if second % 10 == 0 else 0), now=float(second))
+
+    last_minute = stats.summary(60, now=99.5)
+    assert last_minute['frames'] == 60
+    assert last_minute['vehicles'] == 60
+    assert last_minute['vehicles_by_type'] == {'car': 60, 'truck': 0}
+    assert last_minute['vehicles_per_minute'] == 60.0
+    assert last_minute['violations'] == 6
+
+    assert stats.summary(30, now=99.5)['frames'] == 30
+    # Longer than the horizon: only what is still kept is summed, and rates use that span
+    hour = stats.summary(3600, now=99.5)
+    assert hour['frames'] == 60
+    assert hour['covered_seconds'] == 60.0
+    assert hour['vehicles_per_minute'] == 60.0
+
+
+def test_stale_buckets_are_not_counted():
+    stats = RollingStats(['car'], bucket_seconds=10.0, horizon=60.0)
+    for second in range(30):
+        stats.observe(result([second]), now=float(second))
+
+    # Long after the last result every row is past the horizon, even though none was cleared
+    assert stats.summary(60, now=200.0)['frames'] == 0
+    stats.observe(result([30]), now=200.0)
+    assert stats.summary(60, now=200.0)['frames'] == 1
+
+
+def test_rates_use_the_time_actually_observed():
+    stats = RollingStats(['car'], bucket_seconds=10.0, horizon=600.0)
+    for second in range(5, 20):
+        stats.observe(result([second]), now=float(second))
+
+    summary = stats.summary(300, now=20.0)
+    assert summary['covered_seconds'] == 15.0
+    assert summary['vehicles_per_minute'] == 60.0
+
+
+def test_only_new_track_ids_count_as_vehicles():
+    stats = RollingStats(['car', 'truck'], bucket_seconds=10.0, horizon=60.0)
+    stats.observe(result([0, 1]), now=1.0)
+    stats.observe(result([0, 1]), now=2.0)
+    stats.observe(result([2], vehicle_type='truck'), now=3.0)
+
+    summary = stats.summary(60, now=3.0)
+    assert summary['vehicles_by_type'] == {'car': 2, 'truck': 1}
+    assert summary['mean_vehicles_in_view'] == round(5 / 3, 2)
+
+
+def test_speed_percentiles_from_the_histogram():
+    stats = RollingStats(['car'], bucket_seconds=10.0, horizon=60.0)
+    stats.observe(result([]), speeds=np.arange(100.0), now=1.0)
+
+    speed = stats.summary(60, now=1.0)['speed']
+    assert speed['samples'] == 100
+    assert speed['mean'] == 49.5
+    assert (speed['p50'], speed['p85'], speed['p95']) == (50.0, 85.0, 95.0)
+
+    # Speeds past the last bin are collected in it rather than dropped
+    stats.observe(result([]), speeds=np.array([1000.0]), now=2.0)
+    assert stats.speed_histogram.sum(axis=0)[SPEED_BINS - 1] == 1
+    assert stats.summary(60, now=2.0)['speed']['samples'] == 101
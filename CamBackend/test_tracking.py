@@ -0,0 +1,176 @@
+from datetime import datetime
+
+import numpy as np
+
+from vision_detection import analyzer
+from vision_detection.analyzer import VehicleTracker
+from vision_detection.association import INVALID_COST, pair_costs, solve_sparse_assignment
+from vision_detection.kalman import kalman_init, kalman_predict, kalman_update
+from vision_detection.spatial import points_in_polygon
+from vision_detection.tracks import TrackStore
+
+
+def use_clock(monkeypatch, clock):
+    """Make the tracker read time from ``clock[0]`` (epoch seconds) instead of the wall clock."""
+
+    class Clock(datetime):
+        @classmethod
+        def now(cls, tz=None):
+            return cls.fromtimestamp(clock[0], tz)
+
+    monkeypatch.setattr(analyzer, 'datetime', Clock)
+
+
+def car(cx, cy, width=60, height=40):
+    return [cx - width / 2, cy - height / 2, cx + width / 2, cy + height / 2]
+
+
+def test_ids_stay_stable_across_skipped_frames(monkeypatch):
+    clock = [1000.0]
+    use_clock(monkeypatch, clock)
+    tracker = VehicleTracker()
+    frame_skip, fps = 3, 25.0
+    seen = []
+
+    # Two cars closing on each other in neighboring lanes, analyzed every third frame
+    for frame in range(60):
+        clock[0] = 1000.0 + frame / fps
+        t = frame / fps
+        if frame % frame_skip:
+            tracker.predict(analyzer.datetime.now())
+            continue
+        boxes = np.array([car(100 + 120 * t, 200), car(700 - 120 * t, 260)], dtype=np.float32)
+        ids, _ = tracker.update(boxes, np.array([0.9, 0.9]), np.array([2, 2]), (720, 1280))
+        seen.append(ids.tolist())
+
+    assert all(ids == seen[0] for ids in seen)
+    assert tracker.next_id == 2
+    assert tracker.active_count() == 2
+
+
+def test_track_survives_missed_detections(monkeypatch):
+    clock = [1000.0]
+    use_clock(monkeypatch, clock)
+    tracker = VehicleTracker()
+
+    for frame in range(20):
+        clock[0] = 1000.0 + frame * 0.1
+        # The detector misses the car on frames 10 to 12; the track coasts through the gap
+        boxes = [] if 10 <= frame <= 12 else [car(100 + 15 * frame, 300)]
+        ids, _ = tracker.update(np.array(boxes, dtype=np.float32).reshape(-1, 4), np.full(len(boxes), 0.9),
+                                np.full(len(boxes), 2), (720, 1280))
+        if len(boxes):
+            assert ids.tolist() == [0]
+    assert tracker.next_id == 1
+
+
+def test_kalman_converges_to_constant_velocity():
+    true_velocity = np.array([120.0, -40.0])
+    states, covariances = kalman_init(np.array([[10.0, 500.0]]))
+    rng = np.random.default_rng(0)
+
+    for step in range(1, 41):
+        states, covariances = kalman_predict(states, covariances, np.array([0.1]))
+        measured = np.array([10.0, 500.0]) + true_velocity * step * 0.1 + rng.normal(0, 1.0, 2)
+        states, covariances = kalman_update(states, covariances, measured[None])
+
+    assert np.allclose(states[0, 2:], true_velocity, atol=15.0)
+    # Started with a 500 px/s velocity standard deviation; measurements pull it well down
+    assert np.sqrt(covariances[0, 2, 2]) < 100.0
+
+
+def test_association_prefers_the_global_optimum():
+    # Greedy would hand track 10 to detection 0 and leave detection 1 unmatched
+    rows = np.array([0, 0, 1])
+    cols = np.array([10, 11, 10])
+    costs = np.array([0.1, 0.2, 0.15])
+    matches = solve_sparse_assignment(rows, cols, costs)
+
+    assert sorted(map(tuple, matches.tolist())) == [(0, 11), (1, 10)]
+
+
+def test_association_gate_rejects_distant_pairs():
+    tracks = np.array([car(100, 100), car(100, 100)], dtype=np.float32)
+    detections = np.array([car(110, 100), car(400, 100)], dtype=np.float32)
+    costs = pair_costs(detections, tracks, np.array([50.0, 50.0]))
+
+    assert costs[0] < 1.0
+    assert costs[1] == INVALID_COST
+    assert len(solve_sparse_assignment(np.array([0, 1]), np.array([0, 0]), costs)) == 1
+
+
+def test_track_store_reuses_released_slots():
+    store = TrackStore(capacity=4)
+    slots = store.allocate(3)
+    assert slots.tolist() == [0, 1, 2]
+
+    store.age[slots] = [0, 5, 0]
+    assert store.age_out(max_age=5).tolist() == [1]
+    assert len(store) == 2
+
+    # The freed slot is handed out again before the store grows
+    assert store.allocate(1).tolist() == [1]
+    store.ids[[0, 1, 2]] = [7, 8, 9]
+    grown = store.allocate(3)
+    assert store.capacity == 8
+    assert grown.tolist() == [3, 4, 5]
+    assert store.ids[[0, 1, 2]].tolist() == [7, 8, 9]
+
+
+def test_history_ring_keeps_the_latest_centers():
+    store = TrackStore(capacity=2, history_length=3)
+    slots = store.allocate(2)
+    for step in range(5):
+        store.push_history(slots, np.array([[step, 0], [0, step]], dtype=np.float32))
+
+    assert store.recent_centers(slots[0])[:, 0].tolist() == [2, 3, 4]
+    assert store.recent_centers(slots[1])[:, 1].tolist() == [2, 3, 4]
+
+    # A reused slot starts with an empty history, including across growth
+    store.release(slots[:1])
+    reused = store.allocate(1)[0]
+    assert len(store.recent_centers(reused)) == 0
+    store.push_history(np.array([reused]), np.array([[9, 9]], dtype=np.float32))
+    store.allocate(2)
+    assert store.recent_centers(reused).tolist() == [[9, 9]]
+    assert store.recent_centers(slots[1])[:, 1].tolist() == [2, 3, 4]
+
+
+def test_radius_and_zone_queries_match_a_full_scan(monkeypatch):
+    use_clock(monkeypatch, [1000.0])
+    tracker = VehicleTracker()
+    rng = np.random.default_rng(1)
+    centers = rng.uniform(0, 1000, size=(200, 2))
+    boxes = np.array([car(x, y, 10, 10) for x, y in centers], dtype=np.float32)
+    ids, _ = tracker.update(boxes, np.full(len(boxes), 0.9), np.full(len(boxes), 2), (1000, 1000))
+
+    center, radius = (400.0, 500.0), 150.0
+    near = np.sqrt(((centers - center) ** 2).sum(axis=1)) <= radius
+    assert sorted(tracker.tracks_near(center, radius)) == sorted(ids[near].tolist())
+
+    zone = np.array([[100, 100], [600, 150], [500, 700], [150, 600]])
+    inside = points_in_polygon(centers, zone)
+    assert sorted(tracker.tracks_in_zone(zone)) == sorted(ids[inside].tolist())
+
+
+def test_queries_follow_moved_and_removed_tracks(monkeypatch):
+    clock = [1000.0]
+    use_clock(monkeypatch, clock)
+    tracker = VehicleTracker()
+    tracker.update(np.array([car(100, 100), car(800, 800)], dtype=np.float32), np.array([0.9, 0.9]),
+                   np.array([2, 2]), (1000, 1000))
+    assert tracker.tracks_near((100, 100), 50) == [0]
+
+    # The first car drives across several cells; the second is no longer detected
+    for step in range(1, 6):
+        clock[0] = 1000.0 + step * 0.1
+        tracker.update(np.array([car(100 + 60 * step, 100)], dtype=np.float32), np.array([0.9]),
+                       np.array([2]), (1000, 1000))
+    assert tracker.tracks_near((100, 100), 50) == []
+    assert tracker.tracks_near((400, 100), 50) == [0]
+
+    tracker.max_tracking_age = 1
+    clock[0] += 0.1
+    tracker.update(np.zeros((0, 4), dtype=np.float32), np.zeros(0), np.zeros(0, dtype=int), (1000, 1000))
+    assert tracker.tracks_in_zone([[0, 0], [1000, 0], [1000, 1000], [0, 1000]]) == []
+    assert not tracker.grid.cells
@@ -0,0 +1,87 @@
+import time
+from typing import Dict, List, Optional, Sequence, Tuple
+
+
+class QualityController:
+    """Per-stream feedback loop trading frame rate and resolution against latency.
+
+    Quality levels run from the best setting (``min_skip`` at the largest
+    image size) to the cheapest one, alternately raising the frame skip and
+    dropping to the next smaller model input size. A smoothed end-to-end
+    latency above ``budget`` steps one level down; sustained headroom below
+    ``headroom * budget`` steps back up. At least ``cooldown`` seconds and
+    ``min_samples`` inferred frames must pass between steps, so each change
+    takes effect before it is judged.
+    """
+
+    def __init__(self, budget: float = 0.25, min_skip: int = 2, max_skip: int = 6,
+                 image_sizes: Sequence[int] = (640, 512, 416, 320), headroom: float = 0.6,
+                 cooldown: float = 2.0, min_samples: int = 5, alpha: float = 0.2):
+        self.budget = budget  # Target seconds from frame receipt to result
+        self.headroom = headroom
+        self.cooldown = cooldown
+        self.min_samples = min_samples
+        self.alpha = alpha  # EWMA weight of the newest latency sample
+        self.levels = self._build_levels(min_skip, max_skip, sorted(image_sizes, reverse=True))
+        self.level = 0
+        self.latency: Optional[float] = None
+        self.samples = 0  # Samples since the last change
+        self.last_change = 0.0
+        self.steps_down = 0
+        self.steps_up = 0
+
+    @staticmethod
+    def _build_levels(min_skip: int, max_skip: int, image_sizes: List[int]) -> List[Tuple[int, int]]:
+        skip, size_index = min_skip, 0
+        levels = [(skip, image_sizes[0])]
+        while skip < max_skip or size_index < len(image_sizes) - 1:
+            if size_index == len(image_sizes) - 1 or (len(levels) % 2 == 1 and skip < max_skip):
+                skip += 1
+            else:
+                size_index += 1
+            levels.append((skip, image_sizes[size_index]))
+        return levels
+
+    @property
+    def frame_skip(self) -> int:
+        return self.levels[self.level][0]
+
+    @property
+    def image_size(self) -> int:
+        return self.levels[self.level][1]
+
+    def observe(self, latency: float, now: Optional[float] = None) -> bool:
+        """Record one inferred frame's latency; returns True if the setting changed."""
+        now = time.monotonic() if now is None else now
+        self.latency = latency if self.latency is None else \
+            self.alpha * latency + (1 - self.alpha) * self.latency
+        self.samples += 1
+        if self.samples < self.min_samples or now - self.last_change < self.cooldown:
+            return False
+
+        if self.latency > self.budget and self.level < len(self.levels) - 1:
+            self.level += 1
+            self.steps_down += 1
+        elif self.latency < self.budget * self.headroom and self.level > 0:
+            self.level -= 1
+            self.steps_up += 1
+        else:
+            return False
+        self.last_change = now
+        # Judge the new setting on fresh samples only
+        self.latency = None
+        self.samples = 0
+        return True
+
+    def setting(self) -> Dict:
+        return {
+            'level': self.level,
+            'degraded': self.level > 0,
+            'frame_skip': self.frame_skip,
+            'image_size': self.image_size,
+            'latency_ms': round(self.latency * 1000, 1) if self.latency is not None else None
+        }
+
+    def stats(self) -> Dict:
+        return dict(self.setting(), levels=len(self.levels), budget_ms=self.budget * 1000,
+                    steps_down=self.steps_down, steps_up=self.steps_up)
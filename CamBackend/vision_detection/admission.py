@@ -0,0 +1,239 @@
+import asyncio
+import logging
+import math
+import time
+from typing import Callable, Dict, List, Optional
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Priority classes, most important first; cameras pick one with "priority" in cameras.json
+PRIORITIES = ('high', 'normal', 'low')
+
+
+class StreamAdmission:
+    """Per-stream admission ticket: a token bucket refilled at the stream's allowed rate.
+
+    The analyzer asks ``admit`` for every frame that would go to the model.
+    While the stream is not limited (``allowed_rate`` is None) every frame is
+    admitted; otherwise frames beyond the allowed rate are shed. Offered
+    frames are counted either way, so the stream's demand is still measured
+    while it is being limited.
+    """
+
+    def __init__(self, controller: 'AdmissionController', stream_id: str, priority: str):
+        self.controller = controller
+        self.stream_id = stream_id
+        self.priority = priority
+        self.rank = PRIORITIES.index(priority)
+        self.allowed_rate: Optional[float] = None  # Inferences per second, None for unlimited
+        self.demand = 0.0  # Smoothed inferences per second the stream asks for
+        self.measured = False
+        self.offered = 0  # Frames offered since the last rebalance
+        self.tokens = 1.0
+        self.refilled_at = time.monotonic()
+        self.admitted_total = 0
+        self.shed_total = 0
+
+    def admit(self, now: Optional[float] = None) -> bool:
+        now = time.monotonic() if now is None else now
+        self.offered += 1
+        if self.allowed_rate is None:
+            self.admitted_total += 1
+            return True
+        # At most one frame's worth of burst, so admitted frames stay evenly spaced
+        self.tokens = min(self.tokens + (now - self.refilled_at) * self.allowed_rate, 1.0)
+        self.refilled_at = now
+        if self.tokens >= 1.0:
+            self.tokens -= 1.0
+            self.admitted_total += 1
+            return True
+        self.shed_total += 1
+        return False
+
+    def overloaded(self):
+        """The inference queue was full or timed out on one of this stream's frames."""
+        self.controller.overloads += 1
+
+    @property
+    def admitted_rate(self) -> float:
+        """Inferences per second this stream gets: its demand, or less while it is limited."""
+        return min(self.demand, self.allowed_rate) if self.allowed_rate is not None else self.demand
+
+    @property
+    def shedding(self) -> bool:
+        return self.allowed_rate is not None and self.allowed_rate < self.demand
+
+    def decision(self) -> Dict:
+        """The admission decision in effect, reported with this stream's results."""
+        return {
+            'priority': self.priority,
+            'shedding': self.shedding,
+            'allowed_fps': round(self.allowed_rate, 2) if self.allowed_rate is not None else None,
+            'demand_fps': round(self.demand, 2),
+            'shed_frames': self.shed_total
+        }
+
+
+class AdmissionController:
+    """Shares a global inference budget between streams by priority class.
+
+    Every ``period`` seconds each stream's demand (inferences per second it
+    asked for) is re-measured and the budget is handed out class by class,
+    highest priority first. Within a class it is split max-min fairly. A
+    class whose demand fits keeps running unlimited; otherwise its streams
+    are rate-limited and every lower class drops to ``min_rate``. Frame
+    rates of low-priority streams are therefore lowered first.
+
+    ``budget`` is the configured ceiling in inferences per second (0 for
+    none). The budget in effect also adapts to load. ``latency`` reports the
+    mean submit-to-result time of recent inferences (for example
+    ``BatchScheduler.take_latency``). When that goes over
+    ``target_latency`` the budget is cut below what was actually being
+    admitted, in proportion to the overshoot (by 10% to 50%). Frames that
+    hit a full inference queue or time out cut it by 20%. A cut never goes
+    below what the classes above the lowest sheddable one ask for, so a
+    higher class is only limited once every class below it is down to
+    ``min_rate``. Latency alone never limits the highest class present;
+    only the configured budget or dropped frames do. Once latency is well
+    under the target, the budget grows back by 10% per period and follows
+    any stream that is not being shed.
+    """
+
+    def __init__(self, budget: float = 0.0, min_rate: float = 0.5, period: float = 1.0, alpha: float = 0.5,
+                 latency: Optional[Callable[[], Optional[float]]] = None, target_latency: float = 0.25):
+        self.budget = budget
+        self.min_rate = min_rate  # Floor so no stream is starved completely
+        self.period = period
+        self.alpha = alpha  # Smoothing of the demand estimates
+        self.latency = latency
+        self.target_latency = target_latency  # Seconds
+        self.last_latency: Optional[float] = None
+        self.effective_budget = budget if budget > 0 else math.inf
+        self.streams: Dict[str, StreamAdmission] = {}
+        self.overloads = 0
+        self.overloads_total = 0
+        self._rebalanced_at = time.monotonic()
+        self._task: Optional[asyncio.Task] = None
+
+    def register(self, stream_id: str, priority: Optional[str] = None) -> StreamAdmission:
+        if priority not in PRIORITIES:
+            if priority is not None:
+                logger.warning(f"Unknown priority {priority!r} for stream {stream_id}, using 'normal'")
+            priority = 'normal'
+        stream = StreamAdmission(self, stream_id, priority)
+        self.streams[stream_id] = stream
+        return stream
+
+    def remove(self, stream_id: str):
+        self.streams.pop(stream_id, None)
+
+    def rebalance(self, now: Optional[float] = None):
+        now = time.monotonic() if now is None else now
+        elapsed = max(now - self._rebalanced_at, 1e-6)
+        self._rebalanced_at = now
+        for stream in self.streams.values():
+            rate = stream.offered / elapsed
+            # The first measurement is taken as is rather than smoothed up from zero
+            stream.demand = self.alpha * rate + (1 - self.alpha) * stream.demand if stream.measured else rate
+            stream.measured = True
+            stream.offered = 0
+        admitted_rate = sum(stream.admitted_rate for stream in self.streams.values())
+
+        ceiling = self.budget if self.budget > 0 else math.inf
+        latency = self.latency() if self.latency is not None else None
+        self.last_latency = latency
+        slow = latency is not None and latency > self.target_latency
+        if self.overloads or slow:
+            self.overloads_total += self.overloads
+            # Cut in proportion to how far latency is over target, but only ever out of
+            # the lowest class that is still above min_rate
+            factor = 0.8 if self.overloads else max(min(self.target_latency / latency, 0.9), 0.5)
+            self.effective_budget = min(max(min(self.effective_budget, admitted_rate) * factor,
+                                            self._shed_floor(spare_top=not self.overloads)), ceiling)
+            if slow:
+                reason = f"latency {latency * 1000:.0f} ms over {self.target_latency * 1000:.0f} ms target"
+            else:
+                reason = f"{self.overloads} frames dropped"
+            logger.warning(f"Inference overloaded ({reason}), budget lowered to {self.effective_budget:.1f} fps")
+            self.overloads = 0
+        elif latency is not None and latency > self.target_latency * 0.75:
+            # Close to the target: keep serving what is being served, but no more
+            self.effective_budget = min(max(self.effective_budget, admitted_rate), ceiling)
+        elif self.effective_budget < ceiling:
+            # Streams that are not shed may ask for more as latency drops; the budget follows them
+            self.effective_budget = max(self.effective_budget, admitted_rate) * 1.1
+            if self.budget <= 0 and self.effective_budget > 2 * admitted_rate + self.min_rate:
+                # Well clear of any recent overload and no configured ceiling
+                self.effective_budget = math.inf
+            self.effective_budget = min(self.effective_budget, ceiling)
+
+        self._allocate()
+
+    def _shed_floor(self, spare_top: bool) -> float:
+        """Smallest budget that leaves every class above the lowest sheddable one untouched.
+
+        With ``spare_top`` the highest class present is never sheddable: if
+        latency stays over target with everything below it at ``min_rate``,
+        the model is simply slower than the target and shedding the most
+        important streams would not help anyone.
+        """
+        ranks = sorted({stream.rank for stream in self.streams.values()})
+        if not ranks:
+            return 0.0
+        floor_rank = ranks[0] + 1 if spare_top else ranks[0]
+        for rank in reversed(ranks[1:] if spare_top else ranks):
+            if any(stream.admitted_rate > self.min_rate for stream in self.streams.values() if stream.rank == rank):
+                floor_rank = rank
+                break
+        above = sum(stream.demand for stream in self.streams.values() if stream.rank < floor_rank)
+        return above + self.min_rate * sum(1 for stream in self.streams.values() if stream.rank >= floor_rank)
+
+    def _allocate(self):
+        remaining = self.effective_budget
+        for rank in range(len(PRIORITIES)):
+            group = [stream for stream in self.streams.values() if stream.rank == rank]
+            if not group:
+                continue
+            if sum(stream.demand for stream in group) <= remaining:
+                for stream in group:
+                    stream.allowed_rate = None
+                remaining -= sum(stream.demand for stream in group)
+                continue
+            # Max-min fair split: small consumers get their demand, the rest share what is left
+            group.sort(key=lambda stream: stream.demand)
+            for index, stream in enumerate(group):
+                share = remaining / (len(group) - index)
+                stream.allowed_rate = max(min(stream.demand, share), self.min_rate)
+                remaining = max(remaining - stream.allowed_rate, 0.0)
+            remaining = 0.0
+
+    async def _rebalance_periodically(self):
+        while True:
+            await asyncio.sleep(self.period)
+            try:
+                self.rebalance()
+            except Exception as e:
+                logger.error(f"Error rebalancing inference budget: {str(e)}")
+
+    def start(self):
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self._rebalance_periodically())
+
+    def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+
+    def by_priority(self) -> List[StreamAdmission]:
+        return sorted(self.streams.values(), key=lambda stream: (stream.rank, stream.stream_id))
+
+    def stats(self) -> Dict:
+        return {
+            'budget_fps': self.budget or None,
+            'effective_budget_fps': round(self.effective_budget, 2) if math.isfinite(self.effective_budget) else None,
+            'overloads': self.overloads_total,
+            'latency_ms': round(self.last_latency * 1000, 1) if self.last_latency is not None else None,
+            'target_latency_ms': round(self.target_latency * 1000, 1),
+            'streams': {stream.stream_id: stream.decision() for stream in self.by_priority()}
+        }
@@ -1,12 +1,22 @@
-import torch
-from ultralytics import YOLO
 from datetime import datetime
+import time
 import cv2
 import numpy as np
-from collections import deque
-from typing import Dict
+from typing import Dict, Hashable, Optional
 import logging
-import os
+from . import config
+from .adaptive import QualityController
+from .admission import StreamAdmission
+from .association import box_centers, pair_costs, solve_sparse_assignment
+from .batching import BatchScheduler
+from .inference import InferenceExecutor, InferenceQueueFull, InferenceTimeout
+from .kalman import kalman_init, kalman_predict, kalman_update
+from .models import registry
+from .motion import MotionGate
+from .roi import RegionOfInterest
+from .rolling import RollingStats
+from .spatial import SpatialHashGrid
+from .tracks import TrackStore
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -22,189 +32,242 @@ VEHICLE_CLASSES = {
     7: 'truck'
 }
 
-def initialize_models():
-    """Initialize YOLO models with proper error handling"""
-    try:
-        logger.info("Initializing YOLO models...")
-        
-        # Check if model file exists
-        model_path = 'yolov8n.pt'
-        if not os.path.exists(model_path):
-            logger.error(f"Model file not found: {model_path}")
-            raise FileNotFoundError(f"Model file not found: {model_path}")
-        
-        # YOLOv8 model for vehicle detection with optimized settings
-        vehicle_model = YOLO(model_path)
-        vehicle_model.conf = 0.3  # Lower confidence threshold for better detection
-        vehicle_model.iou = 0.45  # Lower IOU threshold
-        vehicle_model.max_det = 50  # Limit maximum detections
-        vehicle_model.classes = [0, 1, 2, 3, 5, 7]  # Only detect relevant classes
-        
-        # Configure model for GPU inference if available
-        device = 'cuda' if torch.cuda.is_available() else 'cpu'
-        logger.info(f"Using device: {device}")
-        vehicle_model.to(device)
-        
-        # Test model with a dummy inference
-        dummy_img = np.zeros((640, 640, 3), dtype=np.uint8)
-        vehicle_model(dummy_img, verbose=False)
-        
-        logger.info("Models initialized successfully")
-        return vehicle_model
-        
-    except Exception as e:
-        logger.error(f"Error initializing models: {str(e)}")
-        raise
-
-# Initialize models
-try:
-    vehicle_model = initialize_models()
-except Exception as e:
-    logger.error(f"Failed to initialize models: {str(e)}")
-    raise
+# Detections at or below this confidence are discarded
+CONFIDENCE_THRESHOLD = 0.3
+
+def detect_batch(frames, image_size=None):
+    """Blocking batched model call, executed on an inference worker thread."""
+    return registry.get(image_size=image_size)(frames)
+
+def _lap(timings: Dict[str, float], stage: str, mark: float) -> float:
+    """Record the time since ``mark`` as ``stage`` and return the new mark."""
+    now = time.perf_counter()
+    timings[stage] = now - mark
+    return now
+
+def extract_detections(results):
+    """Flatten model results into (xyxy, confidence, class_id) arrays of relevant objects.
+
+    Results from inference worker processes arrive already extracted as
+    (xyxy, confidence, class_id) tuples and are passed through.
+    """
+    if len(results) == 1 and isinstance(results[0], tuple):
+        return results[0]
+    xyxys, confs, cls_ids = [], [], []
+    for result in results:
+        boxes = result.boxes
+        if len(boxes) == 0:
+            continue
+        xyxys.append(boxes.xyxy.cpu().numpy())
+        confs.append(boxes.conf.cpu().numpy())
+        cls_ids.append(boxes.cls.cpu().numpy().astype(int))
+    if not xyxys:
+        return np.zeros((0, 4), dtype=np.float32), np.zeros(0, dtype=np.float32), np.zeros(0, dtype=int)
+
+    xyxys = np.concatenate(xyxys).astype(np.float32)
+    confs = np.concatenate(confs).astype(np.float32)
+    cls_ids = np.concatenate(cls_ids)
+    keep = (confs > CONFIDENCE_THRESHOLD) & np.isin(cls_ids, list(VEHICLE_CLASSES))
+    return xyxys[keep], confs[keep], cls_ids[keep]
+
+# Lookup table from COCO class ID to its slot in VEHICLE_CLASSES, for bincount
+_CLASS_INDEX = np.full(max(VEHICLE_CLASSES) + 1, -1, dtype=int)
+_CLASS_INDEX[list(VEHICLE_CLASSES)] = np.arange(len(VEHICLE_CLASSES))
+
+def count_by_type(cls_ids):
+    """Per-type object counts for an array of class IDs, as one bincount."""
+    counts = np.bincount(_CLASS_INDEX[cls_ids], minlength=len(VEHICLE_CLASSES)) if len(cls_ids) \
+        else np.zeros(len(VEHICLE_CLASSES), dtype=int)
+    return {name: int(count) for name, count in zip(VEHICLE_CLASSES.values(), counts)}
 
 class VehicleTracker:
     def __init__(self):
-        self.tracked_vehicles = {}
+        self.tracks = TrackStore(capacity=128, history_length=8)
+        self.grid = SpatialHashGrid(self.tracks, cell_size=96.0)  # Index over track centers
         self.next_id = 0
         self.speed_threshold = 50  # km/h
         self.min_distance = 20  # pixels
+        self.min_iou = 0.1  # Minimum overlap for a detection to continue a track
         self.max_tracking_age = 15  # Reduced for faster cleanup
-        self.position_history = {}
-        self.history_length = 3  # Reduced for smoother tracking
-        self.cleanup_interval = 5  # Frames between cleanup operations
+        self.acceleration_std = 200.0  # Kalman process noise, pixels/s^2
+        self.measurement_std = 5.0  # Kalman measurement noise, pixels
+        self.gate_sigmas = 2.0  # Association gate in predicted position standard deviations
+        self.max_gate = 400.0  # pixels
         self.frame_count = 0
-        self.last_cleanup = 0
-
-    def _match_vehicle(self, center, area):
-        """Match a detected vehicle with existing tracked vehicles based on position and size."""
-        min_dist = float('inf')
-        matched_id = None
-        
-        for vid, vehicle in self.tracked_vehicles.items():
-            # Calculate Euclidean distance between centers
-            dx = center[0] - vehicle['center'][0]
-            dy = center[1] - vehicle['center'][1]
-            dist = (dx * dx + dy * dy) ** 0.5
-            
-            # Check if distance is within threshold
-            if dist < min_dist and dist < self.min_distance * (1 + abs(vehicle.get('speed', 0)) / 50):
-                min_dist = dist
-                matched_id = vid
-        
-        if matched_id is None:
-            matched_id = self.next_id
-            self.next_id += 1
-            
-        return matched_id
 
-    def update(self, detections, frame_size):
+    def predict(self, timestamp=None):
+        """Coast every track to ``timestamp`` with its motion model (used on skipped frames)."""
+        slots = self.tracks.active_slots()
+        if not len(slots):
+            return
+        now = (timestamp or datetime.now()).timestamp()
+        tracks = self.tracks
+        dts = np.maximum(now - tracks.predicted_at[slots], 0)
+        tracks.state[slots], tracks.covariance[slots] = kalman_predict(
+            tracks.state[slots], tracks.covariance[slots], dts, self.acceleration_std
+        )
+        tracks.predicted_at[slots] = now
+        self._place_boxes(slots)
+        self.grid.update(slots)
+
+    def _place_boxes(self, slots):
+        """Move track boxes to their filtered centers, keeping the last measured sizes."""
+        half = self.tracks.size[slots] / 2
+        centers = self.tracks.state[slots, :2]
+        self.tracks.bbox[slots] = np.concatenate([centers - half, centers + half], axis=1)
+
+    def _associate(self, boxes, slots):
+        """Match detections to live track slots in one optimal pass; -1 marks a new track."""
+        det_slots = np.full(len(boxes), -1, dtype=np.int64)
+        if not len(slots) or not len(boxes):
+            return det_slots
+
+        # Gate grows with the filter's position uncertainty, so young tracks and
+        # tracks coasted through skipped frames can still be picked up
+        position_variance = self.tracks.covariance[slots][:, [0, 1], [0, 1]].max(axis=1)
+        gates = np.minimum(self.min_distance + self.gate_sigmas * np.sqrt(position_variance), self.max_gate)
+        slot_gates = np.zeros(self.tracks.capacity)
+        slot_gates[slots] = gates
+
+        # Settled tracks only compete for detections in neighboring grid cells;
+        # the few tracks with gates wider than a cell are checked against all
+        det_index, pair_slots = self.grid.neighbor_pairs(box_centers(boxes))
+        narrow = slot_gates[pair_slots] <= self.grid.cell_size
+        det_index, pair_slots = det_index[narrow], pair_slots[narrow]
+        wide_slots = slots[gates > self.grid.cell_size]
+        if len(wide_slots):
+            det_index = np.concatenate([det_index, np.repeat(np.arange(len(boxes)), len(wide_slots))])
+            pair_slots = np.concatenate([pair_slots, np.tile(wide_slots, len(boxes))])
+        if not len(det_index):
+            return det_slots
+
+        # Track boxes are the motion model's predictions for this frame
+        costs = pair_costs(boxes[det_index], self.tracks.bbox[pair_slots], slot_gates[pair_slots], self.min_iou)
+        matches = solve_sparse_assignment(det_index, pair_slots, costs)
+        det_slots[matches[:, 0]] = matches[:, 1]
+        return det_slots
+
+    def update(self, boxes, confs, cls_ids, frame_size):
+        """Update tracks with this frame's detections; returns (track IDs, violations)."""
         self.frame_count += 1
-        current_vehicles = {}
-        violations = []
+        tracks = self.tracks
         current_time = datetime.now()
-        
-        # Process new detections
-        detected_ids = set()
-        for det in detections:
-            for box in det.boxes:
-                try:
-                    # Fast tensor to numpy conversion
-                    xyxy = box.xyxy[0].cpu().numpy()
-                    x1, y1, x2, y2 = map(int, xyxy)
-                    conf = float(box.conf[0].cpu().numpy())
-                    cls_id = int(box.cls[0].cpu().numpy())
-                    
-                    if cls_id in VEHICLE_CLASSES and conf > 0.3:
-                        center = ((x1 + x2) // 2, (y1 + y2) // 2)
-                        vehicle_type = VEHICLE_CLASSES[cls_id]
-                        
-                        # Fast vehicle matching
-                        vehicle_id = self._match_vehicle(center, (x2-x1)*(y2-y1))
-                        detected_ids.add(vehicle_id)
-                        
-                        if vehicle_id not in self.position_history:
-                            self.position_history[vehicle_id] = deque(maxlen=self.history_length)
-                        
-                        self.position_history[vehicle_id].append(center)
-                        
-                        # Efficient position smoothing
-                        if len(self.position_history[vehicle_id]) > 1:
-                            positions = np.array(self.position_history[vehicle_id])
-                            smoothed_center = tuple(map(int, np.mean(positions, axis=0)))
-                        else:
-                            smoothed_center = center
-                        
-                        current_vehicles[vehicle_id] = {
-                            'center': smoothed_center,
-                            'type': vehicle_type,
-                            'bbox': (x1, y1, x2, y2),
-                            'timestamp': current_time,
-                            'speed': 0,
-                            'confidence': conf,
-                            'tracking_age': 0
-                        }
-                        
-                        # Update speed and check violations
-                        if vehicle_id in self.tracked_vehicles:
-                            self._update_vehicle_speed(vehicle_id, current_vehicles, violations)
-                            
-                except Exception as e:
-                    logger.error(f"Error processing detection: {str(e)}")
-                    continue
-        
-        # Efficient cleanup of old tracks
-        if self.frame_count - self.last_cleanup >= self.cleanup_interval:
-            self._cleanup_old_tracks(current_vehicles, detected_ids)
-            self.last_cleanup = self.frame_count
-        
-        self.tracked_vehicles = current_vehicles
-        return violations
-
-    def _update_vehicle_speed(self, vehicle_id, current_vehicles, violations):
-        prev = self.tracked_vehicles[vehicle_id]
-        time_diff = (current_vehicles[vehicle_id]['timestamp'] - prev['timestamp']).total_seconds()
-        
-        if time_diff > 0:
-            # Calculate speed using numpy for efficiency
-            curr_pos = np.array(current_vehicles[vehicle_id]['center'])
-            prev_pos = np.array(prev['center'])
-            distance = np.linalg.norm(curr_pos - prev_pos)
-            
-            current_speed = distance / time_diff * 3.6
-            prev_speed = prev.get('speed', 0)
-            smoothed_speed = 0.7 * current_speed + 0.3 * prev_speed
-            current_vehicles[vehicle_id]['speed'] = smoothed_speed
-            
-            if smoothed_speed > self.speed_threshold * 1.1:
-                violations.append({
-                    'type': 'speed',
-                    'vehicle_id': vehicle_id,
-                    'vehicle_type': current_vehicles[vehicle_id]['type'],
-                    'speed': smoothed_speed,
-                    'timestamp': current_vehicles[vehicle_id]['timestamp'].isoformat()
-                })
+        now = current_time.timestamp()
+
+        self.predict(current_time)
+        live_slots = tracks.active_slots()
+        det_slots = self._associate(boxes, live_slots)
+        centers = box_centers(boxes).astype(np.float64) if len(boxes) else np.zeros((0, 2))
+
+        # Correct matched tracks in one batched filter step
+        matched = np.flatnonzero(det_slots >= 0)
+        matched_slots = det_slots[matched]
+        if len(matched):
+            tracks.state[matched_slots], tracks.covariance[matched_slots] = kalman_update(
+                tracks.state[matched_slots], tracks.covariance[matched_slots],
+                centers[matched], self.measurement_std
+            )
+            # The filter's velocity estimate is already smoothed across frames,
+            # including frames the tracker only coasted through
+            tracks.speed[matched_slots] = np.linalg.norm(tracks.state[matched_slots, 2:], axis=1) * 3.6
+
+        # Start new tracks for unmatched detections
+        new = np.flatnonzero(det_slots < 0)
+        if len(new):
+            new_slots = tracks.allocate(len(new))
+            det_slots[new] = new_slots
+            tracks.ids[new_slots] = np.arange(self.next_id, self.next_id + len(new))
+            self.next_id += len(new)
+            tracks.state[new_slots], tracks.covariance[new_slots] = kalman_init(centers[new], self.measurement_std)
+
+        if len(boxes):
+            tracks.size[det_slots] = boxes[:, 2:] - boxes[:, :2]
+            tracks.class_id[det_slots] = cls_ids
+            tracks.confidence[det_slots] = confs
+            tracks.age[det_slots] = 0
+            tracks.hits[det_slots] += 1
+            tracks.last_seen[det_slots] = now
+            tracks.predicted_at[det_slots] = now
+            self._place_boxes(det_slots)
+            tracks.push_history(det_slots, tracks.state[det_slots, :2])
+            self.grid.update(det_slots)
+
+        # Age tracks that were not seen this frame and drop the stale ones
+        unseen = np.setdiff1d(live_slots, det_slots)
+        tracks.age[unseen] += 1
+        self.grid.remove(tracks.age_out(self.max_tracking_age))
+
+        return tracks.ids[det_slots], self._speed_violations(matched_slots, current_time)
+
+    def _speed_violations(self, slots, current_time):
+        speeding = slots[self.tracks.speed[slots] > self.speed_threshold * 1.1]
+        timestamp = current_time.isoformat()
+        return [
+            {
+                'type': 'speed',
+                'vehicle_id': int(self.tracks.ids[slot]),
+                'vehicle_type': VEHICLE_CLASSES[int(self.tracks.class_id[slot])],
+                'speed': float(self.tracks.speed[slot]),
+                'timestamp': timestamp
+            }
+            for slot in speeding
+        ]
+
+    def tracks_near(self, center, radius):
+        """IDs of live tracks within ``radius`` pixels of ``center``."""
+        return self.tracks.ids[self.grid.query_radius(center, radius)].tolist()
+
+    def tracks_in_zone(self, polygon):
+        """IDs of live tracks whose centers lie inside ``polygon`` (e.g. a violation zone)."""
+        return self.tracks.ids[self.grid.query_polygon(polygon)].tolist()
+
+    def current_boxes(self, ids) -> Dict[int, list]:
+        """Latest (predicted) integer boxes of the live tracks among ``ids``."""
+        slots = self.tracks.active_slots()
+        wanted = np.asarray(ids, dtype=np.int64)
+        if not len(slots) or not len(wanted):
+            return {}
+        order = np.argsort(self.tracks.ids[slots])
+        sorted_ids, sorted_slots = self.tracks.ids[slots][order], slots[order]
+        index = np.minimum(np.searchsorted(sorted_ids, wanted), len(sorted_ids) - 1)
+        found = sorted_ids[index] == wanted
+        boxes = self.tracks.bbox[sorted_slots[index[found]]].astype(int).tolist()
+        return dict(zip(wanted[found].tolist(), boxes))
 
-    def _cleanup_old_tracks(self, current_vehicles, detected_ids):
-        for vid in list(self.tracked_vehicles.keys()):
-            if vid not in detected_ids:
-                tracking_age = self.tracked_vehicles[vid].get('tracking_age', 0) + 1
-                if tracking_age < self.max_tracking_age:
-                    current_vehicles[vid] = self.tracked_vehicles[vid].copy()
-                    current_vehicles[vid]['tracking_age'] = tracking_age
-                else:
-                    if vid in self.position_history:
-                        del self.position_history[vid]
+    def average_speed(self) -> float:
+        slots = self.tracks.active
+        return float(self.tracks.speed[slots].mean()) if slots.any() else 0.0
+
+    def active_count(self) -> int:
+        return int(self.tracks.active.sum())
+
+    def measured_speeds(self) -> np.ndarray:
+        """Speeds of live tracks matched more than once; a new track has no velocity yet."""
+        return self.tracks.speed[self.tracks.active & (self.tracks.hits > 1)]
 
 class TrafficAnalyzer:
-    def __init__(self):
+    def __init__(self, scheduler: Optional[BatchScheduler] = None, frame_skip: int = 2,
+                 roi: Optional[RegionOfInterest] = None, motion_gate: Optional[MotionGate] = None,
+                 controller: Optional[QualityController] = None, rolling: Optional[RollingStats] = None,
+                 admission: Optional[StreamAdmission] = None):
         self.vehicle_tracker = VehicleTracker()
-        self.frame_skip = 2  # Process every nth frame
+        self.scheduler = scheduler or BatchScheduler(InferenceExecutor(), detect_batch)
+        self.frame_skip = frame_skip  # Process every nth frame, tracks coast in between
+        self.image_size = config.MODEL_IMAGE_SIZE  # Model input size
+        self.max_width = 1280  # Frames are downscaled to this width before processing
+        self.controller = controller  # Adapts frame_skip and image_size to latency
+        if controller is not None:
+            self.frame_skip, self.image_size = controller.frame_skip, controller.image_size
         self.frame_count = 0
         self.last_frame_time = None
         self.fps_alpha = 0.1
         self.processing = False
         self.max_congestion_vehicles = 50  # Maximum number of vehicles for 100% congestion
+        self.roi = roi  # Only this part of a fixed camera's view is sent to the model
+        self.motion_gate = motion_gate  # Skips inference while the view is static
+        self.rolling = rolling  # Traffic statistics over recent minutes
+        self.admission = admission  # Sheds frames when the server is over its inference budget
+        self.last_response = None
 
     def calculate_congestion(self, total_vehicles, frame_shape):
         """Calculate congestion level based on vehicle count and frame size."""
@@ -213,14 +276,25 @@ class TrafficAnalyzer:
         congestion = min(total_vehicles / normalized_max, 1.0) if normalized_max > 0 else 0
         return float(congestion)
 
-    async def analyze_frame(self, frame) -> Dict:
+    async def analyze_frame(self, frame, stream_id: Optional[Hashable] = None,
+                            received_at: Optional[float] = None,
+                            timings: Optional[Dict[str, float]] = None) -> Dict:
+        """Analyze one frame; ``received_at`` (time.monotonic) marks when it reached the server.
+
+        Per-stage durations (resize, inference, tracking, response) are written
+        into ``timings`` when the caller passes a dict.
+        """
         if self.processing:
             return None
             
+        received_at = received_at or time.monotonic()
+        timings = {} if timings is None else timings
         self.processing = True
         try:
             self.frame_count += 1
             if self.frame_count % self.frame_skip != 0:
+                # No inference on this frame; keep tracks moving with their motion model
+                self.vehicle_tracker.predict()
                 self.processing = False
                 return None
 
@@ -229,10 +303,11 @@ class TrafficAnalyzer:
                 return None
 
             # Resize frame for faster processing
+            mark = time.perf_counter()
             height, width = frame.shape[:2]
-            if width > 1280:  # Limit max width for processing
-                scale = 1280 / width
-                width = 1280
+            if width > self.max_width:  # Limit max width for processing
+                scale = self.max_width / width
+                width = self.max_width
                 height = int(height * scale)
                 frame = cv2.resize(frame, (width, height))
 
@@ -244,72 +319,80 @@ class TrafficAnalyzer:
                 fps = 30
             self.last_frame_time = current_time
 
-            # Run detection with batching and error handling
+            # Nothing moved since the last inference: carry its results forward
+            if self.motion_gate is not None:
+                region = self.roi.crop(frame) if self.roi is not None else frame
+                if not self.motion_gate.should_infer(region, current_time.timestamp()) \
+                        and self.last_response is not None:
+                    mark = _lap(timings, 'resize', mark)
+                    response = self._carry_forward(current_time, fps)
+                    _lap(timings, 'response', mark)
+                    return response
+
+            # Over this stream's share of the inference budget: shed the frame
+            if self.admission is not None and not self.admission.admit():
+                if self.last_response is None:
+                    return None
+                mark = _lap(timings, 'resize', mark)
+                response = self._carry_forward(current_time, fps)
+                _lap(timings, 'response', mark)
+                return response
+
+            # Crop to the region of interest and letterbox it to the model input size
+            if self.roi is not None:
+                model_input, transform = self.roi.prepare(frame, self.image_size)
+            else:
+                model_input, transform = frame, None
+            mark = _lap(timings, 'resize', mark)
+
+            # Run detection as part of a cross-stream batch on the inference threads
             try:
-                results = vehicle_model(frame, verbose=False)
+                results = await self.scheduler.submit(model_input, stream=stream_id, image_size=self.image_size)
                 if not results or len(results) == 0:
                     logger.warning("No detection results")
                     return self._create_empty_response(current_time, frame.shape[:2])
+            except (InferenceQueueFull, InferenceTimeout) as e:
+                logger.warning(f"Dropping frame: {str(e)}")
+                if self.admission is not None:
+                    self.admission.overloaded()
+                return None
             except Exception as e:
                 logger.error(f"Error in YOLO detection: {str(e)}")
                 return self._create_empty_response(current_time, frame.shape[:2])
+            mark = _lap(timings, 'inference', mark)
             
             # Process results
-            vehicle_count = {vtype: 0 for vtype in ['person', 'car', 'motorcycle', 'bus', 'truck', 'bicycle']}
-            total_vehicles = 0
-            detections = []
-            
-            # Efficient detection processing
-            for result in results:
-                boxes = result.boxes
-                if len(boxes) == 0:
-                    continue
-                    
-                try:
-                    # Batch process all detections
-                    cls_ids = boxes.cls.cpu().numpy().astype(int)
-                    confs = boxes.conf.cpu().numpy()
-                    xyxys = boxes.xyxy.cpu().numpy()
-                    
-                    for cls_id, conf, xyxy in zip(cls_ids, confs, xyxys):
-                        if conf > 0.3 and cls_id in VEHICLE_CLASSES:
-                            x1, y1, x2, y2 = map(int, xyxy)
-                            object_type = VEHICLE_CLASSES[cls_id]
-                            
-                            detections.append({
-                                'type': object_type,
-                                'confidence': float(conf),
-                                'bbox': [x1, y1, x2, y2],
-                                'id': None
-                            })
-                            
-                            if object_type in vehicle_count:
-                                vehicle_count[object_type] += 1
-                                total_vehicles += 1
-                except Exception as e:
-                    logger.error(f"Error processing detection box: {str(e)}")
-                    continue
-
-            # Update tracking with error handling
             try:
-                violations = self.vehicle_tracker.update(results, frame.shape[:2])
+                xyxys, confs, cls_ids = extract_detections(results)
+                if transform is not None:
+                    # Back to full-frame pixels, dropping anything outside the ROI polygon
+                    xyxys, inside = self.roi.restore(xyxys, transform, frame.shape)
+                    xyxys, confs, cls_ids = xyxys[inside], confs[inside], cls_ids[inside]
             except Exception as e:
-                logger.error(f"Error updating vehicle tracking: {str(e)}")
-                violations = []
+                logger.error(f"Error processing detection boxes: {str(e)}")
+                return self._create_empty_response(current_time, frame.shape[:2])
 
-            # Update detection IDs efficiently
+            # Update tracking with error handling; IDs come from the same association pass
             try:
-                for det in detections:
-                    bbox = det['bbox']
-                    center = ((bbox[0] + bbox[2]) // 2, (bbox[1] + bbox[3]) // 2)
-                    det['id'] = self.vehicle_tracker._match_vehicle(
-                        center,
-                        (bbox[2] - bbox[0]) * (bbox[3] - bbox[1])
-                    )
+                track_ids, violations = self.vehicle_tracker.update(xyxys, confs, cls_ids, frame.shape[:2])
             except Exception as e:
-                logger.error(f"Error updating detection IDs: {str(e)}")
+                logger.error(f"Error updating vehicle tracking: {str(e)}")
+                track_ids, violations = [None] * len(xyxys), []
+            mark = _lap(timings, 'tracking', mark)
 
-            return {
+            detections = []
+            for track_id, xyxy, conf, cls_id in zip(track_ids, xyxys.astype(int).tolist(), confs.tolist(), cls_ids.tolist()):
+                object_type = VEHICLE_CLASSES[cls_id]
+                detections.append({
+                    'type': object_type,
+                    'confidence': conf,
+                    'bbox': xyxy,
+                    'id': None if track_id is None else int(track_id)
+                })
+            total_vehicles = len(detections)
+            vehicle_count = count_by_type(cls_ids)
+
+            self.last_response = {
                 'timestamp': current_time.isoformat(),
                 'total_vehicles': total_vehicles,
                 'vehicle_types': vehicle_count,
@@ -321,8 +404,18 @@ class TrafficAnalyzer:
                 'emergency_vehicles': 0,
                 'traffic_density': total_vehicles / (frame.shape[0] * frame.shape[1]) * 1000000,
                 'fps': fps,
-                'detections': detections
+                'detections': detections,
+                'carried': False
             }
+            if self.motion_gate is not None:
+                # Only a frame whose results are now carried forward may gate the next ones
+                self.motion_gate.commit(current_time.timestamp())
+            self._observe_latency(received_at)
+            self.last_response['quality'] = self.quality()
+            if self.rolling is not None:
+                self.rolling.observe(self.last_response, self.vehicle_tracker.measured_speeds())
+            _lap(timings, 'response', mark)
+            return self.last_response
         except Exception as e:
             logger.error(f"Error analyzing frame: {str(e)}")
             if self.last_frame_time:
@@ -331,8 +424,60 @@ class TrafficAnalyzer:
         finally:
             self.processing = False
 
+    def _carry_forward(self, current_time, fps):
+        """Reuse the last inference's results with boxes moved to the tracks' predictions."""
+        self.vehicle_tracker.predict(current_time)
+        previous = self.last_response['detections']
+        boxes = self.vehicle_tracker.current_boxes([d['id'] for d in previous if d['id'] is not None])
+        response = dict(self.last_response)
+        response.update({
+            'timestamp': current_time.isoformat(),
+            'average_speed': self._calculate_average_speed(),
+            'traffic_violations': [],
+            'fps': fps,
+            'detections': [dict(d, bbox=boxes.get(d['id'], d['bbox'])) for d in previous],
+            'carried': True,
+            'quality': self.quality()
+        })
+        if self.rolling is not None:
+            # Counted for time-averaged figures; speeds were only predicted, not measured
+            self.rolling.observe(response)
+        return response
+
+    def _observe_latency(self, received_at: float):
+        """Feed an inferred frame's end-to-end latency to the quality controller."""
+        if self.controller is None:
+            return
+        if self.controller.observe(time.monotonic() - received_at):
+            self.frame_skip, self.image_size = self.controller.frame_skip, self.controller.image_size
+            logger.info(f"Quality set to {self.controller.setting()}")
+
+    def quality(self) -> Dict:
+        """The processing setting in effect, reported with every result."""
+        if self.controller is not None:
+            return self.controller.setting()
+        return {
+            'level': 0,
+            'degraded': False,
+            'frame_skip': self.frame_skip,
+            'image_size': self.image_size,
+            'latency_ms': None
+        }
+
+    def stats(self) -> Dict:
+        return {
+            'frames': self.frame_count,
+            'quality': self.controller.stats() if self.controller is not None else self.quality(),
+            'motion_gate': self.motion_gate.stats() if self.motion_gate is not None else None,
+            'admission': self.admission.decision() if self.admission is not None else None
+        }
+
     def _create_empty_response(self, current_time, frame_shape):
-        """Create an empty response when detection fails."""
+        """Create an empty response when detection fails.
+
+        It is flagged with ``error`` so callers that keep results (the REST
+        result cache, bulk uploads) can tell it from a frame with no vehicles.
+        """
         return {
             'timestamp': current_time.isoformat(),
             'total_vehicles': 0,
@@ -345,15 +490,15 @@ class TrafficAnalyzer:
             'emergency_vehicles': 0,
             'traffic_density': 0,
             'fps': 0,
-            'detections': []
+            'detections': [],
+            'carried': False,
+            'quality': self.quality(),
+            'error': True
         }
 
     def _calculate_average_speed(self):
         try:
-            speeds = [v.get('speed', 0) for v in self.vehicle_tracker.tracked_vehicles.values()]
-            if not speeds:
-                return 0
-            return float(np.mean(speeds))
+            return self.vehicle_tracker.average_speed()
         except Exception as e:
             logger.error(f"Error calculating average speed: {str(e)}")
             return 0
\ No newline at end of file
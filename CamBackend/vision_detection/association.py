@@ -0,0 +1,79 @@
+import numpy as np
+from scipy.optimize import linear_sum_assignment
+from scipy.sparse import coo_matrix
+from scipy.sparse.csgraph import connected_components
+
+# Cost assigned to detection/track pairs that fail the gate
+INVALID_COST = 1e6
+
+
+def _iou(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    """IoU of broadcast-compatible xyxy box arrays."""
+    inter_w = np.clip(np.minimum(a[..., 2], b[..., 2]) - np.maximum(a[..., 0], b[..., 0]), 0, None)
+    inter_h = np.clip(np.minimum(a[..., 3], b[..., 3]) - np.maximum(a[..., 1], b[..., 1]), 0, None)
+    inter = inter_w * inter_h
+    area_a = (a[..., 2] - a[..., 0]) * (a[..., 3] - a[..., 1])
+    area_b = (b[..., 2] - b[..., 0]) * (b[..., 3] - b[..., 1])
+    union = area_a + area_b - inter
+    return np.where(union > 0, inter / np.maximum(union, 1e-9), 0).astype(np.float32)
+
+
+def box_centers(boxes: np.ndarray) -> np.ndarray:
+    return np.stack([(boxes[:, 0] + boxes[:, 2]) / 2, (boxes[:, 1] + boxes[:, 3]) / 2], axis=1)
+
+
+def pair_costs(det_boxes: np.ndarray, track_boxes: np.ndarray, gate_distances: np.ndarray,
+               min_iou: float = 0.1) -> np.ndarray:
+    """Association cost for aligned candidate (detection, track) pairs, one pair per row.
+
+    A pair is admissible if the boxes overlap by at least ``min_iou`` or the
+    centers are closer than the track's gate distance; the cost is
+    ``(1 - IoU) + distance / gate``, so overlap dominates and distance breaks ties.
+    """
+    ious = _iou(det_boxes, track_boxes)
+    distances = np.sqrt(((box_centers(det_boxes) - box_centers(track_boxes)) ** 2).sum(axis=1))
+    gates = np.maximum(gate_distances, 1e-6)
+    cost = (1.0 - ious) + distances / gates
+    admissible = (ious >= min_iou) | (distances < gates)
+    return np.where(admissible, cost, INVALID_COST)
+
+
+def solve_sparse_assignment(rows: np.ndarray, cols: np.ndarray, costs: np.ndarray) -> np.ndarray:
+    """Optimal one-to-one assignment restricted to candidate (row, col) pairs.
+
+    The candidate graph is split into connected components: components with a
+    single pair are matched directly and only the contested ones go through
+    ``linear_sum_assignment``, each on its own small dense matrix. Returns a
+    (K, 2) array of matched (row, col) labels.
+    """
+    keep = costs < INVALID_COST
+    rows, cols, costs = rows[keep], cols[keep], costs[keep]
+    if not len(rows):
+        return np.empty((0, 2), dtype=np.int64)
+
+    row_ids, row_index = np.unique(rows, return_inverse=True)
+    col_ids, col_index = np.unique(cols, return_inverse=True)
+    n_rows = len(row_ids)
+    size = n_rows + len(col_ids)
+    graph = coo_matrix((np.ones(len(rows)), (row_index, n_rows + col_index)), shape=(size, size))
+    n_components, labels = connected_components(graph, directed=False)
+    edge_labels = labels[row_index]
+    edges_per_component = np.bincount(edge_labels, minlength=n_components)
+
+    single = edges_per_component[edge_labels] == 1
+    matches = [np.stack([rows[single], cols[single]], axis=1)]
+
+    contested = np.flatnonzero(~single)
+    contested = contested[np.argsort(edge_labels[contested], kind='stable')]
+    bounds = np.flatnonzero(np.diff(edge_labels[contested])) + 1
+    for group in np.split(contested, bounds):
+        if not len(group):
+            continue
+        group_rows, local_rows = np.unique(row_index[group], return_inverse=True)
+        group_cols, local_cols = np.unique(col_index[group], return_inverse=True)
+        dense = np.full((len(group_rows), len(group_cols)), INVALID_COST)
+        dense[local_rows, local_cols] = costs[group]
+        r, c = linear_sum_assignment(dense)
+        valid = dense[r, c] < INVALID_COST
+        matches.append(np.stack([row_ids[group_rows[r[valid]]], col_ids[group_cols[c[valid]]]], axis=1))
+    return np.concatenate(matches).astype(np.int64)
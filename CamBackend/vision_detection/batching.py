@@ -0,0 +1,208 @@
+import asyncio
+import logging
+from collections import deque
+from typing import Callable, Deque, Dict, Hashable, List, Optional, Set, Tuple
+
+from .inference import InferenceExecutor, InferenceQueueFull
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+class BatchScheduler:
+    """Gathers pending frames from every stream and runs them as one model batch.
+
+    A batch is dispatched as soon as ``max_batch_size`` frames are waiting or the
+    oldest frame has waited ``max_wait`` seconds. Frames are taken round-robin
+    across streams so a busy camera cannot starve the others, and each stream
+    may only have ``max_per_stream`` frames queued at a time. Frames are only
+    batched with frames of the same model input size; ``predict`` is called as
+    ``predict(frames, image_size)``. Up to ``max_in_flight`` batches run at once,
+    one per inference worker.
+
+    The time from ``submit`` to result of every completed frame is summed up;
+    ``take_latency`` returns the mean since it was last called, which is how
+    admission control tells the scheduler is falling behind.
+    """
+
+    def __init__(self, inference: InferenceExecutor, predict: Callable[[List, Optional[int]], List],
+                 max_batch_size: int = 8, max_wait: float = 0.015, max_per_stream: int = 2,
+                 max_in_flight: int = 1):
+        self.inference = inference
+        self.predict = predict
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait
+        self.max_per_stream = max_per_stream
+        self.max_in_flight = max_in_flight
+        self.queues: Dict[Hashable, Deque[Tuple[object, asyncio.Future, float, Optional[int]]]] = {}
+        self.order: Deque[Hashable] = deque()  # Round-robin order of streams with queued frames
+        self.pending = 0
+        self.batches = 0
+        self.batched_frames = 0
+        self.rejected = 0
+        self._latency_total = 0.0  # Submit-to-result seconds of frames completed since take_latency
+        self._latency_count = 0
+        self._wakeup: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        self._in_flight: Optional[asyncio.Semaphore] = None
+        self._dispatches: Set[asyncio.Task] = set()
+
+    def _ensure_running(self):
+        if self._task is None or self._task.done():
+            self._wakeup = asyncio.Event()
+            self._in_flight = asyncio.Semaphore(self.max_in_flight)
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def submit(self, frame, stream: Hashable = None, image_size: Optional[int] = None):
+        """Queue a frame for the next batch and await its own model result.
+
+        Returns a one-element list so callers can iterate it exactly like the
+        output of a direct ``vehicle_model(frame)`` call.
+        """
+        self._ensure_running()
+        queue = self.queues.get(stream)
+        if queue is None:
+            queue = self.queues[stream] = deque()
+        if len(queue) >= self.max_per_stream:
+            self.rejected += 1
+            raise InferenceQueueFull(f"Stream already has {self.max_per_stream} frames queued")
+        if not queue:
+            self.order.append(stream)
+
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        queue.append((frame, future, loop.time(), image_size))
+        self.pending += 1
+        self._wakeup.set()
+        return [await future]
+
+    def cancel(self, stream: Hashable) -> int:
+        """Drop every queued frame belonging to ``stream``."""
+        queue = self.queues.pop(stream, None)
+        if not queue:
+            return 0
+        for _, future, _, _ in queue:
+            future.cancel()
+        self.pending -= len(queue)
+        try:
+            self.order.remove(stream)
+        except ValueError:
+            pass
+        return len(queue)
+
+    def _take_batch(self) -> Tuple[List[Tuple[object, asyncio.Future, float]], Optional[int]]:
+        batch = []
+        image_size, chosen = None, False
+        deferred = []  # Streams whose next frame needs a different input size
+        while self.order and len(batch) < self.max_batch_size:
+            stream = self.order.popleft()
+            queue = self.queues.get(stream)
+            if not queue:
+                continue
+            if not chosen:
+                image_size, chosen = queue[0][3], True
+            elif queue[0][3] != image_size:
+                deferred.append(stream)
+                continue
+            frame, future, enqueued_at, _ = queue.popleft()
+            self.pending -= 1
+            if queue:
+                self.order.append(stream)
+            else:
+                del self.queues[stream]
+            # Skip frames whose caller gave up while they were queued
+            if not future.done():
+                batch.append((frame, future, enqueued_at))
+        # Deferred streams go first next time round
+        self.order.extendleft(reversed(deferred))
+        return batch, image_size
+
+    def _oldest_enqueue_time(self) -> float:
+        oldest = [queue[0][2] for queue in self.queues.values() if queue]
+        return min(oldest) if oldest else asyncio.get_running_loop().time()
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            await self._wakeup.wait()
+            # Wait for a free worker before collecting, so batches fill up meanwhile
+            await self._in_flight.acquire()
+
+            # Give other streams until the oldest queued frame has waited max_wait
+            deadline = self._oldest_enqueue_time() + self.max_wait
+            while self.pending < self.max_batch_size:
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    break
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), remaining)
+                except asyncio.TimeoutError:
+                    break
+
+            batch, image_size = self._take_batch()
+            if self.pending:
+                # Frames left behind (e.g. deferred for another input size) go in the next batch
+                # even if no new frame arrives to wake the loop
+                self._wakeup.set()
+            else:
+                self._wakeup.clear()
+            if not batch:
+                self._in_flight.release()
+                continue
+            task = loop.create_task(self._dispatch(batch, image_size))
+            self._dispatches.add(task)
+            task.add_done_callback(self._dispatches.discard)
+
+    async def _dispatch(self, batch: List[Tuple[object, asyncio.Future, float]], image_size: Optional[int]):
+        frames = [frame for frame, _, _ in batch]
+        try:
+            results = await self.inference.run(self.predict, frames, image_size)
+            if len(results) != len(batch):
+                raise RuntimeError(f"Model returned {len(results)} results for {len(batch)} frames")
+        except Exception as e:
+            for _, future, _ in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        finally:
+            self._in_flight.release()
+
+        self.batches += 1
+        self.batched_frames += len(batch)
+        now = asyncio.get_running_loop().time()
+        for (_, future, enqueued_at), result in zip(batch, results):
+            self._latency_total += now - enqueued_at
+            self._latency_count += 1
+            if not future.done():
+                future.set_result(result)
+
+    def take_latency(self) -> Optional[float]:
+        """Mean submit-to-result seconds of the frames completed since the last call, if any."""
+        if not self._latency_count:
+            return None
+        latency = self._latency_total / self._latency_count
+        self._latency_total, self._latency_count = 0.0, 0
+        return latency
+
+    def queue_depths(self) -> Dict[str, int]:
+        """Queued frames per named stream (one-off REST uploads are left out)."""
+        return {stream: len(queue) for stream, queue in self.queues.items() if isinstance(stream, str)}
+
+    def stats(self) -> Dict:
+        return {
+            'pending': self.pending,
+            'streams': len(self.queues),
+            'batches': self.batches,
+            'rejected': self.rejected,
+            'average_batch_size': self.batched_frames / self.batches if self.batches else 0
+        }
+
+    def shutdown(self):
+        if self._task is not None:
+            self._task.cancel()
+        for task in list(self._dispatches):
+            task.cancel()
+        for stream in list(self.queues):
+            self.cancel(stream)
@@ -0,0 +1,36 @@
+import json
+import logging
+import os
+from typing import Dict, Optional
+
+from .roi import RegionOfInterest
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+class CameraConfig:
+    """Static settings for one fixed camera, keyed by the stream ID clients connect with."""
+
+    def __init__(self, camera_id: str, settings: Dict):
+        self.camera_id = camera_id
+        self.settings = settings
+        roi = settings.get('roi')
+        self.roi: Optional[RegionOfInterest] = RegionOfInterest(roi) if roi else None
+
+
+def load_camera_configs(path: str) -> Dict[str, CameraConfig]:
+    """Read ``{"cameras": {"<id>": {"roi": [[x, y], ...]}}}``; a missing file means no per-camera settings."""
+    if not path or not os.path.exists(path):
+        return {}
+    try:
+        with open(path) as f:
+            cameras = json.load(f).get('cameras', {})
+        configs = {str(camera_id): CameraConfig(str(camera_id), settings)
+                   for camera_id, settings in cameras.items()}
+        logger.info(f"Loaded settings for {len(configs)} cameras from {path}")
+        return configs
+    except Exception as e:
+        logger.error(f"Error loading camera config {path}: {str(e)}")
+        return {}
@@ -0,0 +1,100 @@
+import json
+from typing import Dict, List, Union
+
+from .analyzer import VEHICLE_CLASSES
+
+try:
+    import msgpack
+except ImportError:  # Optional; compact results fall back to JSON
+    msgpack = None
+
+MSGPACK_AVAILABLE = msgpack is not None
+
+# Order of the per-type counts in compact results, sent once in the hello reply
+CLASS_NAMES = list(VEHICLE_CLASSES.values())
+_CLASS_CODES = {name: code for code, name in enumerate(CLASS_NAMES)}
+
+
+def _flatten_boxes(detections: List[Dict]) -> List[int]:
+    return [value for detection in detections for value in detection['bbox']]
+
+
+class CompactResultEncoder:
+    """Per-connection encoder for the compact result stream.
+
+    Instead of the full result dict, each message carries the changing scalar
+    fields, per-type counts as an array in ``CLASS_NAMES`` order and track
+    deltas as parallel arrays: tracks that ``appeared`` (id, class, confidence,
+    box), tracks that ``moved`` (id, box) and the ids of tracks that are
+    ``gone``. Boxes are flattened ``[x0, y0, x1, y1, ...]``. Every
+    ``keyframe_interval`` messages all tracks are resent as appeared with
+    ``key`` set, so clients can resynchronize. Detections without a track ID
+    are sent in full under ``untracked``.
+    """
+
+    def __init__(self, binary: bool = True, keyframe_interval: int = 30):
+        self.binary = binary and msgpack is not None
+        self.keyframe_interval = keyframe_interval
+        self.tracks: Dict[int, List[int]] = {}  # Last sent box per track ID
+        self.messages = 0
+
+    @property
+    def encoding(self) -> str:
+        return 'msgpack' if self.binary else 'json'
+
+    def encode(self, result: Dict) -> Union[bytes, str]:
+        keyframe = self.messages % self.keyframe_interval == 0
+        self.messages += 1
+
+        appeared, moved, untracked = [], [], []
+        current = {}
+        for detection in result['detections']:
+            track_id = detection['id']
+            if track_id is None:
+                untracked.append(detection)
+                continue
+            current[track_id] = detection['bbox']
+            previous = self.tracks.get(track_id)
+            if keyframe or previous is None:
+                appeared.append(detection)
+            elif previous != detection['bbox']:
+                moved.append(detection)
+        gone = [] if keyframe else [track_id for track_id in self.tracks if track_id not in current]
+        self.tracks = current
+
+        types = result['vehicle_types']
+        message = {
+            'ts': result['timestamp'],
+            'n': result['total_vehicles'],
+            'types': [types.get(name, 0) for name in CLASS_NAMES],
+            'speed': round(result['average_speed'], 2),
+            'congestion': round(result['congestion_level'], 4),
+            'density': round(result['traffic_density'], 2),
+            'fps': round(result['fps'], 2),
+            'key': keyframe,
+            'appeared': {
+                'id': [d['id'] for d in appeared],
+                'cls': [_CLASS_CODES[d['type']] for d in appeared],
+                'conf': [round(d['confidence'], 3) for d in appeared],
+                'box': _flatten_boxes(appeared)
+            },
+            'moved': {'id': [d['id'] for d in moved], 'box': _flatten_boxes(moved)},
+            'gone': gone
+        }
+        if untracked:
+            message['untracked'] = {
+                'cls': [_CLASS_CODES[d['type']] for d in untracked],
+                'conf': [round(d['confidence'], 3) for d in untracked],
+                'box': _flatten_boxes(untracked)
+            }
+        if result['traffic_violations']:
+            message['violations'] = result['traffic_violations']
+        # Fields added along the pipeline (stream/sequence, quality, drops, ...)
+        for key in ('carried', 'quality', 'admission', 'stream', 'sequence', 'capture_timestamp',
+                    'dropped_frames'):
+            if key in result:
+                message[key] = result[key]
+
+        if self.binary:
+            return msgpack.packb(message, use_bin_type=True)
+        return json.dumps(message, separators=(',', ':'))
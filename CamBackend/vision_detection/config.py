@@ -0,0 +1,63 @@
+import os
+
+# Vision server settings, overridable through environment variables
+
+# Directory holding model weights and other artifacts (defaults to CamBackend/)
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+MODEL_WEIGHTS = os.getenv('VISION_MODEL_WEIGHTS', 'yolov8n.pt')
+MODEL_DEVICE = os.getenv('VISION_MODEL_DEVICE', '')  # Empty selects CUDA when available
+MODEL_IMAGE_SIZE = int(os.getenv('VISION_MODEL_IMAGE_SIZE', '640'))
+
+# Inference backend: 'torch' runs the weights directly; 'onnx' and 'openvino'
+# export them once to MODEL_CACHE_DIR and run the exported model on CPU
+MODEL_BACKEND = os.getenv('VISION_MODEL_BACKEND', 'torch').lower()
+MODEL_INT8 = os.getenv('VISION_MODEL_INT8', '0').lower() in ('1', 'true', 'yes')
+MODEL_CACHE_DIR = os.getenv('VISION_MODEL_CACHE_DIR', os.path.join(BASE_DIR, 'model_cache'))
+CALIBRATION_DIR = os.getenv('VISION_CALIBRATION_DIR', '')  # Sample frames for INT8 calibration
+CALIBRATION_FRAMES = int(os.getenv('VISION_CALIBRATION_FRAMES', '64'))
+TORCH_THREADS = int(os.getenv('VISION_TORCH_THREADS', '0'))  # 0 keeps the library default
+
+# Per-camera settings (ROI polygons, ...) keyed by camera/stream ID
+CAMERA_CONFIG = os.getenv('VISION_CAMERA_CONFIG', os.path.join(BASE_DIR, 'cameras.json'))
+
+# Motion gate: reuse the previous results while a camera's view is static
+MOTION_GATE = os.getenv('VISION_MOTION_GATE', '1').lower() in ('1', 'true', 'yes')
+MOTION_THRESHOLD = float(os.getenv('VISION_MOTION_THRESHOLD', '0.002'))
+MOTION_MAX_INTERVAL = float(os.getenv('VISION_MOTION_MAX_INTERVAL', '2.0'))
+
+# Adaptive quality: per-stream frame skip and model input size driven by latency
+ADAPTIVE_QUALITY = os.getenv('VISION_ADAPTIVE_QUALITY', '1').lower() in ('1', 'true', 'yes')
+LATENCY_BUDGET = float(os.getenv('VISION_LATENCY_BUDGET', '0.25'))  # Seconds
+MIN_FRAME_SKIP = int(os.getenv('VISION_MIN_FRAME_SKIP', '2'))
+MAX_FRAME_SKIP = int(os.getenv('VISION_MAX_FRAME_SKIP', '6'))
+IMAGE_SIZES = [int(size) for size in os.getenv('VISION_IMAGE_SIZES', '640,512,416,320').split(',')]
+
+# Inference worker processes fed through a shared-memory frame ring (0 runs inference in-process)
+INFERENCE_WORKERS = int(os.getenv('VISION_INFERENCE_WORKERS', '0'))
+FRAME_RING_SLOTS = int(os.getenv('VISION_FRAME_RING_SLOTS', '32'))
+
+# Bulk /analyze/images uploads: decode threads and images kept in flight per request
+BATCH_DECODE_WORKERS = int(os.getenv('VISION_BATCH_DECODE_WORKERS', str(min(os.cpu_count() or 1, 4))))
+BATCH_MAX_IN_FLIGHT = int(os.getenv('VISION_BATCH_MAX_IN_FLIGHT', '16'))
+
+# Rolling per-stream traffic statistics: bucket size, history kept and default query windows (seconds)
+STATS_BUCKET_SECONDS = float(os.getenv('VISION_STATS_BUCKET_SECONDS', '10'))
+STATS_HORIZON = float(os.getenv('VISION_STATS_HORIZON', '3600'))
+STATS_WINDOWS = [float(window) for window in os.getenv('VISION_STATS_WINDOWS', '60,300,900,3600').split(',')]
+
+# /analyze/image result cache keyed by a hash of the upload (0 entries disables it)
+RESULT_CACHE_SIZE = int(os.getenv('VISION_RESULT_CACHE_SIZE', '256'))
+RESULT_CACHE_TTL = float(os.getenv('VISION_RESULT_CACHE_TTL', '600'))  # Seconds
+
+# Results queued per read-only subscriber before it is dropped as too slow
+SUBSCRIBER_QUEUE_SIZE = int(os.getenv('VISION_SUBSCRIBER_QUEUE_SIZE', '8'))
+
+# Admission control: global inference budget (inferences/s across streams, 0 adapts to load only)
+# shared by priority class; streams never drop below MIN_STREAM_RATE
+INFERENCE_BUDGET = float(os.getenv('VISION_INFERENCE_BUDGET', '0'))
+MIN_STREAM_RATE = float(os.getenv('VISION_MIN_STREAM_RATE', '0.5'))
+DEFAULT_PRIORITY = os.getenv('VISION_DEFAULT_PRIORITY', 'normal')
+# Mean batch queue-plus-inference time above which the budget is lowered; kept under LATENCY_BUDGET
+# so low-priority streams are shed before high-priority ones lose quality
+ADMISSION_TARGET_LATENCY = float(os.getenv('VISION_ADMISSION_TARGET_LATENCY', '0.2'))  # Seconds
@@ -0,0 +1,120 @@
+import glob
+import logging
+import os
+import shutil
+
+import cv2
+import numpy as np
+
+from . import config
+from .preprocess import letterbox
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+BACKENDS = ('torch', 'onnx', 'openvino')
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.bmp')
+
+
+def artifact_path(weights: str, backend: str, int8: bool = False) -> str:
+    """Where the exported model for this configuration lives in the cache.
+
+    Exports have dynamic input axes, so one artifact serves every input size.
+    """
+    name = f"{os.path.splitext(os.path.basename(weights))[0]}{'_int8' if int8 else ''}"
+    if backend == 'onnx':
+        return os.path.join(config.MODEL_CACHE_DIR, f"{name}.onnx")
+    return os.path.join(config.MODEL_CACHE_DIR, f"{name}_openvino_model")
+
+
+def export_model(weights: str, backend: str, int8: bool = False) -> str:
+    """Export ``weights`` for ``backend`` once and return the cached artifact path.
+
+    The exported model keeps the Ultralytics metadata, so it loads through
+    ``YOLO(path)`` and yields the same ``Results`` objects as the PyTorch model.
+    """
+    if backend not in ('onnx', 'openvino'):
+        raise ValueError(f"Cannot export for backend: {backend}")
+    target = artifact_path(weights, backend, int8)
+    if os.path.exists(target):
+        return target
+
+    os.makedirs(config.MODEL_CACHE_DIR, exist_ok=True)
+    if int8:
+        if backend == 'onnx':
+            # Calibrated at the default input size, which the adaptive sizes step down from
+            _quantize_onnx(export_model(weights, 'onnx'), target, config.MODEL_IMAGE_SIZE)
+        else:
+            _onnx_to_openvino(export_model(weights, 'onnx', int8=True),
+                              export_model(weights, 'openvino'), target)
+        return target
+
+    from ultralytics import YOLO
+
+    logger.info(f"Exporting {weights} to {backend}...")
+    # Dynamic batch and image axes: frames from several streams run as one batch,
+    # and the adaptive input sizes all share this one export
+    exported = YOLO(weights).export(format=backend, imgsz=config.MODEL_IMAGE_SIZE, dynamic=True, half=False)
+    if isinstance(exported, (list, tuple)):
+        exported = exported[0]
+    shutil.move(str(exported), target)
+    logger.info(f"Exported model cached at {target}")
+    return target
+
+
+def calibration_frames(directory: str, limit: int):
+    """Sample frames (BGR) used to calibrate INT8 activation ranges."""
+    paths = sorted(p for p in glob.glob(os.path.join(directory, '*'))
+                   if p.lower().endswith(IMAGE_EXTENSIONS))
+    if not paths:
+        raise ValueError(f"No calibration frames found in {directory or '(unset)'}")
+    step = max(len(paths) // limit, 1)
+    for path in paths[::step][:limit]:
+        frame = cv2.imread(path, cv2.IMREAD_COLOR)
+        if frame is not None:
+            yield frame
+
+
+def _model_input(frame: np.ndarray, image_size: int) -> np.ndarray:
+    """Letterbox a BGR frame into the exported model's (1, 3, S, S) float input."""
+    canvas = letterbox(frame, image_size)[0]
+    return np.ascontiguousarray(canvas[:, :, ::-1].transpose(2, 0, 1))[None].astype(np.float32) / 255.0
+
+
+def _quantize_onnx(source: str, target: str, image_size: int):
+    """Static INT8 post-training quantization calibrated on sample frames."""
+    import onnx
+    from onnxruntime.quantization import CalibrationDataReader, QuantFormat, QuantType, quantize_static
+
+    input_name = onnx.load(source, load_external_data=False).graph.input[0].name
+
+    class FrameReader(CalibrationDataReader):
+        def __init__(self):
+            self.frames = calibration_frames(config.CALIBRATION_DIR, config.CALIBRATION_FRAMES)
+
+        def get_next(self):
+            frame = next(self.frames, None)
+            return None if frame is None else {input_name: _model_input(frame, image_size)}
+
+    logger.info(f"Quantizing {source} to INT8...")
+    quantize_static(source, target, FrameReader(), quant_format=QuantFormat.QDQ,
+                    activation_type=QuantType.QUInt8, weight_type=QuantType.QInt8)
+
+    # Keep the class names/stride metadata Ultralytics reads back when loading
+    fp32, int8 = onnx.load(source), onnx.load(target)
+    del int8.metadata_props[:]
+    int8.metadata_props.extend(fp32.metadata_props)
+    onnx.save(int8, target)
+    logger.info(f"Quantized model cached at {target}")
+
+
+def _onnx_to_openvino(source: str, fp32_dir: str, target: str):
+    """Convert a quantized ONNX model to OpenVINO IR next to the FP32 export's metadata."""
+    from openvino.runtime import Core, serialize
+
+    os.makedirs(target, exist_ok=True)
+    name = os.path.splitext(os.path.basename(source))[0]
+    serialize(Core().read_model(source), os.path.join(target, f"{name}.xml"))
+    shutil.copy(os.path.join(fp32_dir, 'metadata.yaml'), target)
+    logger.info(f"INT8 OpenVINO model cached at {target}")
@@ -0,0 +1,84 @@
+import threading
+from multiprocessing import shared_memory
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+# Per-slot header: frame height, width, channels
+_HEADER_FIELDS = 3
+
+
+class SharedFrameRing:
+    """Fixed-size frame slots in one shared-memory block.
+
+    The owning (ingest) process copies each frame into a free slot and hands
+    only the slot index to a worker process, which attaches to the same block
+    by name and reads the frame in place. Slot ownership is tracked in the
+    owning process: ``acquire`` blocks until a slot is free and ``release``
+    returns it once the worker's result is back.
+    """
+
+    def __init__(self, slots: int, max_height: int, max_width: int, channels: int = 3,
+                 name: Optional[str] = None):
+        self.slots = slots
+        self.max_height = max_height
+        self.max_width = max_width
+        self.channels = channels
+        self.slot_bytes = max_height * max_width * channels
+        header_bytes = slots * _HEADER_FIELDS * 4
+        create = name is None
+        self.shm = shared_memory.SharedMemory(name=name, create=create,
+                                              size=header_bytes + slots * self.slot_bytes)
+        self.headers = np.ndarray((slots, _HEADER_FIELDS), dtype=np.int32, buffer=self.shm.buf)
+        self.frames = np.ndarray((slots, self.slot_bytes), dtype=np.uint8, buffer=self.shm.buf,
+                                 offset=header_bytes)
+        self.owner = create
+        self._free = list(range(slots - 1, -1, -1))
+        self._available = threading.Condition()
+
+    @property
+    def name(self) -> str:
+        return self.shm.name
+
+    def spec(self) -> Tuple[str, int, int, int, int]:
+        """Everything a worker process needs to attach."""
+        return self.name, self.slots, self.max_height, self.max_width, self.channels
+
+    @classmethod
+    def attach(cls, spec) -> 'SharedFrameRing':
+        name, slots, max_height, max_width, channels = spec
+        return cls(slots, max_height, max_width, channels, name=name)
+
+    def fits(self, frame: np.ndarray) -> bool:
+        return frame.shape[0] <= self.max_height and frame.shape[1] <= self.max_width
+
+    def acquire(self, count: int, timeout: Optional[float] = None) -> List[int]:
+        """Reserve ``count`` slots, waiting for in-flight frames to be released."""
+        with self._available:
+            if not self._available.wait_for(lambda: len(self._free) >= count, timeout):
+                raise TimeoutError(f"No free frame slots ({self.slots} in use)")
+            return [self._free.pop() for _ in range(count)]
+
+    def release(self, slots: List[int]):
+        with self._available:
+            self._free.extend(slots)
+            self._available.notify_all()
+
+    def write(self, slot: int, frame: np.ndarray):
+        height, width = frame.shape[:2]
+        channels = frame.shape[2] if frame.ndim == 3 else 1
+        self.headers[slot] = (height, width, channels)
+        self.frames[slot, :height * width * channels].reshape(height, width, channels)[...] = \
+            frame.reshape(height, width, channels)
+
+    def read(self, slot: int) -> np.ndarray:
+        """Zero-copy view of the frame stored in ``slot``."""
+        height, width, channels = self.headers[slot].tolist()
+        return self.frames[slot, :height * width * channels].reshape(height, width, channels)
+
+    def close(self):
+        # Views must go before the mapping can be closed
+        self.headers = self.frames = None
+        self.shm.close()
+        if self.owner:
+            self.shm.unlink()
@@ -0,0 +1,79 @@
+import asyncio
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+class InferenceQueueFull(Exception):
+    """Raised when the inference queue has no room for another job."""
+
+
+class InferenceTimeout(Exception):
+    """Raised when an inference job does not finish within its timeout."""
+
+
+class InferenceExecutor:
+    """Runs blocking model calls on dedicated threads so the event loop stays free.
+
+    Jobs are admitted up to ``max_pending`` (queued plus running) and each one
+    is awaited with a timeout. Frames of a disconnected stream are dropped
+    before they reach a job, by ``BatchScheduler.cancel``.
+    """
+
+    def __init__(self, max_workers: int = 1, max_pending: int = 4, timeout: float = 5.0):
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='inference')
+        self.max_pending = max_pending
+        self.timeout = timeout
+        self.pending = 0
+        self.completed = 0
+        self.rejected = 0
+        self.timed_out = 0
+        self.cancelled = 0
+        self._lock = threading.Lock()
+
+    def _job_done(self, future):
+        # Called from the worker thread once a job has finished or was cancelled
+        with self._lock:
+            self.pending -= 1
+            if future.cancelled():
+                self.cancelled += 1
+            else:
+                self.completed += 1
+
+    async def run(self, fn: Callable, *args, timeout: Optional[float] = None) -> Any:
+        """Run ``fn(*args)`` on the inference threads and await its result."""
+        with self._lock:
+            if self.pending >= self.max_pending:
+                self.rejected += 1
+                raise InferenceQueueFull(f"Inference queue is full ({self.max_pending} jobs pending)")
+            self.pending += 1
+
+        job = self.executor.submit(fn, *args)
+        job.add_done_callback(self._job_done)
+        future = asyncio.wrap_future(job)
+        try:
+            # A timed out job that already started keeps its slot until the
+            # worker returns, so a stuck model cannot over-admit new work
+            return await asyncio.wait_for(future, timeout or self.timeout)
+        except asyncio.TimeoutError:
+            self.timed_out += 1
+            raise InferenceTimeout(f"Inference did not finish within {timeout or self.timeout:.1f}s")
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                'pending': self.pending,
+                'max_pending': self.max_pending,
+                'completed': self.completed,
+                'rejected': self.rejected,
+                'timed_out': self.timed_out,
+                'cancelled': self.cancelled
+            }
+
+    def shutdown(self):
+        self.executor.shutdown(wait=False)
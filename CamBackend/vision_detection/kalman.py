@@ -0,0 +1,54 @@
+import numpy as np
+from typing import Tuple
+
+# Constant-velocity model over track centers. All functions are batched:
+# states are (N, 4) arrays of [cx, cy, vx, vy] in pixels and pixels/second,
+# covariances are (N, 4, 4).
+
+_H = np.array([[1, 0, 0, 0],
+               [0, 1, 0, 0]], dtype=np.float64)
+
+
+def kalman_init(centers: np.ndarray, position_std: float = 5.0,
+                velocity_std: float = 500.0) -> Tuple[np.ndarray, np.ndarray]:
+    """Start tracks at the measured centers with unknown velocity."""
+    n = len(centers)
+    states = np.zeros((n, 4), dtype=np.float64)
+    states[:, :2] = centers
+    covariances = np.zeros((n, 4, 4), dtype=np.float64)
+    covariances[:, 0, 0] = covariances[:, 1, 1] = position_std ** 2
+    covariances[:, 2, 2] = covariances[:, 3, 3] = velocity_std ** 2
+    return states, covariances
+
+
+def kalman_predict(states: np.ndarray, covariances: np.ndarray, dt: np.ndarray,
+                   acceleration_std: float = 200.0) -> Tuple[np.ndarray, np.ndarray]:
+    """Advance each track by its own ``dt`` seconds."""
+    dt = np.asarray(dt, dtype=np.float64).reshape(-1)
+    n = len(states)
+    F = np.tile(np.eye(4), (n, 1, 1))
+    F[:, 0, 2] = F[:, 1, 3] = dt
+
+    # Discrete white-noise acceleration
+    q = acceleration_std ** 2
+    dt2, dt3, dt4 = dt ** 2, dt ** 3, dt ** 4
+    Q = np.zeros((n, 4, 4), dtype=np.float64)
+    Q[:, 0, 0] = Q[:, 1, 1] = dt4 / 4 * q
+    Q[:, 0, 2] = Q[:, 2, 0] = Q[:, 1, 3] = Q[:, 3, 1] = dt3 / 2 * q
+    Q[:, 2, 2] = Q[:, 3, 3] = dt2 * q
+
+    states = np.einsum('nij,nj->ni', F, states)
+    covariances = F @ covariances @ F.transpose(0, 2, 1) + Q
+    return states, covariances
+
+
+def kalman_update(states: np.ndarray, covariances: np.ndarray, measurements: np.ndarray,
+                  measurement_std: float = 5.0) -> Tuple[np.ndarray, np.ndarray]:
+    """Correct predicted tracks with measured (N, 2) centers."""
+    R = np.eye(2) * measurement_std ** 2
+    innovation = measurements - states[:, :2]
+    S = _H @ covariances @ _H.T + R
+    K = covariances @ _H.T @ np.linalg.inv(S)
+    states = states + np.einsum('nij,nj->ni', K, innovation)
+    covariances = (np.eye(4) - K @ _H) @ covariances
+    return states, covariances
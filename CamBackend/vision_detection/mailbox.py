@@ -0,0 +1,56 @@
+import asyncio
+from typing import Any, Dict
+
+
+class MailboxClosed(Exception):
+    """Raised by FrameMailbox.get once the connection has gone away."""
+
+
+class FrameMailbox:
+    """Single-slot, latest-frame-wins buffer between a socket reader and the analyzer.
+
+    The reader always overwrites the slot, so the analyzer only ever sees the
+    newest undecoded frame and never falls behind the live scene. Overwritten
+    frames are counted as dropped. With ``credit_flow`` enabled the consumer
+    sends the client an explicit "ready" message each time it empties the slot.
+    """
+
+    def __init__(self):
+        self._item = None
+        self._event = asyncio.Event()
+        self.closed = False
+        self.credit_flow = False
+        self.received = 0
+        self.dropped = 0
+        self.consumed = 0
+
+    def put(self, item: Any) -> bool:
+        """Store ``item`` as the newest frame; returns True if an older one was dropped."""
+        dropped = self._item is not None
+        if dropped:
+            self.dropped += 1
+        self._item = item
+        self.received += 1
+        self._event.set()
+        return dropped
+
+    async def get(self) -> Any:
+        while self._item is None:
+            if self.closed:
+                raise MailboxClosed()
+            self._event.clear()
+            await self._event.wait()
+        item, self._item = self._item, None
+        self.consumed += 1
+        return item
+
+    def close(self):
+        self.closed = True
+        self._event.set()
+
+    def stats(self) -> Dict:
+        return {
+            'received': self.received,
+            'consumed': self.consumed,
+            'dropped': self.dropped
+        }
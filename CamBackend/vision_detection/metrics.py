@@ -0,0 +1,87 @@
+import threading
+from bisect import bisect_left
+from typing import Dict, Hashable, Iterable, List, Sequence, Tuple
+
+# Pipeline stages timed for every WebSocket frame, in order
+STAGES = ('receive', 'decode', 'resize', 'inference', 'tracking', 'response', 'send')
+
+# Latency buckets in seconds
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+
+def _escape(value) -> str:
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _labels(labels: Dict) -> str:
+    if not labels:
+        return ''
+    return '{' + ','.join(f'{key}="{_escape(value)}"' for key, value in labels.items()) + '}'
+
+
+def format_metric(name: str, metric_type: str, help_text: str,
+                  samples: Iterable[Tuple[Dict, float]]) -> List[str]:
+    """Prometheus text exposition lines for one gauge or counter."""
+    lines = [f"# HELP {name} {help_text}", f"# TYPE {name} {metric_type}"]
+    lines.extend(f"{name}{_labels(labels)} {value}" for labels, value in samples)
+    return lines
+
+
+class Histogram:
+    """Fixed-bucket latency histogram; ``observe`` is a bisect and two additions."""
+
+    def __init__(self, buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def samples(self, name: str, labels: Dict) -> List[str]:
+        lines, cumulative = [], 0
+        for bound, count in zip(self.buckets + ('+Inf',), self.counts):
+            cumulative += count
+            lines.append(f"{name}_bucket{_labels(dict(labels, le=bound))} {cumulative}")
+        lines.append(f"{name}_sum{_labels(labels)} {self.sum}")
+        lines.append(f"{name}_count{_labels(labels)} {self.count}")
+        return lines
+
+
+class StageMetrics:
+    """Per-stream, per-stage latency histograms for the frame pipeline."""
+
+    name = 'vision_stage_latency_seconds'
+
+    def __init__(self, buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self.buckets = buckets
+        self.histograms: Dict[Tuple[Hashable, str], Histogram] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, stream: Hashable, timings: Dict[str, float]):
+        """Record one frame's ``{stage: seconds}`` timings."""
+        with self._lock:
+            for stage, seconds in timings.items():
+                histogram = self.histograms.get((stream, stage))
+                if histogram is None:
+                    histogram = self.histograms[(stream, stage)] = Histogram(self.buckets)
+                histogram.observe(seconds)
+
+    def remove(self, stream: Hashable):
+        """Forget a stream's histograms once its session is gone."""
+        with self._lock:
+            for key in [key for key in self.histograms if key[0] == stream]:
+                del self.histograms[key]
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} Time spent per frame in each pipeline stage",
+                 f"# TYPE {self.name} histogram"]
+        order = {stage: index for index, stage in enumerate(STAGES)}
+        with self._lock:
+            keys = sorted(self.histograms, key=lambda key: (str(key[0]), order.get(key[1], len(order))))
+            for stream, stage in keys:
+                lines.extend(self.histograms[(stream, stage)].samples(self.name, {'stream': stream, 'stage': stage}))
+        return lines
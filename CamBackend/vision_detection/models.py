@@ -0,0 +1,152 @@
+import asyncio
+import logging
+import os
+import threading
+from typing import Dict, Optional, Sequence, Tuple
+
+import numpy as np
+
+from . import config
+from .export import BACKENDS, export_model
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+def resolve_weights(weights: str) -> str:
+    """Find a weights file from the working directory or, failing that, next to the package."""
+    for candidate in (weights, os.path.join(config.BASE_DIR, weights)):
+        if os.path.exists(candidate):
+            return os.path.abspath(candidate)
+    raise FileNotFoundError(f"Model file not found: {weights}")
+
+
+class LoadedModel:
+    """A loaded detector bound to the backend and image size it was warmed up with."""
+
+    def __init__(self, model, weights: str, backend: str, int8: bool, device: str, image_size: int):
+        self.model = model
+        self.weights = weights
+        self.backend = backend
+        self.int8 = int8
+        self.device = device
+        self.image_size = image_size
+
+    def __call__(self, frames):
+        if self.backend == 'torch':
+            return self.model(frames, imgsz=self.image_size, verbose=False)
+        return self.model(frames, imgsz=self.image_size, device=self.device, verbose=False)
+
+
+class ModelRegistry:
+    """Loads detectors on first use and caches them per (weights, backend, device, image size).
+
+    Nothing is loaded at import time. The server starts ``warm_up`` as a
+    background task and reports ``status`` until the default model is ready.
+    The ONNX Runtime and OpenVINO backends export the weights once into the
+    model cache and load the artifact through Ultralytics, so every backend
+    returns the same ``Results`` structure.
+    """
+
+    def __init__(self):
+        self._models: Dict[Tuple[str, str, bool, str, int], LoadedModel] = {}
+        self._lock = threading.Lock()
+        self.status = 'idle'
+        self.error: Optional[str] = None
+
+    @property
+    def ready(self) -> bool:
+        return self.status == 'ready'
+
+    def get(self, weights: str = None, device: str = None, image_size: int = None,
+            backend: str = None, int8: bool = None) -> LoadedModel:
+        weights = resolve_weights(weights or config.MODEL_WEIGHTS)
+        backend = backend or config.MODEL_BACKEND
+        if backend not in BACKENDS:
+            raise ValueError(f"Unknown inference backend: {backend}")
+        int8 = config.MODEL_INT8 if int8 is None else int8
+        int8 = int8 and backend != 'torch'
+        # Exported backends are meant for CPU-only edge boxes
+        device = device or config.MODEL_DEVICE or (self._default_device() if backend == 'torch' else 'cpu')
+        image_size = image_size or config.MODEL_IMAGE_SIZE
+        key = (weights, backend, int8, device, image_size)
+
+        model = self._models.get(key)
+        if model is None:
+            with self._lock:
+                model = self._models.get(key)
+                if model is None:
+                    model = self._load(*key)
+                    self._models[key] = model
+        return model
+
+    @staticmethod
+    def _default_device() -> str:
+        import torch
+        return 'cuda' if torch.cuda.is_available() else 'cpu'
+
+    def _load(self, weights: str, backend: str, int8: bool, device: str, image_size: int) -> LoadedModel:
+        """Load, configure and warm up a YOLO model."""
+        # Imported here so importing the package stays cheap
+        from ultralytics import YOLO
+
+        logger.info(f"Loading {weights} ({backend}{' int8' if int8 else ''}) on {device} at {image_size}px...")
+        if backend == 'torch':
+            if config.TORCH_THREADS:
+                import torch
+                torch.set_num_threads(config.TORCH_THREADS)
+            vehicle_model = YOLO(weights)
+        else:
+            vehicle_model = YOLO(export_model(weights, backend, int8=int8), task='detect')
+        vehicle_model.conf = 0.3  # Lower confidence threshold for better detection
+        vehicle_model.iou = 0.45  # Lower IOU threshold
+        vehicle_model.max_det = 50  # Limit maximum detections
+        vehicle_model.classes = [0, 1, 2, 3, 5, 7]  # Only detect relevant classes
+        if backend == 'torch':
+            vehicle_model.to(device)
+
+        loaded = LoadedModel(vehicle_model, weights, backend, int8, device, image_size)
+        # Test model with a dummy inference
+        loaded([np.zeros((image_size, image_size, 3), dtype=np.uint8)])
+
+        logger.info("Model loaded successfully")
+        return loaded
+
+    async def warm_up(self, image_sizes: Sequence[int] = ()):
+        """Load the default model off the event loop and track readiness.
+
+        Models for the other ``image_sizes`` are loaded afterwards, so switching
+        input size later does not stall a batch on a cold load.
+        """
+        self.status = 'warming'
+        loop = asyncio.get_running_loop()
+        try:
+            await loop.run_in_executor(None, self.get)
+            self.status = 'ready'
+        except Exception as e:
+            logger.error(f"Error initializing models: {str(e)}")
+            self.status = 'error'
+            self.error = str(e)
+            return
+
+        for image_size in image_sizes:
+            try:
+                await loop.run_in_executor(None, lambda: self.get(image_size=image_size))
+            except Exception as e:
+                logger.error(f"Error preloading {image_size}px model: {str(e)}")
+
+    def readiness(self) -> Dict:
+        return {
+            'status': self.status,
+            'error': self.error,
+            'models': [
+                {'weights': os.path.basename(m.weights), 'backend': m.backend, 'int8': m.int8,
+                 'device': m.device, 'image_size': m.image_size}
+                for m in self._models.values()
+            ]
+        }
+
+
+# Shared registry used by the analyzer and the server
+registry = ModelRegistry()
@@ -0,0 +1,80 @@
+import time
+from typing import Dict, Optional
+
+import cv2
+import numpy as np
+
+
+class MotionGate:
+    """Cheap per-stream check of whether a frame is worth running the detector on.
+
+    Each frame is shrunk to a small grayscale thumbnail and compared with the
+    thumbnail of the last frame that went through inference. If the fraction
+    of changed pixels stays below ``threshold`` the frame is gated and the
+    analyzer carries its previous results forward. A full inference is still
+    forced every ``max_interval`` seconds so slow drifts and stopped vehicles
+    are picked up.
+
+    A frame that passes the gate only becomes the new reference once the
+    analyzer calls ``commit``, after its inference went through; a frame that
+    is shed or dropped on the way leaves the reference as it was.
+    """
+
+    def __init__(self, threshold: float = 0.002, pixel_delta: int = 25,
+                 downscale_width: int = 160, max_interval: float = 2.0):
+        self.threshold = threshold  # Fraction of thumbnail pixels that must change
+        self.pixel_delta = pixel_delta  # Gray-level change that counts as motion
+        self.downscale_width = downscale_width
+        self.max_interval = max_interval  # Seconds between forced inferences
+        self.reference: Optional[np.ndarray] = None
+        self.reference_time = 0.0
+        self.candidate: Optional[np.ndarray] = None  # Thumbnail of the last frame let through
+        self.last_activity = 0.0
+        self.checks = 0
+        self.gated = 0
+        self.forced = 0
+
+    def _thumbnail(self, frame: np.ndarray) -> np.ndarray:
+        height, width = frame.shape[:2]
+        size = (self.downscale_width, max(round(height * self.downscale_width / width), 1))
+        small = cv2.resize(frame, size, interpolation=cv2.INTER_AREA)
+        if small.ndim == 3:
+            small = cv2.cvtColor(small, cv2.COLOR_BGR2GRAY)
+        return cv2.GaussianBlur(small, (5, 5), 0)
+
+    def should_infer(self, frame: np.ndarray, now: Optional[float] = None) -> bool:
+        """True if ``frame`` differs enough from the last inferred frame (or inference is overdue)."""
+        now = time.time() if now is None else now
+        self.checks += 1
+        thumbnail = self._thumbnail(frame)
+
+        if self.reference is None or self.reference.shape != thumbnail.shape:
+            self.last_activity = 1.0
+        else:
+            changed = cv2.absdiff(thumbnail, self.reference) > self.pixel_delta
+            self.last_activity = float(np.count_nonzero(changed)) / changed.size
+            if self.last_activity < self.threshold:
+                if now - self.reference_time < self.max_interval:
+                    self.gated += 1
+                    return False
+                self.forced += 1
+
+        self.candidate = thumbnail
+        return True
+
+    def commit(self, now: Optional[float] = None):
+        """Make the last frame let through the reference; call once its inference succeeded."""
+        if self.candidate is None:
+            return
+        self.reference = self.candidate
+        self.reference_time = time.time() if now is None else now
+        self.candidate = None
+
+    def stats(self) -> Dict:
+        return {
+            'checks': self.checks,
+            'gated': self.gated,
+            'forced': self.forced,
+            'hit_rate': self.gated / self.checks if self.checks else 0.0,
+            'last_activity': self.last_activity
+        }
@@ -0,0 +1,76 @@
+import cv2
+import numpy as np
+from typing import Optional, Tuple
+
+
+def letterbox(image: np.ndarray, size: int, color: int = 114) -> Tuple[np.ndarray, float, Tuple[int, int]]:
+    """Fit ``image`` into a ``size`` x ``size`` canvas keeping its aspect ratio.
+
+    Returns the canvas, the scale applied and the (left, top) padding, so
+    coordinates on the canvas map back with ``(xy - padding) / scale``.
+    """
+    height, width = image.shape[:2]
+    scale = min(size / height, size / width)
+    new_width, new_height = max(round(width * scale), 1), max(round(height * scale), 1)
+    if (new_width, new_height) != (width, height):
+        image = cv2.resize(image, (new_width, new_height), interpolation=cv2.INTER_LINEAR)
+    canvas = np.full((size, size) + image.shape[2:], color, dtype=image.dtype)
+    left, top = (size - new_width) // 2, (size - new_height) // 2
+    canvas[top:top + new_height, left:left + new_width] = image
+    return canvas, scale, (left, top)
+
+
+# libjpeg decodes at 1/2, 1/4 or 1/8 scale in the DCT, skipping most of the work
+_REDUCED_DECODE_FLAGS = ((8, cv2.IMREAD_REDUCED_COLOR_8), (4, cv2.IMREAD_REDUCED_COLOR_4),
+                         (2, cv2.IMREAD_REDUCED_COLOR_2))
+# Start-of-frame markers carrying the image dimensions (SOF0-SOF15 minus DHT, JPG and DAC)
+_SOF_MARKERS = {0xC0, 0xC1, 0xC2, 0xC3, 0xC5, 0xC6, 0xC7, 0xC9, 0xCA, 0xCB, 0xCD, 0xCE, 0xCF}
+
+
+def jpeg_size(data) -> Optional[Tuple[int, int]]:
+    """``(width, height)`` from a JPEG's frame header without decoding it; None if not a JPEG."""
+    data = memoryview(data).cast('B')
+    if len(data) < 4 or data[0] != 0xFF or data[1] != 0xD8:
+        return None
+    position = 2
+    while position + 4 <= len(data):
+        if data[position] != 0xFF:
+            return None
+        marker = data[position + 1]
+        if marker == 0xFF:  # Fill byte
+            position += 1
+            continue
+        if marker == 0x01 or 0xD0 <= marker <= 0xD7:  # Markers without a length
+            position += 2
+            continue
+        length = (data[position + 2] << 8) | data[position + 3]
+        if marker in _SOF_MARKERS:
+            if position + 9 > len(data):
+                return None
+            height = (data[position + 5] << 8) | data[position + 6]
+            width = (data[position + 7] << 8) | data[position + 8]
+            return width, height
+        if marker == 0xDA:  # Entropy-coded data follows; no frame header found
+            return None
+        position += 2 + length
+    return None
+
+
+def decode_image(data, target_width: Optional[int] = None) -> Optional[np.ndarray]:
+    """Decode an encoded image into BGR, JPEGs at reduced resolution where possible.
+
+    With ``target_width`` set, JPEGs are decoded at the largest 1/2, 1/4 or
+    1/8 scale that still leaves at least ``target_width`` pixels across, so
+    the caller's own downscale is only a small correction. Other formats are
+    decoded in full. Returns None if the data cannot be decoded.
+    """
+    buffer = np.frombuffer(data, dtype=np.uint8)
+    flag = cv2.IMREAD_COLOR
+    if target_width:
+        size = jpeg_size(buffer)
+        if size is not None:
+            for factor, reduced_flag in _REDUCED_DECODE_FLAGS:
+                if size[0] // factor >= target_width:
+                    flag = reduced_flag
+                    break
+    return cv2.imdecode(buffer, flag)
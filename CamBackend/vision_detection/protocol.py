@@ -0,0 +1,90 @@
+import struct
+from collections import namedtuple
+from typing import Optional, Tuple
+
+import cv2
+import numpy as np
+
+from .preprocess import decode_image
+
+# Binary frame layout (little endian), followed directly by the payload:
+#   magic      2s   b'VF'
+#   version    B    PROTOCOL_VERSION
+#   encoding   B    ENCODING_* below
+#   stream_id  I    client-chosen stream number, echoed back in results
+#   sequence   I    frame sequence number, echoed back in results
+#   timestamp  d    capture time in seconds since the epoch
+#   width      H    frame width (required for raw encodings, 0 for JPEG)
+#   height     H    frame height (required for raw encodings, 0 for JPEG)
+FRAME_MAGIC = b'VF'
+PROTOCOL_VERSION = 1
+FRAME_HEADER = struct.Struct('<2sBBIIdHH')
+
+ENCODING_JPEG = 0
+ENCODING_BGR = 1   # Packed 8-bit BGR, width * height * 3 bytes
+ENCODING_I420 = 2  # Planar YUV 4:2:0, width * height * 3 / 2 bytes
+
+ENCODINGS = {
+    'jpeg': ENCODING_JPEG,
+    'bgr': ENCODING_BGR,
+    'i420': ENCODING_I420
+}
+
+FrameHeader = namedtuple('FrameHeader', ['encoding', 'stream_id', 'sequence', 'timestamp', 'width', 'height'])
+
+
+class ProtocolError(ValueError):
+    """Raised when a binary frame message is malformed."""
+
+
+def pack_frame(payload: bytes, encoding: int = ENCODING_JPEG, stream_id: int = 0, sequence: int = 0,
+               timestamp: float = 0.0, width: int = 0, height: int = 0) -> bytes:
+    """Build a binary frame message (used by clients and the benchmark harness)."""
+    header = FRAME_HEADER.pack(FRAME_MAGIC, PROTOCOL_VERSION, encoding, stream_id,
+                               sequence, timestamp, width, height)
+    return header + payload
+
+
+def parse_frame(message: bytes) -> Tuple[FrameHeader, memoryview]:
+    """Split a binary frame message into its header and a zero-copy payload view."""
+    if len(message) < FRAME_HEADER.size:
+        raise ProtocolError(f"Frame message too short ({len(message)} bytes)")
+    magic, version, encoding, stream_id, sequence, timestamp, width, height = \
+        FRAME_HEADER.unpack_from(message)
+    if magic != FRAME_MAGIC:
+        raise ProtocolError("Bad frame magic")
+    if version != PROTOCOL_VERSION:
+        raise ProtocolError(f"Unsupported protocol version {version}")
+    if encoding not in ENCODINGS.values():
+        raise ProtocolError(f"Unknown frame encoding {encoding}")
+    header = FrameHeader(encoding, stream_id, sequence, timestamp, width, height)
+    return header, memoryview(message)[FRAME_HEADER.size:]
+
+
+def decode_payload(header: FrameHeader, payload: memoryview, target_width: Optional[int] = None) -> np.ndarray:
+    """Turn a frame payload into a BGR image without intermediate copies where possible.
+
+    JPEG payloads are decoded at reduced resolution when that still leaves
+    ``target_width`` pixels across (see ``decode_image``).
+    """
+    buffer = np.frombuffer(payload, dtype=np.uint8)
+    if header.encoding == ENCODING_JPEG:
+        frame = decode_image(buffer, target_width)
+        if frame is None or frame.size == 0:
+            raise ProtocolError("Failed to decode JPEG payload")
+        return frame
+
+    width, height = header.width, header.height
+    if width == 0 or height == 0:
+        raise ProtocolError("Raw frames must carry width and height")
+    if header.encoding == ENCODING_BGR:
+        if buffer.size != width * height * 3:
+            raise ProtocolError(f"BGR payload is {buffer.size} bytes, expected {width * height * 3}")
+        return buffer.reshape(height, width, 3)
+
+    # ENCODING_I420
+    if width % 2 or height % 2:
+        raise ProtocolError("I420 frames need even width and height")
+    if buffer.size != width * height * 3 // 2:
+        raise ProtocolError(f"I420 payload is {buffer.size} bytes, expected {width * height * 3 // 2}")
+    return cv2.cvtColor(buffer.reshape(height * 3 // 2, width), cv2.COLOR_YUV2BGR_I420)
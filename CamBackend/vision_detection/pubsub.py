@@ -0,0 +1,159 @@
+import asyncio
+import json
+import logging
+from typing import Dict, Optional, Set
+
+from fastapi import WebSocket
+
+from .compact import CompactResultEncoder
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Close code for subscribers dropped for falling behind ("try again later")
+SLOW_CONSUMER_CLOSE_CODE = 1013
+
+
+class Subscriber:
+    """One read-only connection, with its own bounded send queue and sender task.
+
+    The sender task is the only writer to the socket, so results, hello
+    replies and the final close never interleave. ``encoder`` is set when the
+    client asked for compact results.
+    """
+
+    close_timeout = 5.0  # Seconds a dropped subscriber gets to take its close frame
+
+    def __init__(self, websocket: WebSocket, stream_id: str, max_queue: int = 8):
+        self.websocket = websocket
+        self.stream_id = stream_id
+        self.encoder: Optional[CompactResultEncoder] = None
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=max_queue)
+        self.sent = 0
+        self.closed = False
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self):
+        self._task = asyncio.get_running_loop().create_task(self._send_loop())
+
+    def offer(self, item) -> bool:
+        """Queue ``item`` without waiting; False when the subscriber has fallen behind."""
+        if self.closed:
+            return False
+        try:
+            self.queue.put_nowait(item)
+            return True
+        except asyncio.QueueFull:
+            return False
+
+    async def _send_loop(self):
+        try:
+            while True:
+                kind, payload = await self.queue.get()
+                if kind == 'close':
+                    await self.websocket.close(code=payload)
+                    return
+                if kind == 'json':
+                    await self.websocket.send_json(payload)
+                elif kind == 'text':
+                    await self.websocket.send_text(payload)
+                elif self.encoder is not None:
+                    message = self.encoder.encode(payload)
+                    if isinstance(message, bytes):
+                        await self.websocket.send_bytes(message)
+                    else:
+                        await self.websocket.send_text(message)
+                else:
+                    await self.websocket.send_json(payload)
+                self.sent += 1
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.warning(f"Subscriber of stream {self.stream_id} failed: {str(e)}")
+        finally:
+            self.closed = True
+
+    def close(self, code: Optional[int] = None):
+        """Stop sending; with ``code`` the socket is closed once the sender gets to it."""
+        if self.closed:
+            return
+        self.closed = True
+        if code is None or self._task is None:
+            if self._task is not None:
+                self._task.cancel()
+            return
+        # Make room so the close always fits in the queue
+        while not self.queue.empty():
+            self.queue.get_nowait()
+        self.queue.put_nowait(('close', code))
+        # A client that stopped reading can leave a send blocked indefinitely
+        asyncio.get_running_loop().call_later(self.close_timeout, self._task.cancel)
+
+
+class ResultHub:
+    """Fans each stream's analysis results out to any number of read-only subscribers.
+
+    Whatever produces a stream's results (a client pushing frames or a
+    server-side source) calls ``publish`` once per result; the cost of
+    inference does not depend on the audience. Publishing never waits on a
+    socket: each subscriber has a bounded queue drained by its own task, and a
+    subscriber whose queue is full is dropped (closed with 1013) instead of
+    holding up the producer. Full results are JSON-encoded once per publish
+    and shared by every subscriber on the full result stream.
+    """
+
+    def __init__(self, max_queue: int = 8):
+        self.max_queue = max_queue
+        self.subscribers: Dict[str, Set[Subscriber]] = {}
+        self.published = 0
+        self.dropped = 0
+
+    def subscribe(self, websocket: WebSocket, stream_id: str) -> Subscriber:
+        subscriber = Subscriber(websocket, stream_id, max_queue=self.max_queue)
+        subscriber.start()
+        self.subscribers.setdefault(stream_id, set()).add(subscriber)
+        return subscriber
+
+    def unsubscribe(self, subscriber: Subscriber):
+        subscribers = self.subscribers.get(subscriber.stream_id)
+        if subscribers is not None:
+            subscribers.discard(subscriber)
+            if not subscribers:
+                del self.subscribers[subscriber.stream_id]
+        subscriber.close()
+
+    def publish(self, stream_id: str, result: Dict):
+        subscribers = self.subscribers.get(stream_id)
+        if not subscribers:
+            return
+        self.published += 1
+        text = None
+        for subscriber in list(subscribers):
+            if subscriber.encoder is None:
+                if text is None:
+                    text = json.dumps(result)
+                item = ('text', text)
+            else:
+                item = ('result', result)
+            if not subscriber.offer(item):
+                self._drop(subscriber)
+
+    def _drop(self, subscriber: Subscriber):
+        if not subscriber.closed:
+            self.dropped += 1
+            logger.warning(f"Dropping slow subscriber of stream {subscriber.stream_id}")
+        subscribers = self.subscribers.get(subscriber.stream_id)
+        if subscribers is not None:
+            subscribers.discard(subscriber)
+            if not subscribers:
+                del self.subscribers[subscriber.stream_id]
+        subscriber.close(SLOW_CONSUMER_CLOSE_CODE)
+
+    def counts(self) -> Dict[str, int]:
+        return {stream_id: len(subscribers) for stream_id, subscribers in self.subscribers.items()}
+
+    def close(self):
+        for subscribers in list(self.subscribers.values()):
+            for subscriber in list(subscribers):
+                self.unsubscribe(subscriber)
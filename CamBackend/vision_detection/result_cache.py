@@ -0,0 +1,98 @@
+import asyncio
+import hashlib
+import time
+from collections import OrderedDict
+from typing import Awaitable, Callable, Dict, Optional, Tuple
+
+
+class ResultCache:
+    """Bounded LRU of analysis results keyed by a hash of the uploaded bytes.
+
+    Keys also cover ``fingerprint`` (model weights, backend, input size,
+    thresholds), so a configuration change never serves stale results.
+    Entries expire ``ttl`` seconds after they were computed and the least
+    recently used entry is evicted beyond ``max_entries``. Identical requests
+    arriving while the first is still being analyzed wait for that single
+    computation instead of running their own.
+    """
+
+    def __init__(self, fingerprint: str, max_entries: int = 256, ttl: float = 600.0):
+        self.fingerprint = fingerprint.encode()
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.entries: 'OrderedDict[str, Tuple[float, Dict]]' = OrderedDict()
+        self.in_flight: Dict[str, asyncio.Future] = {}
+        self.hits = 0
+        self.misses = 0
+        self.shared = 0  # Requests answered by another request's computation
+        self.evictions = 0
+        self.expirations = 0
+
+    def key(self, contents: bytes) -> str:
+        digest = hashlib.blake2b(self.fingerprint, digest_size=16)
+        digest.update(contents)
+        return digest.hexdigest()
+
+    def get(self, key: str) -> Optional[Dict]:
+        entry = self.entries.get(key)
+        if entry is None:
+            return None
+        stored_at, value = entry
+        if time.monotonic() - stored_at > self.ttl:
+            del self.entries[key]
+            self.expirations += 1
+            return None
+        self.entries.move_to_end(key)
+        return value
+
+    def put(self, key: str, value: Dict):
+        self.entries[key] = (time.monotonic(), value)
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+            self.evictions += 1
+
+    async def get_or_compute(self, key: str, compute: Callable[[], Awaitable[Dict]]) -> Tuple[Dict, str]:
+        """Return ``(result, outcome)`` where outcome is 'hit', 'shared' or 'miss'.
+
+        Only successful computations are cached; a failure is raised to every
+        request that was waiting on it.
+        """
+        value = self.get(key)
+        if value is not None:
+            self.hits += 1
+            return value, 'hit'
+
+        future = self.in_flight.get(key)
+        if future is not None:
+            self.shared += 1
+            # Shielded so one waiter going away does not cancel the others
+            return await asyncio.shield(future), 'shared'
+
+        self.misses += 1
+        future = asyncio.get_running_loop().create_future()
+        self.in_flight[key] = future
+        try:
+            value = await compute()
+        except BaseException as e:
+            if isinstance(e, asyncio.CancelledError):
+                e = RuntimeError("Analysis of an identical upload was cancelled")
+            future.set_exception(e)
+            future.exception()  # Nobody may be waiting; mark it retrieved
+            raise
+        finally:
+            self.in_flight.pop(key, None)
+        future.set_result(value)
+        self.put(key, value)
+        return value, 'miss'
+
+    def stats(self) -> Dict:
+        return {
+            'entries': len(self.entries),
+            'max_entries': self.max_entries,
+            'hits': self.hits,
+            'misses': self.misses,
+            'shared': self.shared,
+            'evictions': self.evictions,
+            'expirations': self.expirations
+        }
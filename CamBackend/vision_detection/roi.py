@@ -0,0 +1,54 @@
+import numpy as np
+from typing import Tuple
+
+from .association import box_centers
+from .preprocess import letterbox
+from .spatial import points_in_polygon
+
+
+class RegionOfInterest:
+    """Part of a fixed camera's view that is worth running the detector on.
+
+    The polygon is given in normalized [0, 1] frame coordinates so it holds
+    for any resolution the camera streams at. Frames are cropped to the
+    polygon's bounding box and letterboxed to the model input size, and
+    detections are mapped back to full-frame pixels and kept only if their
+    center lies inside the polygon.
+    """
+
+    def __init__(self, polygon):
+        self.polygon = np.asarray(polygon, dtype=np.float64).reshape(-1, 2)
+        if len(self.polygon) < 3:
+            raise ValueError("ROI polygon needs at least 3 points")
+        self.polygon = np.clip(self.polygon, 0.0, 1.0)
+
+    def pixel_polygon(self, frame_shape) -> np.ndarray:
+        height, width = frame_shape[:2]
+        return self.polygon * (width, height)
+
+    def bounds(self, frame_shape) -> Tuple[int, int, int, int]:
+        """Pixel bounding box (x0, y0, x1, y1) of the polygon within the frame."""
+        height, width = frame_shape[:2]
+        polygon = self.pixel_polygon(frame_shape)
+        x0, y0 = np.floor(polygon.min(axis=0)).astype(int).tolist()
+        x1, y1 = np.ceil(polygon.max(axis=0)).astype(int).tolist()
+        return max(x0, 0), max(y0, 0), min(max(x1, x0 + 1), width), min(max(y1, y0 + 1), height)
+
+    def crop(self, frame: np.ndarray) -> np.ndarray:
+        x0, y0, x1, y1 = self.bounds(frame.shape)
+        return frame[y0:y1, x0:x1]
+
+    def prepare(self, frame: np.ndarray, input_size: int):
+        """Crop to the ROI and letterbox; returns the model input and the inverse transform."""
+        x0, y0, x1, y1 = self.bounds(frame.shape)
+        canvas, scale, (left, top) = letterbox(frame[y0:y1, x0:x1], input_size)
+        return canvas, (scale, x0 - left / scale, y0 - top / scale)
+
+    def restore(self, xyxys: np.ndarray, transform, frame_shape) -> Tuple[np.ndarray, np.ndarray]:
+        """Map model-input boxes to full-frame pixels; also returns the inside-polygon mask."""
+        scale, offset_x, offset_y = transform
+        height, width = frame_shape[:2]
+        boxes = xyxys / scale + np.array([offset_x, offset_y, offset_x, offset_y], dtype=np.float32)
+        boxes = np.clip(boxes, 0, [width, height, width, height]).astype(np.float32)
+        inside = points_in_polygon(box_centers(boxes), self.pixel_polygon(frame_shape))
+        return boxes, inside
@@ -0,0 +1,131 @@
+import math
+import time
+from typing import Dict, Iterable, List, Optional
+
+import numpy as np
+
+SPEED_BIN_WIDTH = 2.0  # km/h per speed histogram bin
+SPEED_BINS = 100  # The last bin also collects everything faster
+SPEED_PERCENTILES = (50, 85, 95)
+
+# Per-bucket scalar totals
+_FRAMES, _VEHICLES, _CONGESTION, _VIOLATIONS, _SPEED_SAMPLES, _SPEED_SUM = range(6)
+
+
+class RollingStats:
+    """Time-bucketed traffic counters for one stream over a fixed horizon.
+
+    Results are added to the bucket covering the current ``bucket_seconds``
+    slice of a ring of ``horizon / bucket_seconds`` buckets. A bucket is
+    cleared when the ring wraps back round to it, so an update costs the same
+    however much history is kept and memory never grows. Window summaries add
+    up the buckets they cover instead of scanning raw results.
+
+    Tracks are numbered in order of appearance, so a detection whose track ID
+    is above the highest one seen so far is a vehicle entering the view; these
+    drive the per-type "vehicles per minute" rates. Speeds go into a fixed
+    histogram per bucket, from which percentiles are read.
+    """
+
+    def __init__(self, class_names: List[str], bucket_seconds: float = 10.0, horizon: float = 3600.0,
+                 clock=time.monotonic):
+        self.class_names = list(class_names)
+        self._class_index = {name: index for index, name in enumerate(self.class_names)}
+        self.bucket_seconds = bucket_seconds
+        self.buckets = max(int(math.ceil(horizon / bucket_seconds)), 1)
+        self.clock = clock
+        self.totals = np.zeros((self.buckets, 6))
+        self.new_vehicles = np.zeros((self.buckets, len(self.class_names)), dtype=np.int64)
+        self.speed_histogram = np.zeros((self.buckets, SPEED_BINS), dtype=np.int64)
+        self.bucket_ids = np.full(self.buckets, -1, dtype=np.int64)  # Absolute bucket number held in each row
+        self.last_track_id = -1
+        self.started_at: Optional[float] = None
+
+    def _row(self, now: float) -> int:
+        bucket = int(now // self.bucket_seconds)
+        row = bucket % self.buckets
+        if self.bucket_ids[row] != bucket:
+            # The ring has come round; this row's old contents are past the horizon
+            self.bucket_ids[row] = bucket
+            self.totals[row] = 0
+            self.new_vehicles[row] = 0
+            self.speed_histogram[row] = 0
+        return row
+
+    def observe(self, result: Dict, speeds: Optional[np.ndarray] = None, now: Optional[float] = None):
+        """Add one analysis result; ``speeds`` are the per-vehicle speeds behind it, if measured."""
+        now = self.clock() if now is None else now
+        if self.started_at is None:
+            self.started_at = now
+        row = self._row(now)
+        totals = self.totals[row]
+        totals[_FRAMES] += 1
+        totals[_VEHICLES] += result['total_vehicles']
+        totals[_CONGESTION] += result['congestion_level']
+        totals[_VIOLATIONS] += len(result['traffic_violations'])
+
+        last_track_id = self.last_track_id
+        for detection in result['detections']:
+            track_id = detection['id']
+            if track_id is not None and track_id > self.last_track_id:
+                self.new_vehicles[row, self._class_index[detection['type']]] += 1
+                last_track_id = max(last_track_id, track_id)
+        self.last_track_id = last_track_id
+
+        if speeds is not None and len(speeds):
+            bins = np.minimum((np.asarray(speeds) / SPEED_BIN_WIDTH).astype(int), SPEED_BINS - 1)
+            self.speed_histogram[row] += np.bincount(bins, minlength=SPEED_BINS)
+            totals[_SPEED_SAMPLES] += len(speeds)
+            totals[_SPEED_SUM] += float(np.sum(speeds))
+
+    def summary(self, window: float, now: Optional[float] = None) -> Dict:
+        """Aggregates over the last ``window`` seconds (rounded up to whole buckets)."""
+        now = self.clock() if now is None else now
+        current = int(now // self.bucket_seconds)
+        count = min(max(int(math.ceil(window / self.bucket_seconds)), 1), self.buckets)
+        rows = (self.bucket_ids > current - count) & (self.bucket_ids <= current)
+
+        totals = self.totals[rows].sum(axis=0)
+        new_vehicles = self.new_vehicles[rows].sum(axis=0)
+        histogram = self.speed_histogram[rows].sum(axis=0)
+        # Rates are per minute actually observed, not per minute of a window longer than the history
+        kept = count * self.bucket_seconds
+        covered = min(window, kept, now - self.started_at) if self.started_at is not None else 0.0
+        minutes = covered / 60.0
+        frames = int(totals[_FRAMES])
+        samples = int(totals[_SPEED_SAMPLES])
+
+        return {
+            'window_seconds': window,
+            'covered_seconds': round(covered, 1),
+            'frames': frames,
+            'vehicles': int(new_vehicles.sum()),
+            'vehicles_per_minute': round(new_vehicles.sum() / minutes, 2) if minutes else 0.0,
+            'vehicles_by_type': {name: int(count) for name, count in zip(self.class_names, new_vehicles)},
+            'mean_vehicles_in_view': round(totals[_VEHICLES] / frames, 2) if frames else 0.0,
+            'speed': {
+                'samples': samples,
+                'mean': round(totals[_SPEED_SUM] / samples, 2) if samples else None,
+                **{f'p{q}': _histogram_percentile(histogram, q) for q in SPEED_PERCENTILES}
+            },
+            'mean_congestion': round(totals[_CONGESTION] / frames, 4) if frames else 0.0,
+            'violations': int(totals[_VIOLATIONS]),
+            'violations_per_minute': round(totals[_VIOLATIONS] / minutes, 2) if minutes else 0.0
+        }
+
+    def summaries(self, windows: Iterable[float]) -> Dict[str, Dict]:
+        now = self.clock()
+        return {f'{window:g}s': self.summary(window, now) for window in windows}
+
+
+def _histogram_percentile(histogram: np.ndarray, q: float) -> Optional[float]:
+    """Percentile of the speeds binned in ``histogram``, interpolated within its bin."""
+    total = histogram.sum()
+    if not total:
+        return None
+    cumulative = np.cumsum(histogram)
+    target = total * q / 100.0
+    index = int(np.searchsorted(cumulative, target))
+    before = cumulative[index - 1] if index else 0
+    fraction = (target - before) / histogram[index] if histogram[index] else 0.0
+    return round((index + fraction) * SPEED_BIN_WIDTH, 2)
@@ -1,13 +1,35 @@
 from fastapi import FastAPI, WebSocket, HTTPException, UploadFile, WebSocketDisconnect
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
-import cv2
 import numpy as np
 import base64
+import json
 import logging
 import asyncio
-from .analyzer import TrafficAnalyzer
-from typing import Set, Dict
+import time
+import uuid
+from .adaptive import QualityController
+from .admission import AdmissionController
+from .analyzer import CONFIDENCE_THRESHOLD, TrafficAnalyzer, detect_batch
+from . import config
+from .batching import BatchScheduler
+from .cameras import load_camera_configs
+from .ingest import SourceClosed, VideoSource, redact_source
+from .compact import CLASS_NAMES, MSGPACK_AVAILABLE, CompactResultEncoder
+from .inference import InferenceExecutor
+from .mailbox import FrameMailbox, MailboxClosed
+from .metrics import StageMetrics, format_metric
+from .models import registry
+from .motion import MotionGate
+from .preprocess import decode_image
+from .result_cache import ResultCache
+from .rolling import RollingStats
+from .pubsub import ResultHub
+from .protocol import ENCODINGS, PROTOCOL_VERSION, FrameHeader, ProtocolError, decode_payload, parse_frame
+from .workers import InferenceWorkerPool
+from .sessions import AnalysisSession, SessionLimitReached, SessionRegistry
+from .uploads import iter_upload_images
+from typing import AsyncIterator, Set, Dict, List, Optional
 from concurrent.futures import ThreadPoolExecutor
 
 # Configure logging
@@ -16,26 +38,153 @@ logger = logging.getLogger(__name__)
 
 # Initialize thread pool for image processing
 thread_pool = ThreadPoolExecutor(max_workers=2)
+# Bulk uploads decode on their own threads so they never hold up live streams
+batch_decode_pool = ThreadPoolExecutor(max_workers=config.BATCH_DECODE_WORKERS, thread_name_prefix='batch-decode')
+
+
+class SourceRequest(BaseModel):
+    stream_id: str  # A camera from the camera config with a "source" set
+    source: Optional[str] = None  # If given, must be that configured source
+    loop: Optional[bool] = None  # Restart video files when they end; defaults to the camera's "loop"
 
 class VisionServer:
     def __init__(self):
-        self.analyzer = TrafficAnalyzer()
+        inference_timeout = 5.0  # Seconds a model batch may take before its frames are dropped
+        # Optional inference worker processes fed through a shared-memory frame ring
+        workers = config.INFERENCE_WORKERS
+        self.worker_pool = None
+        if workers > 0:
+            self.worker_pool = InferenceWorkerPool(
+                workers, slots=config.FRAME_RING_SLOTS,
+                image_sizes=config.IMAGE_SIZES if config.ADAPTIVE_QUALITY else (),
+                result_timeout=inference_timeout
+            )
+        # Dedicated inference threads with a bounded job queue and per-job timeout;
+        # with worker processes each thread keeps one batch in flight
+        threads = max(workers, 1)
+        self.inference = InferenceExecutor(max_workers=threads, max_pending=4 * threads, timeout=inference_timeout)
+        # Frames from all connected streams share model batches
+        predict = self.worker_pool.predict if self.worker_pool is not None else detect_batch
+        self.scheduler = BatchScheduler(self.inference, predict, max_batch_size=8, max_wait=0.015,
+                                        max_in_flight=threads)
+        # Per-camera settings such as ROI polygons
+        self.cameras = load_camera_configs(config.CAMERA_CONFIG)
+        # One isolated analyzer per camera stream, sharing inference capacity
+        self.sessions = SessionRegistry(
+            self.create_analyzer,
+            max_sessions=32,
+            idle_timeout=120.0,
+            on_evict=self._on_evict
+        )
+        # Per-stream, per-stage latency histograms exposed on /metrics
+        self.metrics = StageMetrics()
         self.active_connections: Set[WebSocket] = set()
-        self.processing_lock = asyncio.Lock()
-        self.frame_interval = 1/30  # Target 30 FPS
-        self.consecutive_errors = 0
+        self.connection_sessions: Dict[WebSocket, AnalysisSession] = {}
+        self.result_encoders: Dict[WebSocket, CompactResultEncoder] = {}  # Connections on compact results
+        # Server-side ingest: video sources read by the server instead of pushed by clients
+        self.sources: Dict[str, VideoSource] = {}
+        self.source_tasks: Dict[str, asyncio.Task] = {}
+        # Read-only subscribers to each stream's results
+        self.hub = ResultHub(max_queue=config.SUBSCRIBER_QUEUE_SIZE)
+        # Only undecodable frames count; being slow or shedding load never closes a connection
         self.max_consecutive_errors = 5
+        # Shares the inference budget between streams by priority class
+        self.admission = AdmissionController(budget=config.INFERENCE_BUDGET, min_rate=config.MIN_STREAM_RATE,
+                                             latency=self.scheduler.take_latency,
+                                             target_latency=config.ADMISSION_TARGET_LATENCY)
+        # Repeated uploads of the same image are answered without inference
+        self.result_cache = None
+        if config.RESULT_CACHE_SIZE > 0:
+            fingerprint = (f"{config.MODEL_WEIGHTS}|{config.MODEL_BACKEND}|{config.MODEL_INT8}|"
+                           f"{config.MODEL_IMAGE_SIZE}|{CONFIDENCE_THRESHOLD}")
+            self.result_cache = ResultCache(fingerprint, max_entries=config.RESULT_CACHE_SIZE,
+                                            ttl=config.RESULT_CACHE_TTL)
+        self.warmup_task: Optional[asyncio.Task] = None
+
+    def create_analyzer(self, stream_id: str) -> TrafficAnalyzer:
+        camera = self.cameras.get(stream_id)
+        settings = camera.settings if camera else {}
+        motion_gate = None
+        if settings.get('motion_gate', config.MOTION_GATE):
+            motion_gate = MotionGate(threshold=settings.get('motion_threshold', config.MOTION_THRESHOLD),
+                                     max_interval=config.MOTION_MAX_INTERVAL)
+        controller = None
+        if config.ADAPTIVE_QUALITY:
+            controller = QualityController(budget=settings.get('latency_budget', config.LATENCY_BUDGET),
+                                           min_skip=config.MIN_FRAME_SKIP, max_skip=config.MAX_FRAME_SKIP,
+                                           image_sizes=config.IMAGE_SIZES)
+        rolling = RollingStats(CLASS_NAMES, bucket_seconds=config.STATS_BUCKET_SECONDS, horizon=config.STATS_HORIZON)
+        admission = self.admission.register(stream_id, settings.get('priority', config.DEFAULT_PRIORITY))
+        return TrafficAnalyzer(scheduler=self.scheduler, roi=camera.roi if camera else None,
+                               motion_gate=motion_gate, controller=controller, rolling=rolling,
+                               admission=admission)
+
+    def _on_evict(self, session: AnalysisSession):
+        self.scheduler.cancel(session.stream_id)
+        self.admission.remove(session.stream_id)
+        self.metrics.remove(session.stream_id)
+
+    def named_stream(self, websocket: WebSocket) -> Optional[str]:
+        params = websocket.query_params
+        return params.get('stream_id') or params.get('camera_id')
 
-    async def connect(self, websocket: WebSocket):
+    def stream_id_for(self, websocket: WebSocket) -> str:
+        """Sessions are keyed by the camera/stream ID the client sends, or by connection."""
+        # A fresh ID per anonymous connection, so a new client never inherits another's state
+        return self.named_stream(websocket) or f"ws-{uuid.uuid4().hex}"
+
+    async def connect(self, websocket: WebSocket) -> Optional[AnalysisSession]:
+        try:
+            session = self.sessions.acquire(self.stream_id_for(websocket))
+        except SessionLimitReached as e:
+            logger.warning(f"Rejecting client: {str(e)}")
+            await websocket.close(code=1013)
+            return None
         await websocket.accept()
         self.active_connections.add(websocket)
-        logger.info("Client connected")
+        self.connection_sessions[websocket] = session
+        logger.info(f"Client connected to stream {session.stream_id}")
+        return session
 
     def disconnect(self, websocket: WebSocket):
-        self.active_connections.remove(websocket)
+        self.active_connections.discard(websocket)
+        self.result_encoders.pop(websocket, None)
+        session = self.connection_sessions.pop(websocket, None)
+        if session is not None:
+            self.sessions.release(session)
+            if session.clients == 0 and self.named_stream(websocket) is None:
+                # Nobody can reconnect to an anonymous session; free its slot right away
+                self.sessions.close(session.stream_id)
+            elif session.clients == 0:
+                self.scheduler.cancel(session.stream_id)
         logger.info("Client disconnected")
 
-    def decode_frame(self, frame_data: str) -> np.ndarray:
+    async def startup(self):
+        self.sessions.start()
+        self.admission.start()
+        # Cameras with a configured source are ingested from the start
+        for camera_id, camera in self.cameras.items():
+            if camera.settings.get('source') is not None:
+                try:
+                    self.add_source(camera_id, camera.settings['source'], camera.settings.get('loop', True))
+                except Exception as e:
+                    logger.error(f"Error starting source for camera {camera_id}: {str(e)}")
+        # Load models in the background so the server accepts connections right away
+        if self.worker_pool is not None:
+            self.worker_pool.start()
+            return
+        image_sizes = config.IMAGE_SIZES if config.ADAPTIVE_QUALITY else ()
+        self.warmup_task = asyncio.get_event_loop().create_task(registry.warm_up(image_sizes))
+
+    @property
+    def models(self):
+        """Whatever holds the models: the worker pool or the in-process registry."""
+        return self.worker_pool if self.worker_pool is not None else registry
+
+    def readiness(self) -> Dict:
+        return self.models.readiness()
+
+    def decode_frame(self, frame_data: str, target_width: Optional[int] = None) -> np.ndarray:
         try:
             # Validate frame data format
             if not frame_data.startswith('data:image'):
@@ -43,8 +192,7 @@ class VisionServer:
 
             # Decode base64 image
             frame_bytes = base64.b64decode(frame_data.split(',')[1])
-            nparr = np.frombuffer(frame_bytes, np.uint8)
-            frame = cv2.imdecode(nparr, cv2.IMREAD_COLOR)
+            frame = decode_image(frame_bytes, target_width)
             
             if frame is None or frame.size == 0:
                 raise ValueError("Failed to decode image")
@@ -54,68 +202,138 @@ class VisionServer:
             logger.error(f"Error decoding frame: {str(e)}")
             return None
 
-    async def process_frame(self, frame_data: str) -> Dict:
+    def decode_binary_frame(self, header: FrameHeader, payload: memoryview,
+                            target_width: Optional[int] = None) -> np.ndarray:
         try:
-            if not frame_data or not isinstance(frame_data, str):
+            return decode_payload(header, payload, target_width)
+        except Exception as e:
+            logger.error(f"Error decoding binary frame: {str(e)}")
+            return None
+
+    def negotiate(self, hello: Dict) -> Dict:
+        """Answer a client hello; clients that never send one stay on the JSON protocol.
+
+        With ``flow: credit`` the server sends ``{"type": "ready"}`` whenever it can
+        take another frame, so the client only pushes as fast as frames are consumed.
+        With ``results: compact`` analysis results are sent as compact track deltas,
+        MessagePack-encoded in binary messages unless ``result_encoding: json`` is
+        asked for (or MessagePack is not installed).
+        """
+        protocol = 'binary' if hello.get('protocol') == 'binary' else 'json'
+        flow = 'credit' if hello.get('flow') == 'credit' else 'push'
+        reply = {
+            'type': 'hello',
+            'protocol': protocol,
+            'flow': flow,
+            'version': PROTOCOL_VERSION,
+            'encodings': list(ENCODINGS),
+            'results': 'compact' if hello.get('results') == 'compact' else 'full'
+        }
+        if reply['results'] == 'compact':
+            binary = hello.get('result_encoding', 'msgpack') == 'msgpack' and MSGPACK_AVAILABLE
+            reply['result_encoding'] = 'msgpack' if binary else 'json'
+            reply['classes'] = CLASS_NAMES
+        return reply
+
+    async def process_frame(self, frame_data, session: AnalysisSession,
+                            header: Optional[FrameHeader] = None, received_at: Optional[float] = None,
+                            timings: Optional[Dict[str, float]] = None) -> Dict:
+        try:
+            if header is None and (not frame_data or not isinstance(frame_data, str)):
                 logger.warning("Invalid frame data")
                 return None
 
-            # Decode frame in thread pool
-            frame = await asyncio.get_event_loop().run_in_executor(
-                thread_pool,
-                self.decode_frame,
-                frame_data
-            )
+            # Decode frame in thread pool, JPEGs straight at about the analyzer's working width
+            target_width = session.analyzer.max_width
+            if header is None:
+                decode_args = (self.decode_frame, frame_data, target_width)
+            else:
+                decode_args = (self.decode_binary_frame, header, frame_data, target_width)
+            decode_start = time.perf_counter()
+            frame = await asyncio.get_event_loop().run_in_executor(thread_pool, *decode_args)
+            if timings is not None:
+                timings['decode'] = time.perf_counter() - decode_start
             
             if frame is None:
-                self.consecutive_errors += 1
-                if self.consecutive_errors >= self.max_consecutive_errors:
+                session.consecutive_errors += 1
+                if session.consecutive_errors >= self.max_consecutive_errors:
                     logger.error("Too many consecutive frame decoding errors")
                 return None
 
-            # Process frame with rate limiting
-            async with self.processing_lock:
-                results = await self.analyzer.analyze_frame(frame)
-                if results is not None:
-                    self.consecutive_errors = 0
-                return results
+            # The client sent a good frame; whatever happens next is the server's doing
+            session.consecutive_errors = 0
+            session.touch()
+            results = await session.analyzer.analyze_frame(frame, stream_id=session.stream_id,
+                                                           received_at=received_at, timings=timings)
+            if results is not None:
+                if session.analyzer.admission is not None:
+                    results['admission'] = session.analyzer.admission.decision()
+                if header is not None:
+                    # Let binary clients match results to the frames they sent
+                    results['stream'] = header.stream_id
+                    results['sequence'] = header.sequence
+                    results['capture_timestamp'] = header.timestamp
+            return results
 
         except Exception as e:
             logger.error(f"Error processing frame: {str(e)}")
-            self.consecutive_errors += 1
+            session.consecutive_errors += 1
             return None
 
     async def handle_websocket(self, websocket: WebSocket):
-        await self.connect(websocket)
-        last_process_time = 0
-        
+        session = await self.connect(websocket)
+        if session is None:
+            return
+
+        # The reader only ever keeps the newest frame; the processor drains it
+        mailbox = FrameMailbox()
+        send_lock = asyncio.Lock()
+        processor = asyncio.get_event_loop().create_task(
+            self._process_mailbox(websocket, session, mailbox, send_lock)
+        )
+
         try:
-            while True:
+            while not processor.done():
                 try:
                     # Receive frame data with timeout
-                    data = await asyncio.wait_for(
-                        websocket.receive_json(),
+                    message = await asyncio.wait_for(
+                        websocket.receive(),
                         timeout=5.0
                     )
-                    
+                    if message['type'] == 'websocket.disconnect':
+                        raise WebSocketDisconnect(message.get('code', 1000))
+
+                    if message.get('bytes') is not None:
+                        # Binary protocol: fixed header followed by raw JPEG/BGR/I420 bytes
+                        try:
+                            header, frame_data = parse_frame(message['bytes'])
+                        except ProtocolError as e:
+                            logger.warning(f"Invalid binary frame: {str(e)}")
+                            session.consecutive_errors += 1
+                            continue
+                        if mailbox.put((frame_data, header, time.monotonic())):
+                            session.dropped_frames += 1
+                        continue
+
+                    data = json.loads(message.get('text') or 'null')
+                    if isinstance(data, dict) and data.get('type') == 'hello':
+                        reply = self.negotiate(data)
+                        mailbox.credit_flow = reply['flow'] == 'credit'
+                        if reply['results'] == 'compact':
+                            self.result_encoders[websocket] = CompactResultEncoder(
+                                binary=reply['result_encoding'] == 'msgpack')
+                        else:
+                            self.result_encoders.pop(websocket, None)
+                        async with send_lock:
+                            await websocket.send_json(reply)
+                            if mailbox.credit_flow:
+                                await websocket.send_json({'type': 'ready'})
+                        continue
                     if not data or 'frame' not in data:
                         continue
+                    if mailbox.put((data['frame'], None, time.monotonic())):
+                        session.dropped_frames += 1
 
-                    # Rate limiting
-                    current_time = asyncio.get_event_loop().time()
-                    time_since_last = current_time - last_process_time
-                    if time_since_last < self.frame_interval:
-                        await asyncio.sleep(self.frame_interval - time_since_last)
-
-                    # Process frame
-                    results = await self.process_frame(data['frame'])
-                    if results:
-                        await websocket.send_json(results)
-                        last_process_time = asyncio.get_event_loop().time()
-                    elif self.consecutive_errors >= self.max_consecutive_errors:
-                        logger.error("Too many consecutive errors, closing connection")
-                        break
-                    
                 except asyncio.TimeoutError:
                     continue
                 except WebSocketDisconnect:
@@ -123,35 +341,431 @@ class VisionServer:
                     break
                 except Exception as e:
                     logger.error(f"Error in WebSocket loop: {str(e)}")
-                    self.consecutive_errors += 1
-                    if self.consecutive_errors >= self.max_consecutive_errors:
+                    session.consecutive_errors += 1
+                    if session.consecutive_errors >= self.max_consecutive_errors:
                         break
-                    await asyncio.sleep(1)
                     continue
-                
+
         except Exception as e:
             logger.error(f"WebSocket error: {str(e)}")
         finally:
+            # Cancelling the processor also drops its frame from any pending batch
+            mailbox.close()
+            processor.cancel()
+            try:
+                await processor
+            except (asyncio.CancelledError, Exception):
+                pass
             self.disconnect(websocket)
 
+    async def _process_mailbox(self, websocket: WebSocket, session: AnalysisSession,
+                               mailbox: FrameMailbox, send_lock: asyncio.Lock):
+        shedding = False
+        while True:
+            try:
+                frame_data, header, received_at = await mailbox.get()
+            except MailboxClosed:
+                return
+
+            if mailbox.credit_flow:
+                # The slot is free again, so the client may push its next frame
+                async with send_lock:
+                    await websocket.send_json({'type': 'ready'})
+
+            if not self.models.ready:
+                # Frames that arrive before the models are loaded are dropped
+                session.dropped_frames += 1
+                async with send_lock:
+                    await websocket.send_json({'type': 'status', 'model': self.models.status})
+                continue
+
+            # Receive covers parsing plus the wait in the mailbox
+            timings = {'receive': time.monotonic() - received_at}
+            results = await self.process_frame(frame_data, session, header=header, received_at=received_at,
+                                               timings=timings)
+            if results:
+                results['dropped_frames'] = mailbox.dropped
+                send_start = time.perf_counter()
+                await self.send_result(websocket, results, send_lock)
+                timings['send'] = time.perf_counter() - send_start
+                self.hub.publish(session.stream_id, results)
+            self.metrics.observe(session.stream_id, timings)
+
+            # Tell the client when load shedding starts or stops limiting its stream
+            admission = session.analyzer.admission
+            if admission is not None and admission.shedding != shedding:
+                shedding = admission.shedding
+                async with send_lock:
+                    await websocket.send_json({'type': 'admission', **admission.decision()})
+
+            if not results and session.consecutive_errors >= self.max_consecutive_errors:
+                logger.error("Too many consecutive undecodable frames, closing connection")
+                await websocket.close(code=1011)
+                return
+
+    def add_source(self, stream_id: str, source: str, loop: bool = True) -> Dict:
+        """Start ingesting ``source`` on the server and feed it to ``stream_id``'s session."""
+        if stream_id in self.sources:
+            raise HTTPException(status_code=409, detail=f"Stream {stream_id} already has a source")
+        try:
+            # The source holds the session like a connected client, so it is never evicted
+            session = self.sessions.acquire(stream_id)
+        except SessionLimitReached as e:
+            raise HTTPException(status_code=503, detail=str(e))
+        video = VideoSource(source, loop=loop)
+        video.start()
+        self.sources[stream_id] = video
+        self.source_tasks[stream_id] = asyncio.get_event_loop().create_task(
+            self._ingest(stream_id, video, session)
+        )
+        logger.info(f"Ingesting {redact_source(source)} into stream {stream_id}")
+        return {'stream_id': stream_id, **video.stats()}
+
+    def add_camera_source(self, request: SourceRequest) -> Dict:
+        """Start ingest for a configured camera on a client's request.
+
+        Only sources from the camera config can be started this way, so clients
+        cannot make the server open arbitrary URLs, local files or devices.
+        """
+        camera = self.cameras.get(request.stream_id)
+        source = camera.settings.get('source') if camera else None
+        if source is None:
+            raise HTTPException(status_code=404, detail=f"No configured source for camera {request.stream_id}")
+        if request.source is not None and request.source != str(source):
+            raise HTTPException(status_code=403, detail="Only the camera's configured source can be ingested")
+        loop = request.loop if request.loop is not None else camera.settings.get('loop', True)
+        return self.add_source(request.stream_id, source, loop)
+
+    def remove_source(self, stream_id: str) -> bool:
+        video = self.sources.get(stream_id)
+        if video is None:
+            return False
+        video.stop()
+        task = self.source_tasks.get(stream_id)
+        if task is not None:
+            task.cancel()
+        self._release_source(stream_id)
+        logger.info(f"Stopped ingest for stream {stream_id}")
+        return True
+
+    def _release_source(self, stream_id: str):
+        """Forget a stream's source and let go of the session it was holding."""
+        self.sources.pop(stream_id, None)
+        self.source_tasks.pop(stream_id, None)
+        session = self.sessions.get(stream_id)
+        if session is not None:
+            self.sessions.release(session)
+            if session.clients == 0:
+                self.scheduler.cancel(stream_id)
+
+    def traffic_stats(self, stream_id: Optional[str] = None, windows: Optional[List[float]] = None) -> Dict:
+        """Rolling traffic statistics per stream over each of ``windows`` seconds."""
+        windows = windows or config.STATS_WINDOWS
+        if stream_id is not None:
+            session = self.sessions.get(stream_id)
+            if session is None or session.analyzer.rolling is None:
+                raise HTTPException(status_code=404, detail=f"No active stream {stream_id}")
+            return {'stream_id': stream_id, 'windows': session.analyzer.rolling.summaries(windows)}
+        return {
+            stream_id: session.analyzer.rolling.summaries(windows)
+            for stream_id, session in self.sessions.sessions.items()
+            if session.analyzer.rolling is not None
+        }
+
+    def sources_stats(self) -> Dict:
+        return {stream_id: video.stats() for stream_id, video in self.sources.items()}
+
+    async def _ingest(self, stream_id: str, video: VideoSource, session: AnalysisSession):
+        """Analyze the newest frame from a server-side source whenever the analyzer is free."""
+        try:
+            await self._ingest_frames(stream_id, video, session)
+        finally:
+            if self.sources.get(stream_id) is video:
+                # The source ended on its own; release it so its session can be evicted
+                self._release_source(stream_id)
+
+    async def _ingest_frames(self, stream_id: str, video: VideoSource, session: AnalysisSession):
+        while True:
+            try:
+                frame, captured_at = await video.get()
+            except SourceClosed:
+                logger.info(f"Source for stream {stream_id} ended")
+                return
+
+            if not self.models.ready:
+                session.dropped_frames += 1
+                continue
+
+            # Receive covers the wait between capture and analysis
+            timings = {'receive': time.monotonic() - captured_at}
+            try:
+                session.touch()
+                results = await session.analyzer.analyze_frame(frame, stream_id=stream_id,
+                                                               received_at=captured_at, timings=timings)
+            except Exception as e:
+                logger.error(f"Error analyzing frame from stream {stream_id}: {str(e)}")
+                continue
+            if results:
+                results['stream'] = stream_id
+                results['dropped_frames'] = video.dropped
+                if session.analyzer.admission is not None:
+                    results['admission'] = session.analyzer.admission.decision()
+                send_start = time.perf_counter()
+                self.hub.publish(stream_id, results)
+                timings['send'] = time.perf_counter() - send_start
+            self.metrics.observe(stream_id, timings)
+
+    async def handle_subscriber(self, websocket: WebSocket):
+        """Read-only connection that receives every result of one stream.
+
+        Subscribers attach by ``stream_id`` (or ``camera_id``) to whatever
+        produces that stream, a pushing client or a server-side source, and
+        never send frames themselves. A ``hello`` with ``results: compact``
+        switches to the compact result stream, as on /ws/analyze.
+        """
+        stream_id = websocket.query_params.get('stream_id') or websocket.query_params.get('camera_id')
+        if not stream_id:
+            await websocket.close(code=1008)
+            return
+        await websocket.accept()
+        self.active_connections.add(websocket)
+        subscriber = self.hub.subscribe(websocket, stream_id)
+        logger.info(f"Subscriber connected to stream {stream_id}")
+        try:
+            while not subscriber.closed:
+                message = await websocket.receive()
+                if message['type'] == 'websocket.disconnect':
+                    break
+                try:
+                    data = json.loads(message.get('text') or 'null')
+                except ValueError:
+                    continue
+                if isinstance(data, dict) and data.get('type') == 'hello':
+                    reply = self.negotiate(data)
+                    subscriber.encoder = None
+                    if reply['results'] == 'compact':
+                        subscriber.encoder = CompactResultEncoder(binary=reply['result_encoding'] == 'msgpack')
+                    subscriber.offer(('json', reply))
+        except WebSocketDisconnect:
+            pass
+        except Exception as e:
+            logger.error(f"Subscriber error: {str(e)}")
+        finally:
+            self.hub.unsubscribe(subscriber)
+            self.active_connections.discard(websocket)
+            logger.info(f"Subscriber disconnected from stream {stream_id}")
+
+    async def send_result(self, websocket: WebSocket, results: Dict, send_lock: asyncio.Lock):
+        encoder = self.result_encoders.get(websocket)
+        if encoder is None:
+            async with send_lock:
+                await websocket.send_json(results)
+            return
+        message = encoder.encode(results)
+        async with send_lock:
+            if isinstance(message, bytes):
+                await websocket.send_bytes(message)
+            else:
+                await websocket.send_text(message)
+
+    def metrics_text(self) -> str:
+        """Stage latencies, queue depths and drop counters in Prometheus text format."""
+        inference, batching = self.inference.stats(), self.scheduler.stats()
+        streams = list(self.sessions.sessions.values())
+        queue_depths = self.scheduler.queue_depths()
+
+        lines = self.metrics.render()
+        lines += format_metric('vision_connections', 'gauge', 'Open WebSocket connections',
+                               [({}, len(self.active_connections))])
+        lines += format_metric('vision_subscribers', 'gauge', 'Read-only subscribers per stream',
+                               [({'stream': stream}, count) for stream, count in self.hub.counts().items()])
+        lines += format_metric('vision_subscribers_dropped_total', 'counter',
+                               'Subscribers dropped for falling behind', [({}, self.hub.dropped)])
+        lines += format_metric('vision_source_frames_total', 'counter', 'Frames read from server-side sources',
+                               [({'stream': stream}, source.frames_read) for stream, source in self.sources.items()])
+        lines += format_metric('vision_sessions', 'gauge', 'Active stream sessions',
+                               [({}, len(streams))])
+        lines += format_metric('vision_inference_pending', 'gauge', 'Jobs queued or running on the inference threads',
+                               [({}, inference['pending'])])
+        lines += format_metric('vision_batch_pending', 'gauge', 'Frames waiting for the next model batch',
+                               [({}, batching['pending'])])
+        lines += format_metric('vision_batch_queue_depth', 'gauge', 'Frames waiting for a batch per stream',
+                               [({'stream': stream}, depth) for stream, depth in queue_depths.items()])
+        lines += format_metric('vision_batches_total', 'counter', 'Model batches run',
+                               [({}, batching['batches'])])
+        lines += format_metric('vision_frames_analyzed_total', 'counter', 'Frames handed to the analyzer per stream',
+                               [({'stream': s.stream_id}, s.analyzer.frame_count) for s in streams])
+        lines += format_metric('vision_frames_dropped_total', 'counter', 'Frames dropped before analysis per stream',
+                               [({'stream': s.stream_id}, s.dropped_frames) for s in streams])
+        lines += format_metric('vision_inference_rejected_total', 'counter', 'Frames rejected by a full queue',
+                               [({'queue': 'batch'}, batching['rejected']),
+                                ({'queue': 'inference'}, inference['rejected'])])
+        lines += format_metric('vision_inference_timeouts_total', 'counter', 'Inference jobs that timed out',
+                               [({}, inference['timed_out'])])
+        admitted = self.admission.by_priority()
+        lines += format_metric('vision_admission_budget_fps', 'gauge',
+                               'Inference budget in effect, inferences per second (+Inf when unlimited)',
+                               [({}, self.admission.effective_budget)])
+        lines += format_metric('vision_admission_allowed_fps', 'gauge',
+                               'Inference rate allowed per stream (+Inf when not limited)',
+                               [({'stream': stream.stream_id, 'priority': stream.priority},
+                                 stream.allowed_rate if stream.allowed_rate is not None else float('inf'))
+                                for stream in admitted])
+        lines += format_metric('vision_admission_demand_fps', 'gauge', 'Inference rate asked for per stream',
+                               [({'stream': stream.stream_id, 'priority': stream.priority}, stream.demand)
+                                for stream in admitted])
+        lines += format_metric('vision_admission_shed_total', 'counter', 'Frames shed by admission control',
+                               [({'stream': stream.stream_id, 'priority': stream.priority}, stream.shed_total)
+                                for stream in admitted])
+        lines += format_metric('vision_admission_overloads_total', 'counter',
+                               'Frames that hit a full inference queue or timed out',
+                               [({}, self.admission.overloads_total)])
+        if self.result_cache is not None:
+            cache = self.result_cache.stats()
+            lines += format_metric('vision_result_cache_requests_total', 'counter',
+                                   '/analyze/image requests by result cache outcome',
+                                   [({'outcome': outcome}, cache[key]) for outcome, key in
+                                    (('hit', 'hits'), ('miss', 'misses'), ('shared', 'shared'))])
+            lines += format_metric('vision_result_cache_entries', 'gauge', 'Results held in the cache',
+                                   [({}, cache['entries'])])
+            lines += format_metric('vision_result_cache_evictions_total', 'counter',
+                                   'Cached results dropped by size or age',
+                                   [({'reason': 'size'}, cache['evictions']),
+                                    ({'reason': 'ttl'}, cache['expirations'])])
+        return '\n'.join(lines) + '\n'
+
+    def shutdown(self):
+        for stream_id in list(self.sources):
+            self.remove_source(stream_id)
+        self.hub.close()
+        self.admission.stop()
+        self.sessions.stop()
+        self.scheduler.shutdown()
+        self.inference.shutdown()
+        if self.worker_pool is not None:
+            self.worker_pool.shutdown()
+
     async def analyze_image(self, file: UploadFile) -> Dict:
+        if not self.models.ready:
+            raise HTTPException(status_code=503, detail=f"Model is {self.models.status}")
         try:
             contents = await file.read()
-            nparr = np.frombuffer(contents, np.uint8)
-            image = cv2.imdecode(nparr, cv2.IMREAD_COLOR)
-            
-            if image is None or image.size == 0:
-                raise ValueError("Failed to decode image")
-
-            async with self.processing_lock:
-                results = await self.analyzer.analyze_frame(image)
-                if results is None:
-                    raise ValueError("Failed to analyze image")
-                return results
+            if self.result_cache is None:
+                return await self._analyze_image_bytes(contents)
+            key = await asyncio.get_event_loop().run_in_executor(thread_pool, self.result_cache.key, contents)
+            results, outcome = await self.result_cache.get_or_compute(
+                key, lambda: self._analyze_image_bytes(contents))
+            return dict(results, cache=outcome)
 
         except Exception as e:
             logger.error(f"Error analyzing image: {str(e)}")
             raise HTTPException(
                 status_code=500,
                 detail=f"Error processing image: {str(e)}"
-            )
\ No newline at end of file
+            )
+
+    async def _analyze_image_bytes(self, contents: bytes) -> Dict:
+        # Single images are analyzed statelessly, without frame skipping
+        analyzer = TrafficAnalyzer(scheduler=self.scheduler, frame_skip=1)
+        decode_start = time.perf_counter()
+        image = await asyncio.get_event_loop().run_in_executor(thread_pool, decode_image, contents,
+                                                               analyzer.max_width)
+        timings = {'decode': time.perf_counter() - decode_start}
+
+        if image is None or image.size == 0:
+            raise ValueError("Failed to decode image")
+
+        results = await analyzer.analyze_frame(image, stream_id=analyzer, timings=timings)
+        if results is None or results.get('error'):
+            # Raised rather than returned, so the result cache never keeps a failed detection
+            raise ValueError("Failed to analyze image")
+        self.metrics.observe('rest', timings)
+        return results
+
+    def analyze_images(self, files: List[UploadFile]) -> AsyncIterator[str]:
+        """Analyze many uploaded images (or zip archives of images) in one request.
+
+        Returns an async iterator of NDJSON lines: one per image, in completion
+        order, tagged with its ``index`` and ``file`` name, followed by a final
+        ``summary`` line.
+        """
+        if not self.models.ready:
+            raise HTTPException(status_code=503, detail=f"Model is {self.models.status}")
+        if not files:
+            raise HTTPException(status_code=400, detail="No files uploaded")
+        return self._analyze_uploads(files)
+
+    async def _analyze_uploads(self, files: List[UploadFile]) -> AsyncIterator[str]:
+        loop = asyncio.get_event_loop()
+        images = iter_upload_images(files)
+        # The whole request is one scheduler stream, so a large back-fill gets one
+        # stream's fair share of each batch; images decode ahead while they wait
+        stream = object()
+        slots = asyncio.Semaphore(self.scheduler.max_per_stream)
+        pending = set()
+        count = failed = 0
+        started = time.monotonic()
+        exhausted = False
+        reading = None
+        try:
+            while True:
+                # Keep enough images decoding and queued to fill model batches
+                while not exhausted and len(pending) < config.BATCH_MAX_IN_FLIGHT:
+                    try:
+                        reading = batch_decode_pool.submit(next, images, None)
+                        item = await asyncio.wrap_future(reading)
+                    except Exception as e:
+                        logger.error(f"Error reading upload: {str(e)}")
+                        yield json.dumps({'type': 'error', 'error': f"Error reading upload: {str(e)}"}) + '\n'
+                        item = None
+                    if item is None:
+                        exhausted = True
+                        break
+                    name, contents = item
+                    pending.add(loop.create_task(self._analyze_upload(count, name, contents, stream, slots)))
+                    count += 1
+                if not pending:
+                    break
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    result = task.result()
+                    failed += 'error' in result
+                    yield json.dumps(result) + '\n'
+            yield json.dumps({
+                'type': 'summary',
+                'images': count,
+                'failed': failed,
+                'elapsed': round(time.monotonic() - started, 3)
+            }) + '\n'
+        finally:
+            # The client went away or the stream finished; stop outstanding work
+            for task in pending:
+                task.cancel()
+            if reading is not None:
+                # A read may still be running on the decode pool; close the generator once it returns
+                reading.add_done_callback(lambda _: images.close())
+            else:
+                images.close()
+
+    async def _analyze_upload(self, index: int, name: str, contents: bytes, stream: object,
+                              slots: asyncio.Semaphore) -> Dict:
+        loop = asyncio.get_event_loop()
+        try:
+            # Stateless like /analyze/image, but queued under the request's shared stream
+            analyzer = TrafficAnalyzer(scheduler=self.scheduler, frame_skip=1)
+            decode_start = time.perf_counter()
+            image = await loop.run_in_executor(batch_decode_pool, decode_image, contents, analyzer.max_width)
+            timings = {'decode': time.perf_counter() - decode_start}
+            if image is None or image.size == 0:
+                raise ValueError("Failed to decode image")
+
+            async with slots:
+                results = await analyzer.analyze_frame(image, stream_id=stream, timings=timings)
+            if results is None or results.get('error'):
+                raise ValueError("Failed to analyze image")
+            self.metrics.observe('rest', timings)
+            return {'index': index, 'file': name, **results}
+
+        except Exception as e:
+            logger.error(f"Error analyzing {name}: {str(e)}")
+            return {'index': index, 'file': name, 'error': str(e)}
@@ -0,0 +1,124 @@
+import asyncio
+import logging
+import time
+from typing import Callable, Dict, List, Optional
+
+from .analyzer import TrafficAnalyzer
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+class SessionLimitReached(Exception):
+    """Raised when a new stream would exceed the concurrent session cap."""
+
+
+class AnalysisSession:
+    """Isolated analysis state (tracker, frame counters, FPS) for one camera stream."""
+
+    def __init__(self, stream_id: str, analyzer: TrafficAnalyzer):
+        self.stream_id = stream_id
+        self.analyzer = analyzer
+        self.created_at = time.monotonic()
+        self.last_seen = self.created_at
+        self.clients = 0
+        self.consecutive_errors = 0
+        self.dropped_frames = 0
+
+    def touch(self):
+        self.last_seen = time.monotonic()
+
+    def idle_for(self) -> float:
+        return time.monotonic() - self.last_seen
+
+
+class SessionRegistry:
+    """Keeps one AnalysisSession per stream ID, with idle eviction and a session cap.
+
+    Sessions that still have clients attached are never evicted; a detached
+    session survives ``idle_timeout`` seconds so a reconnecting camera keeps
+    its track IDs.
+    """
+
+    def __init__(self, analyzer_factory: Callable[[str], TrafficAnalyzer],
+                 max_sessions: int = 32, idle_timeout: float = 120.0,
+                 on_evict: Optional[Callable[[AnalysisSession], None]] = None):
+        self.analyzer_factory = analyzer_factory
+        self.max_sessions = max_sessions
+        self.idle_timeout = idle_timeout
+        self.on_evict = on_evict
+        self.sessions: Dict[str, AnalysisSession] = {}
+        self._eviction_task: Optional[asyncio.Task] = None
+
+    def get(self, stream_id: str) -> Optional[AnalysisSession]:
+        return self.sessions.get(stream_id)
+
+    def acquire(self, stream_id: str) -> AnalysisSession:
+        """Attach a client to the session for ``stream_id``, creating it if needed."""
+        session = self.sessions.get(stream_id)
+        if session is None:
+            if len(self.sessions) >= self.max_sessions:
+                self.evict_idle()
+            if len(self.sessions) >= self.max_sessions:
+                raise SessionLimitReached(f"Session limit reached ({self.max_sessions} streams)")
+            session = AnalysisSession(stream_id, self.analyzer_factory(stream_id))
+            self.sessions[stream_id] = session
+            logger.info(f"Created analysis session for stream {stream_id}")
+        session.clients += 1
+        session.touch()
+        return session
+
+    def release(self, session: AnalysisSession):
+        session.clients = max(0, session.clients - 1)
+        session.touch()
+
+    def evict_idle(self) -> List[str]:
+        """Drop detached sessions that have been idle longer than ``idle_timeout``."""
+        evicted = [
+            stream_id for stream_id, session in self.sessions.items()
+            if session.clients == 0 and session.idle_for() >= self.idle_timeout
+        ]
+        for stream_id in evicted:
+            self.close(stream_id)
+        return evicted
+
+    def close(self, stream_id: str):
+        session = self.sessions.pop(stream_id, None)
+        if session is None:
+            return
+        if self.on_evict is not None:
+            self.on_evict(session)
+        logger.info(f"Closed analysis session for stream {stream_id}")
+
+    async def _evict_periodically(self, interval: float):
+        while True:
+            await asyncio.sleep(interval)
+            evicted = self.evict_idle()
+            if evicted:
+                logger.info(f"Evicted {len(evicted)} idle session(s)")
+
+    def start(self, interval: float = 30.0):
+        if self._eviction_task is None or self._eviction_task.done():
+            self._eviction_task = asyncio.get_running_loop().create_task(self._evict_periodically(interval))
+
+    def stop(self):
+        if self._eviction_task is not None:
+            self._eviction_task.cancel()
+        for stream_id in list(self.sessions):
+            self.close(stream_id)
+
+    def stats(self) -> Dict:
+        return {
+            'active_sessions': len(self.sessions),
+            'max_sessions': self.max_sessions,
+            'streams': {
+                stream_id: {
+                    'clients': session.clients,
+                    'idle_seconds': round(session.idle_for(), 1),
+                    'dropped_frames': session.dropped_frames,
+                    **session.analyzer.stats()
+                }
+                for stream_id, session in self.sessions.items()
+            }
+        }
@@ -0,0 +1,147 @@
+import numpy as np
+from typing import Dict, Set, Tuple
+
+from .tracks import TrackStore
+
+_KEY_OFFSET = 1 << 20
+_KEY_STRIDE = 1 << 21
+
+
+def points_in_polygon(points: np.ndarray, polygon: np.ndarray) -> np.ndarray:
+    """Vectorized even-odd ray casting; returns a boolean mask over (N, 2) points."""
+    points = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+    polygon = np.asarray(polygon, dtype=np.float64).reshape(-1, 2)
+    x, y = points[:, 0:1], points[:, 1:2]
+    x1, y1 = polygon[:, 0], polygon[:, 1]
+    x2, y2 = np.roll(x1, -1), np.roll(y1, -1)
+    crosses = (y1 > y) != (y2 > y)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        x_intersect = x1 + (y - y1) * (x2 - x1) / (y2 - y1)
+    return np.logical_and(crosses, x < x_intersect).sum(axis=1) % 2 == 1
+
+
+class SpatialHashGrid:
+    """Uniform grid over the centers of a TrackStore's live tracks.
+
+    Each live slot sits in exactly one cell. ``update`` only moves the slots
+    whose cell actually changed, so keeping the index current costs a single
+    vectorized comparison per frame plus work proportional to cell crossings.
+    Radius and zone queries (counting lines, violation zones) only visit the
+    cells their bounding box overlaps.
+    """
+
+    def __init__(self, tracks: TrackStore, cell_size: float = 96.0):
+        self.tracks = tracks
+        self.cell_size = cell_size
+        self.cells: Dict[Tuple[int, int], Set[int]] = {}
+        self.slot_cells = np.zeros((0, 2), dtype=np.int64)
+        self.indexed = np.zeros(0, dtype=bool)
+
+    def _fit_capacity(self):
+        capacity = self.tracks.capacity
+        if len(self.indexed) < capacity:
+            old = len(self.indexed)
+            slot_cells = np.zeros((capacity, 2), dtype=np.int64)
+            slot_cells[:old] = self.slot_cells
+            indexed = np.zeros(capacity, dtype=bool)
+            indexed[:old] = self.indexed
+            self.slot_cells, self.indexed = slot_cells, indexed
+
+    def cell_of(self, points: np.ndarray) -> np.ndarray:
+        return np.floor(np.asarray(points, dtype=np.float64) / self.cell_size).astype(np.int64)
+
+    def update(self, slots: np.ndarray):
+        """Re-index ``slots`` at their current centers."""
+        if not len(slots):
+            return
+        self._fit_capacity()
+        slots = np.asarray(slots, dtype=np.int64)
+        new_cells = self.cell_of(self.tracks.state[slots, :2])
+        moved = ~self.indexed[slots] | (new_cells != self.slot_cells[slots]).any(axis=1)
+        for slot, cell, was_indexed in zip(slots[moved].tolist(), new_cells[moved].tolist(),
+                                           self.indexed[slots[moved]].tolist()):
+            if was_indexed:
+                self._discard(slot, tuple(self.slot_cells[slot]))
+            self.cells.setdefault(tuple(cell), set()).add(slot)
+        self.slot_cells[slots[moved]] = new_cells[moved]
+        self.indexed[slots[moved]] = True
+
+    def remove(self, slots: np.ndarray):
+        self._fit_capacity()
+        for slot in np.asarray(slots, dtype=np.int64).tolist():
+            if self.indexed[slot]:
+                self._discard(slot, tuple(self.slot_cells[slot]))
+                self.indexed[slot] = False
+
+    def _discard(self, slot: int, cell: Tuple[int, int]):
+        members = self.cells.get(cell)
+        if members is not None:
+            members.discard(slot)
+            if not members:
+                del self.cells[cell]
+
+    def _slots_in_cells(self, x_range, y_range) -> np.ndarray:
+        found = []
+        for cx in x_range:
+            for cy in y_range:
+                members = self.cells.get((cx, cy))
+                if members:
+                    found.extend(members)
+        return np.array(found, dtype=np.int64)
+
+    def neighbor_pairs(self, points: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """Pair each point with every track in its own and the 8 surrounding cells.
+
+        Returns parallel ``(point_indices, slots)`` arrays. The lookup is a
+        vectorized join of cell keys against the indexed slots sorted by cell,
+        so it costs a handful of NumPy calls regardless of scene density.
+        """
+        empty = np.zeros(0, dtype=np.int64)
+        slots = np.flatnonzero(self.indexed)
+        if not len(points) or not len(slots):
+            return empty, empty
+        slot_keys = self._cell_keys(self.slot_cells[slots])
+        order = np.argsort(slot_keys, kind='stable')
+        sorted_keys, sorted_slots = slot_keys[order], slots[order]
+
+        point_cells = self.cell_of(points)
+        point_parts, slot_parts = [], []
+        for dx in (-1, 0, 1):
+            for dy in (-1, 0, 1):
+                keys = self._cell_keys(point_cells + (dx, dy))
+                lo = np.searchsorted(sorted_keys, keys, side='left')
+                counts = np.searchsorted(sorted_keys, keys, side='right') - lo
+                total = counts.sum()
+                if not total:
+                    continue
+                # Expand each point's [lo, lo + count) range into explicit pairs
+                starts = np.repeat(lo - (np.cumsum(counts) - counts), counts)
+                point_parts.append(np.repeat(np.arange(len(points)), counts))
+                slot_parts.append(sorted_slots[starts + np.arange(total)])
+        if not point_parts:
+            return empty, empty
+        return np.concatenate(point_parts), np.concatenate(slot_parts)
+
+    @staticmethod
+    def _cell_keys(cells: np.ndarray) -> np.ndarray:
+        # Offset so cells left of / above the frame still map to unique keys
+        return (cells[:, 0] + _KEY_OFFSET) * _KEY_STRIDE + (cells[:, 1] + _KEY_OFFSET)
+
+    def query_radius(self, center, radius: float) -> np.ndarray:
+        """Live track slots whose centers lie within ``radius`` of ``center``."""
+        (x0, y0), (x1, y1) = self.cell_of([center[0] - radius, center[1] - radius]), \
+            self.cell_of([center[0] + radius, center[1] + radius])
+        slots = self._slots_in_cells(range(x0, x1 + 1), range(y0, y1 + 1))
+        if not len(slots):
+            return slots
+        offsets = self.tracks.state[slots, :2] - np.asarray(center, dtype=np.float64)
+        return slots[(offsets ** 2).sum(axis=1) <= radius ** 2]
+
+    def query_polygon(self, polygon) -> np.ndarray:
+        """Live track slots whose centers lie inside ``polygon`` (counting lines, violation zones)."""
+        polygon = np.asarray(polygon, dtype=np.float64).reshape(-1, 2)
+        (x0, y0), (x1, y1) = self.cell_of(polygon.min(axis=0)), self.cell_of(polygon.max(axis=0))
+        slots = self._slots_in_cells(range(x0, x1 + 1), range(y0, y1 + 1))
+        if not len(slots):
+            return slots
+        return slots[points_in_polygon(self.tracks.state[slots, :2], polygon)]
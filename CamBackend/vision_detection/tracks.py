@@ -0,0 +1,100 @@
+import numpy as np
+
+
+class TrackStore:
+    """Struct-of-arrays storage for tracks with free-list slot reuse.
+
+    Every per-track attribute is a preallocated NumPy column indexed by slot.
+    Slots of dead tracks go back on a free list and are handed out again, so
+    steady-state tracking does not allocate per track or per frame. The store
+    doubles its capacity when it runs out of slots. Recent matched centers
+    are kept in a fixed ring per track instead of a growing list.
+    """
+
+    def __init__(self, capacity: int = 128, history_length: int = 8):
+        self.capacity = 0
+        self.history_length = history_length
+        self.active = np.zeros(0, dtype=bool)
+        self.ids = np.zeros(0, dtype=np.int64)
+        self.state = np.zeros((0, 4), dtype=np.float64)          # Kalman [cx, cy, vx, vy]
+        self.covariance = np.zeros((0, 4, 4), dtype=np.float64)  # Kalman covariance
+        self.bbox = np.zeros((0, 4), dtype=np.float32)
+        self.size = np.zeros((0, 2), dtype=np.float32)
+        self.age = np.zeros(0, dtype=np.int32)                   # Analyzed frames since last match
+        self.hits = np.zeros(0, dtype=np.int32)                  # Analyzed frames with a match
+        self.class_id = np.zeros(0, dtype=np.int16)
+        self.confidence = np.zeros(0, dtype=np.float32)
+        self.speed = np.zeros(0, dtype=np.float32)
+        self.last_seen = np.zeros(0, dtype=np.float64)           # Epoch seconds of last match
+        self.predicted_at = np.zeros(0, dtype=np.float64)        # Epoch seconds of last predict
+        self.history = np.zeros((0, history_length, 2), dtype=np.float32)
+        self.history_head = np.zeros(0, dtype=np.int32)
+        self.history_count = np.zeros(0, dtype=np.int32)
+        self._free = []
+        self._grow(capacity)
+
+    @property
+    def center(self) -> np.ndarray:
+        return self.state[:, :2]
+
+    @property
+    def velocity(self) -> np.ndarray:
+        return self.state[:, 2:]
+
+    def _grow(self, capacity: int):
+        old = self.capacity
+        for name in ('active', 'ids', 'state', 'covariance', 'bbox', 'size', 'age', 'hits',
+                     'class_id', 'confidence', 'speed', 'last_seen', 'predicted_at',
+                     'history', 'history_head', 'history_count'):
+            column = getattr(self, name)
+            grown = np.zeros((capacity,) + column.shape[1:], dtype=column.dtype)
+            grown[:old] = column
+            setattr(self, name, grown)
+        self.ids[old:] = -1
+        self.capacity = capacity
+        # Hand out low slots first so live tracks stay packed near the front
+        self._free = list(range(capacity - 1, old - 1, -1)) + self._free
+
+    def allocate(self, count: int) -> np.ndarray:
+        """Reserve ``count`` slots for new tracks."""
+        if count > len(self._free):
+            self._grow(max(self.capacity * 2, self.capacity + count))
+        slots = np.array([self._free.pop() for _ in range(count)], dtype=np.int64)
+        self.active[slots] = True
+        self.age[slots] = 0
+        self.hits[slots] = 0
+        self.speed[slots] = 0
+        self.history_head[slots] = 0
+        self.history_count[slots] = 0
+        return slots
+
+    def release(self, slots: np.ndarray):
+        self.active[slots] = False
+        self.ids[slots] = -1
+        self._free.extend(np.asarray(slots).tolist())
+
+    def active_slots(self) -> np.ndarray:
+        return np.flatnonzero(self.active)
+
+    def __len__(self) -> int:
+        return self.capacity - len(self._free)
+
+    def push_history(self, slots: np.ndarray, centers: np.ndarray):
+        """Append one center per slot to each track's fixed-size history ring."""
+        heads = self.history_head[slots]
+        self.history[slots, heads] = centers
+        self.history_head[slots] = (heads + 1) % self.history_length
+        self.history_count[slots] = np.minimum(self.history_count[slots] + 1, self.history_length)
+
+    def recent_centers(self, slot: int) -> np.ndarray:
+        """The track's last ``history_length`` matched centers, oldest first."""
+        count = self.history_count[slot]
+        order = (self.history_head[slot] - count + np.arange(count)) % self.history_length
+        return self.history[slot, order]
+
+    def age_out(self, max_age: int) -> np.ndarray:
+        """Release every track that has gone ``max_age`` analyzed frames without a match."""
+        stale = np.flatnonzero(self.active & (self.age >= max_age))
+        if len(stale):
+            self.release(stale)
+        return stale
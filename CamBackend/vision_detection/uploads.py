@@ -0,0 +1,32 @@
+import os
+import zipfile
+from typing import Iterable, Iterator, Tuple
+
+from fastapi import UploadFile
+
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.bmp', '.webp', '.tif', '.tiff')
+
+
+def iter_upload_images(files: Iterable[UploadFile]) -> Iterator[Tuple[str, bytes]]:
+    """Yield ``(name, encoded bytes)`` for every image in a multipart upload.
+
+    Zip archives are expanded one member at a time straight from the spooled
+    upload, so a large archive is never held in memory as a whole. Archive
+    members are named ``archive.zip/path/in/archive.jpg``; non-image members
+    are skipped.
+    """
+    for upload in files:
+        upload.file.seek(0)
+        if zipfile.is_zipfile(upload.file):
+            upload.file.seek(0)
+            with zipfile.ZipFile(upload.file) as archive:
+                for info in archive.infolist():
+                    if info.is_dir() or not info.filename.lower().endswith(IMAGE_EXTENSIONS):
+                        continue
+                    # Skip macOS resource forks such as __MACOSX/._photo.jpg
+                    if os.path.basename(info.filename).startswith('._'):
+                        continue
+                    yield f"{upload.filename}/{info.filename}", archive.read(info)
+        else:
+            upload.file.seek(0)
+            yield upload.filename, upload.file.read()
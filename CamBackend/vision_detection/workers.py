@@ -0,0 +1,259 @@
+import itertools
+import logging
+import multiprocessing
+import queue
+import threading
+import time
+from concurrent.futures import Future, TimeoutError as FutureTimeout
+from typing import Dict, List, Optional
+
+import cv2
+import numpy as np
+
+from .frame_ring import SharedFrameRing
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+def _worker_main(worker_id: int, ring_spec, image_sizes, tasks, results):
+    """Inference worker process: load a model, then run the batches of ring slots queued for it."""
+    # Imported in the child so each worker owns its model
+    from .analyzer import extract_detections
+    from .models import registry
+
+    ring = SharedFrameRing.attach(ring_spec)
+    try:
+        registry.get()
+        results.put(('ready', worker_id, None))
+    except Exception as e:
+        results.put(('error', worker_id, str(e)))
+        ring.close()
+        return
+    for image_size in image_sizes:
+        try:
+            registry.get(image_size=image_size)
+        except Exception as e:
+            logger.error(f"Worker {worker_id} failed to preload {image_size}px model: {str(e)}")
+
+    while True:
+        task = tasks.get()
+        if task is None:
+            break
+        job_id, slots, image_size = task
+        try:
+            frames = [ring.read(slot) for slot in slots]
+            output = registry.get(image_size=image_size)(frames)
+            # Only small detection arrays travel back, never the frames
+            payload = [extract_detections([result]) for result in output]
+            results.put(('result', job_id, payload))
+        except Exception as e:
+            results.put(('failed', job_id, str(e)))
+    ring.close()
+
+
+class _Job:
+    """A batch handed to one worker; its ring slots stay reserved until the worker is done with them."""
+
+    def __init__(self, worker_id: int, slots: List[int]):
+        self.worker_id = worker_id
+        self.slots = slots
+        self.future = Future()
+
+
+class InferenceWorkerPool:
+    """Runs model batches in ``workers`` separate processes fed through a SharedFrameRing.
+
+    ``predict`` has the same signature as ``detect_batch`` and is called from
+    the inference threads: it copies the batch into free ring slots, queues the
+    slot indices for the least busy worker and blocks until the detections
+    come back. Each worker loads its own model, so decode and tracking in the
+    server process no longer contend with inference for the GIL.
+
+    A batch's slots are released when its worker reports back, or when that
+    worker is found dead, never when the caller stops waiting: a worker may
+    still be about to read them. Dead workers stop counting towards readiness.
+    """
+
+    def __init__(self, workers: int = 2, slots: int = 32, max_height: int = 1280, max_width: int = 1280,
+                 image_sizes=(), result_timeout: float = 5.0):
+        self.workers = workers
+        self.slots = slots
+        self.max_height = max_height
+        self.max_width = max_width
+        self.image_sizes = list(image_sizes)  # Extra model input sizes each worker preloads
+        self.result_timeout = result_timeout  # Should match the inference executor's job timeout
+        # Shared memory and processes are only created by start(), so merely
+        # importing the server module (as spawned children do) allocates nothing
+        self.ring: Optional[SharedFrameRing] = None
+        self.task_queues = []
+        self.results = None
+        self.processes = []
+        self.ready_workers = set()
+        self.errors: Dict[int, str] = {}
+        self.outstanding = [0] * workers  # Batches queued or running per worker
+        self._jobs = itertools.count()
+        self._pending: Dict[int, _Job] = {}
+        self._lock = threading.Lock()
+        self._reader: Optional[threading.Thread] = None
+        self._stopping = False
+
+    def _live_workers(self) -> List[int]:
+        return [worker_id for worker_id in tuple(self.ready_workers) if self.processes[worker_id].is_alive()]
+
+    @property
+    def status(self) -> str:
+        if self._live_workers():
+            return 'ready'
+        if len(self.errors) == self.workers:
+            return 'error'
+        return 'warming'
+
+    @property
+    def ready(self) -> bool:
+        return self.status == 'ready'
+
+    def start(self):
+        """Spawn the workers; models load in the background and report back when ready."""
+        self.ring = SharedFrameRing(self.slots, self.max_height, self.max_width)
+        context = multiprocessing.get_context('spawn')
+        self.task_queues = [context.Queue() for _ in range(self.workers)]
+        self.results = context.Queue()
+        self.processes = [
+            context.Process(target=_worker_main, name=f'inference-worker-{i}', daemon=True,
+                            args=(i, self.ring.spec(), self.image_sizes, self.task_queues[i], self.results))
+            for i in range(self.workers)
+        ]
+        for process in self.processes:
+            process.start()
+        self._reader = threading.Thread(target=self._read_results, name='inference-results', daemon=True)
+        self._reader.start()
+
+    def _read_results(self):
+        checked_at = time.monotonic()
+        while True:
+            try:
+                message = self.results.get(timeout=1.0)
+            except queue.Empty:
+                message = ()
+            if time.monotonic() - checked_at >= 1.0:
+                checked_at = time.monotonic()
+                self._check_workers()
+            if message is None:
+                break
+            if not message:
+                continue
+            kind, key, payload = message
+            if kind == 'ready':
+                self.ready_workers.add(key)
+                logger.info(f"Inference worker {key} ready")
+                continue
+            if kind == 'error':
+                self.errors[key] = payload
+                logger.error(f"Inference worker {key} failed to load: {payload}")
+                continue
+            if kind == 'result':
+                self._finish(key, result=payload)
+            else:
+                self._finish(key, error=RuntimeError(payload))
+
+    def _check_workers(self):
+        """Fail the batches of workers that died; nothing will read their slots any more."""
+        if self._stopping:
+            return
+        for worker_id, process in enumerate(self.processes):
+            if worker_id in self.errors or process.is_alive():
+                continue
+            self.errors[worker_id] = f"Worker {worker_id} exited with code {process.exitcode}"
+            self.ready_workers.discard(worker_id)
+            logger.error(f"Inference worker {worker_id} died (exit code {process.exitcode})")
+            with self._lock:
+                lost = [job_id for job_id, job in self._pending.items() if job.worker_id == worker_id]
+            for job_id in lost:
+                self._finish(job_id, error=RuntimeError(f"Inference worker {worker_id} died"))
+
+    def _finish(self, job_id: int, result=None, error: Optional[Exception] = None):
+        with self._lock:
+            job = self._pending.pop(job_id, None)
+            if job is None:
+                return
+            self.outstanding[job.worker_id] -= 1
+        self.ring.release(job.slots)
+        if not job.future.done():
+            if error is not None:
+                job.future.set_exception(error)
+            else:
+                job.future.set_result(result)
+
+    def _submit(self, slots: List[int], image_size: Optional[int]) -> _Job:
+        with self._lock:
+            live = self._live_workers()
+            if not live:
+                raise RuntimeError("No inference worker is running")
+            worker_id = min(live, key=lambda worker: self.outstanding[worker])
+            job_id = next(self._jobs)
+            job = self._pending[job_id] = _Job(worker_id, slots)
+            self.outstanding[worker_id] += 1
+        try:
+            self.task_queues[worker_id].put((job_id, slots, image_size))
+        except Exception:
+            with self._lock:
+                self._pending.pop(job_id, None)
+                self.outstanding[worker_id] -= 1
+            raise
+        return job
+
+    def predict(self, frames: List[np.ndarray], image_size: Optional[int] = None) -> List:
+        """Blocking batched model call through the worker processes."""
+        scales = []
+        slots = self.ring.acquire(len(frames), timeout=self.result_timeout)
+        try:
+            for slot, frame in zip(slots, frames):
+                scale = 1.0
+                if not self.ring.fits(frame):
+                    # Oversized frames are shrunk to the slot; boxes are scaled back below
+                    scale = min(self.ring.max_height / frame.shape[0], self.ring.max_width / frame.shape[1])
+                    frame = cv2.resize(frame, (int(frame.shape[1] * scale), int(frame.shape[0] * scale)))
+                self.ring.write(slot, frame)
+                scales.append(scale)
+            job = self._submit(slots, image_size)
+        except BaseException:
+            self.ring.release(slots)
+            raise
+
+        # From here on the slots belong to the job, even if this wait gives up
+        try:
+            detections = job.future.result(timeout=self.result_timeout)
+        except FutureTimeout:
+            raise TimeoutError(f"Inference worker {job.worker_id} did not answer "
+                               f"within {self.result_timeout:.1f}s")
+
+        return [(xyxys / scale if scale != 1.0 else xyxys, confs, cls_ids)
+                for (xyxys, confs, cls_ids), scale in zip(detections, scales)]
+
+    def readiness(self) -> Dict:
+        return {
+            'status': self.status,
+            'error': '; '.join(self.errors.values()) or None,
+            'workers': self.workers,
+            'ready_workers': len(self._live_workers()),
+            'alive_workers': sum(process.is_alive() for process in self.processes)
+        }
+
+    def shutdown(self):
+        if self.ring is None:
+            return
+        self._stopping = True
+        for tasks in self.task_queues:
+            tasks.put(None)
+        for process in self.processes:
+            if process.pid is not None:
+                process.join(timeout=5)
+                if process.is_alive():
+                    process.terminate()
+        self.results.put(None)
+        if self._reader is not None:
+            self._reader.join(timeout=5)
+        self.ring.close()
+        self.ring = None